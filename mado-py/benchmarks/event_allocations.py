@@ -0,0 +1,93 @@
+﻿"""What a win event costs on its way from the hook callback to the event loop, in allocations and in time.
+
+Drives the win event callback of a `WindowManager` on the simulated backend with the mix the hook mostly gets,
+location and title changes with the odd foreground change, after a warm up so that the caches are full.
+
+- live blocks per event: what the callback leaves behind per event, coalesced ones included, until drained
+- blocks and bytes per queued event: the same for foreground changes, which are never coalesced
+- events per second: the callback and the event loop, drained every 64 events
+
+    python -m benchmarks.event_allocations [--windows 500] [--events 50000]
+
+"""
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+import typing
+
+from loguru import logger
+
+from mado import win32_events
+from mado.backends import set_backend
+from mado.backends.simulated import SimulatedBackend
+
+DRAIN_EVERY = 64
+WARM_UP_EVENTS = 20000
+MIX = [win32_events.EVENT_OBJECT_LOCATIONCHANGE] * 6 + [win32_events.EVENT_OBJECT_NAMECHANGE] * 3
+MIX.append(win32_events.EVENT_SYSTEM_FOREGROUND)
+
+
+def _blocks_and_bytes(send: typing.Callable[[int], None], events: int) -> typing.Tuple[int, int]:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for index in range(events):
+        send(index)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    statistics = after.compare_to(before, "filename")
+    return sum(stat.count_diff for stat in statistics), sum(stat.size_diff for stat in statistics)
+
+
+def run() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--windows", type=int, default=500)
+    parser.add_argument("--events", type=int, default=50000)
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    backend = SimulatedBackend(monitor_rects=[(0, 0, 1920, 1080), (1920, 0, 3840, 1080)])
+    set_backend(backend)
+    hwnds = backend.populate(args.windows)
+
+    from mado.window_manager import WindowManager
+
+    window_manager = WindowManager(install_hooks=False)
+    callback = window_manager.win_event_listener.callback
+
+    def send(index: int) -> None:
+        callback(0, MIX[index % len(MIX)], hwnds[index % len(hwnds)], win32_events.OBJID_WINDOW, 0, 0, index)
+
+    def send_foreground(index: int) -> None:
+        event = win32_events.EVENT_SYSTEM_FOREGROUND
+        callback(0, event, hwnds[index % len(hwnds)], win32_events.OBJID_WINDOW, 0, 0, index)
+
+    for index in range(WARM_UP_EVENTS):
+        send(index)
+    window_manager.drain()
+
+    blocks, _ = _blocks_and_bytes(send, args.events)
+    window_manager.drain()
+    print(f"live blocks per event:        {blocks / args.events:.2f}")
+
+    blocks, size = _blocks_and_bytes(send_foreground, args.events)
+    window_manager.drain()
+    print(f"blocks per queued event:      {blocks / args.events:.2f}, {size / args.events:.0f} bytes")
+
+    start = time.perf_counter()
+    for index in range(args.events):
+        send(index)
+        if index % DRAIN_EVERY == DRAIN_EVERY - 1:
+            window_manager.drain()
+    window_manager.drain()
+    print(f"events per second:            {args.events / (time.perf_counter() - start):.0f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,135 @@
+﻿"""How long a keyboard hook takes per keystroke, in the window manager process and in a process of its own.
+
+Keystrokes are timestamps sent through a pipe every 2ms, standing in for the OS calling the hook. In the
+window manager process the hook thread competes for the GIL with threads running pure Python, standing in for
+a busy event loop. In its own process (`ISOLATED_KEYBOARD`) it has the interpreter to itself and hands the
+matched keybind over through a `SharedRing`, the reader putting it on the event queue is measured too.
+
+    python -m benchmarks.hook_latency [--keystrokes 500] [--busy-threads 3]
+
+"""
+
+import argparse
+import multiprocessing
+import queue
+import threading
+import time
+import typing
+
+from mado.shared_ring import RingReader, RingWriter, SharedRing
+from mado.types_ import VIRTUAL_DESKTOP_ID
+from mado.window_manager import commands
+
+KEYSTROKE_INTERVAL = 0.002
+RING_CAPACITY = 256
+
+
+def _hook(
+    connection, writer: typing.Optional[RingWriter], latencies: typing.List[int], keystrokes: int
+) -> None:
+    keybinds = {frozenset({1, 2}): commands.Minimise()}
+    for _ in range(keystrokes):
+        pressed_at = connection.recv()
+        keybinds.get(frozenset({1, 2}))
+        if writer is not None:
+            # The timestamp rides in the command, for the end to end latency.
+            writer.put(commands.FocusVirtualDesktop(VIRTUAL_DESKTOP_ID(pressed_at)))
+        latencies.append(time.perf_counter_ns() - pressed_at)
+
+
+def _isolated_hook(connection, ring_name: str, semaphore, keystrokes: int, results) -> None:
+    ring = SharedRing.attach(ring_name, RING_CAPACITY)
+    latencies: typing.List[int] = []
+    _hook(connection, RingWriter(ring, semaphore), latencies, keystrokes)
+    results.send(latencies)
+    ring.close()
+
+
+def _press_keys(connection, keystrokes: int) -> None:
+    for _ in range(keystrokes):
+        time.sleep(KEYSTROKE_INTERVAL)
+        connection.send(time.perf_counter_ns())
+
+
+def _hold_the_gil(stopped: threading.Event) -> None:
+    total = 0
+    while not stopped.is_set():
+        for i in range(1000):
+            total += i * i
+
+
+def _percentiles(latencies: typing.List[int]) -> str:
+    latencies = sorted(latencies)
+
+    def at(fraction: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] / 1e6
+
+    return f"p50 {at(0.5):.3f} ms  p99 {at(0.99):.3f} ms  max {latencies[-1] / 1e6:.3f} ms"
+
+
+def in_process(context, keystrokes: int) -> str:
+    hook_end, keys_end = context.Pipe()
+    latencies: typing.List[int] = []
+    hook = threading.Thread(target=_hook, args=(hook_end, None, latencies, keystrokes))
+    keys = context.Process(target=_press_keys, args=(keys_end, keystrokes))
+    hook.start()
+    keys.start()
+    hook.join()
+    keys.join()
+    return _percentiles(latencies)
+
+
+def isolated(context, keystrokes: int) -> typing.Tuple[str, str]:
+    ring = SharedRing.create(RING_CAPACITY)
+    semaphore = context.Semaphore(0)
+    event_queue: queue.Queue = queue.Queue()
+    reader = RingReader(ring, semaphore, event_queue)
+    reader.start()
+    hook_end, keys_end = context.Pipe()
+    results, results_end = context.Pipe()
+    hook = context.Process(
+        target=_isolated_hook, args=(hook_end, ring.name, semaphore, keystrokes, results_end)
+    )
+    hook.start()
+    # let the hook process import before the keys come
+    time.sleep(1.0)
+    keys = context.Process(target=_press_keys, args=(keys_end, keystrokes))
+    keys.start()
+    end_to_end = []
+    for _ in range(keystrokes):
+        command = event_queue.get()
+        end_to_end.append(time.perf_counter_ns() - command.virtual_desktop_id)
+    latencies = results.recv()
+    hook.join()
+    keys.join()
+    reader.stop()
+    ring.close()
+    return _percentiles(latencies), _percentiles(end_to_end)
+
+
+def run() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--keystrokes", type=int, default=500)
+    parser.add_argument("--busy-threads", type=int, default=3)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    stopped = threading.Event()
+    busy = [threading.Thread(target=_hold_the_gil, args=(stopped,)) for _ in range(args.busy_threads)]
+    for thread in busy:
+        thread.start()
+    try:
+        print(f"hook in the window manager process: {in_process(context, args.keystrokes)}")
+        hook, end_to_end = isolated(context, args.keystrokes)
+        print(f"hook in its own process:            {hook}")
+        print(f"  through the ring to the queue:    {end_to_end}")
+    finally:
+        stopped.set()
+        for thread in busy:
+            thread.join()
+
+
+if __name__ == "__main__":
+    run()
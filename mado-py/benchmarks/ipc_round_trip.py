@@ -0,0 +1,84 @@
+﻿"""How fast `mado-cli` gets answers, against a window manager on the simulated backend.
+
+- round trip: one `Noop` per connection, as `mado-cli "Noop"` sends it, authenticating included
+- commands per second: `Noop`s pipelined on one connection, each answered once the event loop handled it
+
+    python -m benchmarks.ipc_round_trip [--round-trips 300] [--pipelined 20000]
+
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import typing
+
+from loguru import logger
+
+from mado.backends import set_backend
+from mado.backends.simulated import SimulatedBackend
+from mado.cli import send_commands
+
+COMMAND_TIMEOUT = 5.0
+
+
+def _percentiles(latencies: typing.List[float]) -> str:
+    latencies = sorted(latencies)
+
+    def at(fraction: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1e3
+
+    return f"p50 {at(0.5):.3f} ms  p99 {at(0.99):.3f} ms  max {latencies[-1] * 1e3:.3f} ms"
+
+
+def run() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--windows", type=int, default=10)
+    parser.add_argument("--round-trips", type=int, default=300)
+    parser.add_argument("--pipelined", type=int, default=20000)
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    backend = SimulatedBackend(monitor_rects=[(0, 0, 1920, 1080), (1920, 0, 3840, 1080)])
+    set_backend(backend)
+    backend.populate(args.windows)
+
+    from mado.ipc import IpcServer
+    from mado.window_manager import WindowManager
+
+    window_manager = WindowManager(install_hooks=False)
+    threading.Thread(target=window_manager.event_processing_loop, daemon=True).start()
+    with tempfile.TemporaryDirectory() as directory:
+        credentials_path = os.path.join(directory, "ipc.json")
+        server = IpcServer(
+            window_manager.event_queue,
+            port=0,
+            command_timeout=COMMAND_TIMEOUT,
+            snapshot_source=lambda: window_manager.state_snapshot,
+            credentials_path=credentials_path,
+        )
+        server.start()
+        try:
+            latencies = []
+            for _ in range(args.round_trips):
+                start = time.perf_counter()
+                send_commands(["Noop"], credentials_path=credentials_path)
+                latencies.append(time.perf_counter() - start)
+            print(f"round trip:          {_percentiles(latencies)}")
+
+            start = time.perf_counter()
+            responses = send_commands(["Noop"] * args.pipelined, credentials_path=credentials_path)
+            elapsed = time.perf_counter() - start
+            assert responses == ["ok"] * args.pipelined, responses[:3]
+            print(f"commands per second: {args.pipelined / elapsed:.0f}")
+        finally:
+            server.stop()
+
+
+if __name__ == "__main__":
+    run()
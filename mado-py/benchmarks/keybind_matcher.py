@@ -0,0 +1,74 @@
+﻿"""What the keyboard hook spends matching a keystroke, on every keystroke typed anywhere on the desktop.
+
+The keybinds have the shape of `KeyboardManager.KEYBINDS`: the prefix, maybe shift, and a key. Keys are
+strings here, in the hook they are pynput keys, hashed and compared the same way.
+
+- typing: keystrokes without the prefix held, i.e. nearly all of them
+- prefix, chord: keybinds pressed with the prefix held, each press completing a chord
+- prefix, unbound: other keys pressed with the prefix held, which complete none
+- scan: the ordered scan of the keybinds `KeybindMatcher.match` memoises, per prefixed keystroke
+
+    python -m benchmarks.keybind_matcher [--keystrokes 200000]
+
+"""
+
+import argparse
+import random
+import string
+import time
+import typing
+
+from mado.keybind_matcher import Keybind, KeybindMatcher
+from mado.window_manager import commands
+
+PREFIX = "<f24>"
+BOUND_KEYS = "fncm12345tguio8rbjk"
+
+
+def make_keybinds() -> typing.List[Keybind]:
+    return [
+        *(Keybind(frozenset({PREFIX, "<shift>", key}), commands.Minimise()) for key in BOUND_KEYS),
+        *(Keybind(frozenset({PREFIX, key}), commands.Minimise()) for key in BOUND_KEYS),
+    ]
+
+
+def time_keystrokes(matcher: KeybindMatcher, keys: typing.List[str]) -> float:
+    """Microseconds per press and release of each key in turn."""
+    press, release = matcher.press, matcher.release
+    start = time.perf_counter()
+    for key in keys:
+        press(key)
+        release(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def run() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--keystrokes", type=int, default=200000)
+    args = parser.parse_args()
+
+    random_ = random.Random(1)
+    keybinds = make_keybinds()
+    matcher = KeybindMatcher(PREFIX, keybinds)
+    unbound_keys = [key for key in string.ascii_lowercase + string.digits if key not in BOUND_KEYS]
+    typed = random_.choices(string.ascii_lowercase + " ", k=args.keystrokes)
+    chords = random_.choices(BOUND_KEYS, k=args.keystrokes)
+    unbound = random_.choices(unbound_keys, k=args.keystrokes)
+
+    print(f"typing:           {time_keystrokes(matcher, typed):.3f} us")
+    matcher.press(PREFIX)
+    print(f"prefix, chord:    {time_keystrokes(matcher, chords):.3f} us")
+    print(f"prefix, unbound:  {time_keystrokes(matcher, unbound):.3f} us")
+    matcher.release(PREFIX)
+
+    scanned = [frozenset({PREFIX, key}) for key in chords[: args.keystrokes // 10]]
+    start = time.perf_counter()
+    for keys in scanned:
+        matcher.scan(keys)
+    print(f"scan:             {(time.perf_counter() - start) / len(scanned) * 1e6:.3f} us")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,94 @@
+﻿"""What publishing the state snapshot after every event costs, with thousands of windows.
+
+A window manager on the simulated backend with three monitors:
+
+- unchanged: publishing when nothing changed, as after most events
+- focus change: only the focused window of a screen changed, its windows tuple is shared
+- remove and add: the windows of a screen changed, they are copied
+- storm: events through the event loop, with and without publishing
+
+    python -m benchmarks.publish_state [--windows 3000]
+
+"""
+
+import argparse
+import statistics
+import sys
+import time
+import typing
+
+from loguru import logger
+
+from mado.backends import set_backend
+from mado.backends.simulated import SimulatedBackend
+
+STORM_EVENTS = 5000
+SETTLE = 0.05
+
+
+def run() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--windows", type=int, default=3000)
+    parser.add_argument("--publishes", type=int, default=2000)
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+
+    backend = SimulatedBackend(
+        monitor_rects=[(0, 0, 1920, 1080), (1920, 0, 3840, 1080), (3840, 0, 5760, 1080)]
+    )
+    set_backend(backend)
+
+    from mado.window_manager import WindowManager
+
+    window_manager = WindowManager(install_hooks=False)
+    backend.attach(window_manager.win_event_listener.callback)
+    backend.populate(args.windows)
+    for _ in range(10):
+        time.sleep(SETTLE)
+        window_manager.drain()
+    screen = window_manager.state.focused_screen
+    windows = screen.windows
+    print(f"windows:        {len(window_manager.state.windows)}, {len(windows)} on the focused screen")
+
+    def publish_after(label: str, mutate: typing.Callable[[int], None], count: int) -> None:
+        times = []
+        for index in range(count):
+            mutate(index)
+            start = time.perf_counter()
+            window_manager.publish_state()
+            times.append(time.perf_counter() - start)
+        times.sort()
+        print(
+            f"{label} mean {statistics.mean(times) * 1e6:.2f} us, p99 {times[int(count * 0.99)] * 1e6:.2f} us"
+        )
+
+    def remove_and_add(index: int) -> None:
+        window = windows[index % len(windows)]
+        screen.remove_window(window)
+        screen.add_window(window)
+
+    publish_after("unchanged:     ", lambda index: None, args.publishes)
+    publish_after(
+        "focus change:  ", lambda index: screen.focus_window(windows[index % len(windows)]), args.publishes
+    )
+    publish_after("remove and add:", remove_and_add, args.publishes // 4)
+
+    def storm(seed: int) -> float:
+        backend.storm(STORM_EVENTS, seed=seed)
+        time.sleep(SETTLE)
+        start = time.perf_counter()
+        handled = window_manager.drain()
+        return (time.perf_counter() - start) / max(handled, 1)
+
+    with_publish = storm(10)
+    window_manager.publish_state = lambda: None
+    without_publish = storm(11)
+    del window_manager.publish_state
+    print(f"storm:          {with_publish * 1e6:.1f} us per event, {without_publish * 1e6:.1f} us without")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,74 @@
+﻿"""How long directional focus takes to find its window, with hundreds of windows over four monitors.
+
+- build: indexing every window, as after a restart
+- nearest: `SpatialIndex.nearest` from random origins in every direction, against scoring every window
+- move: one window moved, then the index refreshed, as between two directional commands
+
+    python -m benchmarks.spatial_index [--windows 400] [--queries 20000]
+
+"""
+
+import argparse
+import random
+import time
+
+from mado.window_manager.spatial_index import Direction, SpatialIndex, centre, direction_score
+
+MONITORS = [(0, 0, 1920, 1080), (1920, 0, 3840, 1080), (0, 1080, 1920, 2160), (1920, 1080, 3840, 2160)]
+
+
+def run() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--windows", type=int, default=400)
+    parser.add_argument("--queries", type=int, default=20000)
+    args = parser.parse_args()
+
+    random_ = random.Random(1)
+    rects = {}
+    for hwnd in range(args.windows):
+        left, top, right, bottom = MONITORS[hwnd % len(MONITORS)]
+        x, y = random_.randrange(left, right - 300), random_.randrange(top, bottom - 300)
+        rects[hwnd] = (x, y, x + random_.randrange(200, 900), y + random_.randrange(150, 700))
+    index = SpatialIndex(lambda hwnd: rects[hwnd])
+    for hwnd in rects:
+        index.mark_dirty(hwnd)
+    start = time.perf_counter()
+    index.refresh()
+    print(f"build:        {(time.perf_counter() - start) * 1e3:.2f} ms")
+
+    directions = list(Direction)
+    queries = [
+        ((random_.random() * 3840, random_.random() * 2160), directions[query % len(directions)])
+        for query in range(args.queries)
+    ]
+    worst = 0.0
+    start = time.perf_counter()
+    for query, (origin, direction) in enumerate(queries):
+        query_start = time.perf_counter()
+        index.nearest(origin, direction, exclude=query % args.windows)
+        worst = max(worst, time.perf_counter() - query_start)
+    elapsed = time.perf_counter() - start
+    print(f"nearest:      {elapsed / args.queries * 1e6:.1f} us average, {worst * 1e6:.1f} us worst")
+
+    brute_force_queries = queries[: args.queries // 10]
+    start = time.perf_counter()
+    for origin, direction in brute_force_queries:
+        scores = [direction_score(origin, centre(rect), direction) for rect in rects.values()]
+        min((score for score in scores if score is not None), default=None)
+    elapsed = time.perf_counter() - start
+    print(f"brute force:  {elapsed / len(brute_force_queries) * 1e6:.1f} us average")
+
+    start = time.perf_counter()
+    for move in range(args.queries):
+        hwnd = move % args.windows
+        left, top, right, bottom = rects[hwnd]
+        rects[hwnd] = (left + 1, top, right + 1, bottom)
+        index.mark_dirty(hwnd)
+        index.refresh()
+    print(f"move:         {(time.perf_counter() - start) / args.queries * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,114 @@
+﻿"""What the `WindowRing` of a screen costs, against the zipper it replaced, by window count.
+
+- insert: a window added in front of the cursor, as on a `Show`
+- remove: a random window removed by handle, as on a `Destroy`
+- rotate: the cursor moved onto the next window, as by `CycleFocusedWindow`
+
+The zipper is the `zipper` package screens used to be backed by, driven the way `Screen` drove it. It isn't a
+dependency any more, without it only the ring is measured. Its removes walk the whole tree, the default run
+takes about half a minute.
+
+    python -m benchmarks.window_ring [--windows 1000 2000 5000 10000] [--operations 100]
+
+"""
+
+import argparse
+import random
+import time
+import typing
+
+from mado.types_ import WINDOW_HANDLE
+from mado.window import Window
+from mado.window_manager.window_ring import WindowRing
+
+
+class ZipperWindows:
+    """The windows of a screen as they were kept before `WindowRing`, in a zipper over a list."""
+
+    def __init__(self, zipper: typing.Any) -> None:
+        self.cursor = zipper.list([])
+
+    def insert(self, window: Window) -> None:
+        if self.cursor.at_end():
+            self.cursor = self.cursor.append(window).down()
+        else:
+            self.cursor = self.cursor.insert_left(window).left()
+
+    def remove(self, hwnd: WINDOW_HANDLE) -> None:
+        # Searched from the top, from the cursor misses the windows left of it.
+        self.cursor = self.cursor.top().find(lambda loc: loc.current is not None and loc.current.hwnd == hwnd)
+        self.cursor = self.cursor.remove()
+        if self.cursor.at_end() and self.cursor.current:
+            self.cursor = self.cursor.down()
+
+    def forward(self) -> None:
+        right = self.cursor.right() or self.cursor.top().down()
+        if right and right.current is not None:
+            self.cursor = right
+        else:
+            self.cursor = self.cursor.top()
+
+
+def measure(
+    windows: typing.Any, count: int, operations: int, random_: random.Random
+) -> typing.Dict[str, float]:
+    """Microseconds per insert, remove and rotate on `windows` holding `count` windows.
+
+    Each is timed `operations` times from `count` windows, the windows removed are inserted again.
+
+    """
+    for hwnd in range(count):
+        windows.insert(Window(WINDOW_HANDLE(hwnd)))
+    removed = [Window(WINDOW_HANDLE(hwnd)) for hwnd in random_.sample(range(count), operations)]
+
+    start = time.perf_counter()
+    for window in removed:
+        windows.remove(window.hwnd)
+    remove = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for window in removed:
+        windows.insert(window)
+    insert = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(operations):
+        windows.forward()
+    rotate = time.perf_counter() - start
+    return {
+        "insert": insert / operations * 1e6,
+        "remove": remove / operations * 1e6,
+        "rotate": rotate / operations * 1e6,
+    }
+
+
+def run() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--windows", type=int, nargs="+", default=[1000, 2000, 5000, 10000])
+    parser.add_argument("--operations", type=int, default=100)
+    args = parser.parse_args()
+
+    try:
+        import zipper
+    except ImportError:
+        zipper = None
+        print("zipper isn't installed, only measuring the ring")
+
+    print(f"{'windows':>8}  {'':6}  {'insert':>10}  {'remove':>10}  {'rotate':>10}")
+    for count in args.windows:
+        operations = min(args.operations, count)
+        implementations = {"ring": WindowRing()}
+        if zipper is not None:
+            implementations["zipper"] = ZipperWindows(zipper)
+        for name, windows in implementations.items():
+            result = measure(windows, count, operations, random.Random(count))
+            print(
+                f"{count:>8}  {name:6}"
+                + "".join(f"  {result[operation]:>7.2f} us" for operation in ("insert", "remove", "rotate"))
+            )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,108 @@
+﻿"""How long deciding the rule of a window takes, with more rules than anyone writes by hand.
+
+The rules are ignored titles, floating classes and executables pinned to a screen, the windows match none of
+them, as almost all of them do.
+
+- compiled: `WindowRules.match`, dispatched on class with a title prefilter per class
+- one by one: every rule tried in order, what `WindowRules` replaced
+- decide: `WindowRules.decide` on the simulated backend, the first time and then cached
+
+    python -m benchmarks.window_rules [--rules 150] [--windows 500]
+
+"""
+
+import argparse
+import random
+import re
+import time
+import typing
+
+from mado.backends import set_backend
+from mado.backends.simulated import SimulatedBackend
+from mado.types_ import SCREEN_ID
+from mado.window_rules import Action, WindowRule, WindowRules
+
+ROUNDS = 20
+CLASS_NAMES = ["Chrome_WidgetWin_1", "Class3", "Notepad", "CASCADIA_HOSTING_WINDOW_CLASS"]
+
+
+def make_rules(count: int) -> typing.List[WindowRule]:
+    titles, class_names = count * 2 // 3, count // 5
+    return [
+        *(WindowRule(Action.ignore, title=f"^Tool window {i}$") for i in range(titles)),
+        *(WindowRule(Action.float, class_name=f"Class{i}") for i in range(class_names)),
+        *(
+            WindowRule(Action.pin, executable=f"app{i}.exe", screen_id=SCREEN_ID("MID"))
+            for i in range(count - titles - class_names)
+        ),
+    ]
+
+
+def match_one_by_one(
+    rules: typing.List[typing.Tuple[WindowRule, typing.Optional[re.Pattern]]],
+    title: str,
+    class_name: str,
+    executable: typing.Callable[[], str],
+) -> typing.Optional[WindowRule]:
+    for rule, title_pattern in rules:
+        if title_pattern is not None and title_pattern.search(title) is None:
+            continue
+        if rule.class_name is not None and rule.class_name != class_name:
+            continue
+        if rule.executable is not None and executable() != rule.executable.lower():
+            continue
+        return rule
+    return None
+
+
+def run() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rules", type=int, default=150)
+    parser.add_argument("--windows", type=int, default=500)
+    args = parser.parse_args()
+
+    rules = make_rules(args.rules)
+    window_rules = WindowRules(rules)
+    random_ = random.Random(0)
+    windows = [(f"Document {i} - Editor", random_.choice(CLASS_NAMES)) for i in range(args.windows)]
+    matches = ROUNDS * len(windows)
+
+    def executable() -> str:
+        return "other.exe"
+
+    def style() -> int:
+        return 0
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for title, class_name in windows:
+            window_rules.match(title, class_name, executable, style)
+    print(f"compiled:      {(time.perf_counter() - start) / matches * 1e6:.2f} us per window")
+
+    compiled_one_by_one = [(rule, re.compile(rule.title) if rule.title else None) for rule in rules]
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for title, class_name in windows:
+            match_one_by_one(compiled_one_by_one, title, class_name, executable)
+    print(f"one by one:    {(time.perf_counter() - start) / matches * 1e6:.2f} us per window")
+
+    backend = SimulatedBackend(monitor_rects=[(0, 0, 1920, 1080)])
+    set_backend(backend)
+    hwnds = backend.populate(args.windows)
+    start = time.perf_counter()
+    for hwnd in hwnds:
+        window_rules.decide(hwnd)
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    for hwnd in hwnds:
+        window_rules.decide(hwnd)
+    cached = time.perf_counter() - start
+    print(
+        f"decide:        {first / len(hwnds) * 1e6:.2f} us first, {cached / len(hwnds) * 1e6:.2f} us cached"
+    )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,147 @@
+﻿import typing
+
+from mado.startup_profile import STARTUP_PROFILE
+from mado.types_ import COORDINATES_ISH, MONITOR_HANDLE, WINDOW_HANDLE
+
+RECT = typing.Tuple[int, int, int, int]
+
+
+class MonitorInfo(typing.NamedTuple):
+    handle: MONITOR_HANDLE
+    rect: RECT
+    work_area: RECT
+    name: str
+
+
+class Backend:
+    """Everything the window manager asks of the desktop, see `mado.window_api` for the entry points."""
+
+    # window queries
+    def enum_windows(self) -> typing.List[WINDOW_HANDLE]:
+        """Top-level windows, in z-order from the top."""
+        raise NotImplementedError()
+
+    def is_window(self, hwnd: int) -> bool:
+        raise NotImplementedError()
+
+    def is_window_visible(self, hwnd: int) -> bool:
+        raise NotImplementedError()
+
+    def is_window_minimised(self, hwnd: int) -> bool:
+        raise NotImplementedError()
+
+    def is_window_cloaked(self, hwnd: int) -> bool:
+        raise NotImplementedError()
+
+    def is_window_state_system_invisible(self, hwnd: int) -> bool:
+        raise NotImplementedError()
+
+    def get_window_text(self, hwnd: int) -> str:
+        raise NotImplementedError()
+
+    def get_window_rect(self, hwnd: int) -> RECT:
+        raise NotImplementedError()
+
+    def is_window_hung(self, hwnd: int) -> bool:
+        """Whether the window has stopped processing its messages."""
+        raise NotImplementedError()
+
+    def get_window_class_name(self, hwnd: int) -> str:
+        raise NotImplementedError()
+
+    def get_window_style(self, hwnd: int) -> int:
+        """The `GWL_STYLE` bits of the window."""
+        raise NotImplementedError()
+
+    def get_window_process_id(self, hwnd: int) -> int:
+        raise NotImplementedError()
+
+    def get_process_executable(self, process_id: int) -> str:
+        """Path of the executable of the process, empty if we can't tell."""
+        raise NotImplementedError()
+
+    # monitors
+    def enum_display_monitors(self) -> typing.List[MonitorInfo]:
+        raise NotImplementedError()
+
+    def get_monitor_handle_from_window(self, hwnd: int) -> MONITOR_HANDLE:
+        raise NotImplementedError()
+
+    # window operations
+    def raise_and_focus_window(self, hwnd: int) -> None:
+        raise NotImplementedError()
+
+    def centre_mouse_in_rect(self, rect: RECT) -> None:
+        raise NotImplementedError()
+
+    def window_relative_move(
+        self, hwnd: int, from_coordinates: COORDINATES_ISH, to_coordinates: COORDINATES_ISH
+    ) -> None:
+        raise NotImplementedError()
+
+    def focus_desktop(self) -> None:
+        raise NotImplementedError()
+
+    def window_max_toggle(self, hwnd: int) -> None:
+        raise NotImplementedError()
+
+    def apply_window_rects(self, rects: typing.Dict[WINDOW_HANDLE, RECT]) -> None:
+        """Move and resize windows to their frame rects (as `get_window_rect`), in one batch."""
+        raise NotImplementedError()
+
+    def minimise_window(self, hwnd: int) -> None:
+        raise NotImplementedError()
+
+    def restore_window(self, hwnd: int) -> None:
+        raise NotImplementedError()
+
+    def toggle_pin_window(self, hwnd: int) -> None:
+        raise NotImplementedError()
+
+    # virtual desktops, numbered from 1
+    def current_virtual_desktop(self) -> int:
+        raise NotImplementedError()
+
+    def virtual_desktop_count(self) -> int:
+        raise NotImplementedError()
+
+    def create_virtual_desktop(self) -> None:
+        raise NotImplementedError()
+
+    def go_to_virtual_desktop(self, number: int) -> None:
+        raise NotImplementedError()
+
+    def move_window_to_virtual_desktop(self, hwnd: int, number: int) -> None:
+        raise NotImplementedError()
+
+    # misc
+    def boot_time(self) -> float:
+        """When the system started, in seconds since the epoch."""
+        raise NotImplementedError()
+
+    def on_console_interrupt(self, callback: typing.Callable[[], None]) -> None:
+        """Have a Ctrl+C or Ctrl+Break in the console call `callback`, on a thread of its own."""
+        raise NotImplementedError()
+
+
+_backend: typing.Optional[Backend] = None
+
+
+def get_backend() -> Backend:
+    global _backend
+    if _backend is None:
+        with STARTUP_PROFILE.phase("backend"):
+            from mado.backends.win32 import Win32Backend
+
+            _backend = Win32Backend()
+    return _backend
+
+
+def set_backend(backend: Backend) -> None:
+    """Swap the backend, e.g. for `mado.backends.simulated.SimulatedBackend`.
+
+    Do this before building any state.
+
+    """
+    global _backend
+    _backend = backend
@@ -0,0 +1,514 @@
+﻿import dataclasses
+import random
+import time
+import typing
+
+from mado import win32_events as we
+from mado.backends import RECT, Backend, MonitorInfo
+from mado.types_ import COORDINATES_ISH, MONITOR_HANDLE, WINDOW_HANDLE
+from mado.window_cache import monitor_from_rect
+
+WIN_EVENT_SINK = typing.Callable[[int, int, int, int, int, int, int], None]
+# hwnd, message, wParam
+WINDOW_MESSAGE_SINK = typing.Callable[[int, int, int], None]
+
+# Milliseconds between the steps of a simulated drag, i.e. one frame at 60Hz.
+DRAG_STEP_MS = 16
+
+# The win32con values, which we can't import here.
+WS_VISIBLE = 0x10000000
+WS_OVERLAPPEDWINDOW = 0x00CF0000
+
+
+class InvalidWindowHandle(Exception):
+    """Raised where the win api would fail on a window that does not exist."""
+
+
+@dataclasses.dataclass
+class SimulatedWindow:
+    hwnd: WINDOW_HANDLE
+    title: str
+    rect: RECT
+    virtual_desktop: int
+    visible: bool = True
+    minimised: bool = False
+    maximised: bool = False
+    pinned: bool = False
+    # cloaked by other means than being on another virtual desktop
+    cloaked: bool = False
+    # e.g. the tool windows we never want to manage
+    state_system_invisible: bool = False
+    # not processing its messages, see `SimulatedBackend.hang_seconds`
+    hung: bool = False
+    # where `window_max_toggle` restores to
+    restore_rect: typing.Optional[RECT] = None
+    class_name: str = "SimulatedWindow"
+    executable: str = "simulated.exe"
+    style: int = WS_OVERLAPPEDWINDOW | WS_VISIBLE
+
+
+class SimulatedBackend(Backend):
+    """An in-process desktop: monitors, windows, z-order, cloaking and virtual desktops.
+
+    Nothing here is random unless asked for with a seed, and time only moves with `advance`, so a scenario
+    always produces the same event sequence. Every change, whether made by a scenario or by the window
+    manager, is reported to the attached sinks as the win events the OS would send, with the signature of
+    `WinEventHookListener.callback`.
+
+    """
+
+    def __init__(
+        self,
+        monitor_rects: typing.Sequence[RECT] = ((0, 0, 1920, 1080),),
+        virtual_desktop_count: int = 1,
+        taskbar_height: int = 40,
+        auto_create_windows: bool = False,
+        hang_seconds: float = 0.0,
+    ) -> None:
+        """`auto_create_windows` makes up a window for any unknown hwnd asked about, for replaying recordings.
+
+        Operations on a hung window block for `hang_seconds`, like `SetWindowPos` on a window that is not
+        pumping its messages.
+
+        """
+        self.taskbar_height = taskbar_height
+        self._next_monitor_handle = 0x10001
+        self.monitors: typing.List[MonitorInfo] = []
+        self._set_monitors(monitor_rects)
+        self.windows: typing.Dict[WINDOW_HANDLE, SimulatedWindow] = {}
+        # top first
+        self.z_order: typing.List[WINDOW_HANDLE] = []
+        self.foreground: typing.Optional[WINDOW_HANDLE] = None
+        self.cursor: typing.Tuple[int, int] = (0, 0)
+        self.virtual_desktop = 1
+        self.virtual_desktops = virtual_desktop_count
+        self.tick = 0
+        # when the simulated system started, change it to simulate a reboot
+        self.booted_at = 1_700_000_000.0
+        self._next_hwnd = 0x20000
+        # one process per executable
+        self._process_ids: typing.Dict[str, int] = {}
+        self._sinks: typing.List[WIN_EVENT_SINK] = []
+        self._message_sinks: typing.List[WINDOW_MESSAGE_SINK] = []
+        self.emitted = 0
+        # `apply_window_rects` calls
+        self.batches = 0
+        self.auto_create_windows = auto_create_windows
+        self.hang_seconds = hang_seconds
+        # not made up again by `auto_create_windows` until shown
+        self._destroyed: typing.Set[WINDOW_HANDLE] = set()
+
+    # plumbing
+    def attach(self, sink: WIN_EVENT_SINK) -> None:
+        """Send win events to `sink`, e.g. `WindowManager.win_event_listener.callback`."""
+        self._sinks.append(sink)
+
+    def attach_messages(self, sink: WINDOW_MESSAGE_SINK) -> None:
+        """Send broadcast window messages to `sink`, e.g. `WinEventHookListener.on_window_message`."""
+        self._message_sinks.append(sink)
+
+    def advance(self, ms: int) -> None:
+        self.tick += ms
+
+    def emit(self, win_event: int, hwnd: int) -> None:
+        self.emitted += 1
+        for sink in self._sinks:
+            sink(0, win_event, hwnd, we.OBJID_WINDOW, 0, 0, self.tick & 0xFFFFFFFF)
+
+    def _find(self, hwnd: int) -> typing.Optional[SimulatedWindow]:
+        window = self.windows.get(hwnd)
+        if window is None and self.auto_create_windows and hwnd not in self._destroyed:
+            window = self._auto_create_window(WINDOW_HANDLE(hwnd))
+        return window
+
+    def _window(self, hwnd: int) -> SimulatedWindow:
+        if (window := self._find(hwnd)) is None:
+            raise InvalidWindowHandle(hwnd)
+        return window
+
+    def _operated_window(self, hwnd: int) -> SimulatedWindow:
+        window = self._window(hwnd)
+        if window.hung:
+            time.sleep(self.hang_seconds)
+        return window
+
+    def _auto_create_window(self, hwnd: WINDOW_HANDLE) -> SimulatedWindow:
+        # Spread over the monitors by hwnd, so that replays exercise all the screens.
+        left, top, _, _ = self.monitors[(hwnd >> 2) % len(self.monitors)].work_area
+        window = SimulatedWindow(
+            hwnd=hwnd,
+            title=f"Window {hwnd:#x}",
+            rect=(left + 100, top + 100, left + 900, top + 700),
+            virtual_desktop=self.virtual_desktop,
+        )
+        self.windows[hwnd] = window
+        self.z_order.append(hwnd)
+        return window
+
+    def _is_cloaked(self, window: SimulatedWindow) -> bool:
+        return window.cloaked or (not window.pinned and window.virtual_desktop != self.virtual_desktop)
+
+    def _is_activatable(self, window: SimulatedWindow) -> bool:
+        return window.visible and not window.minimised and not self._is_cloaked(window)
+
+    def _raise(self, hwnd: WINDOW_HANDLE) -> None:
+        self.z_order.remove(hwnd)
+        self.z_order.insert(0, hwnd)
+
+    def _set_foreground(self, hwnd: typing.Optional[WINDOW_HANDLE]) -> None:
+        if hwnd == self.foreground:
+            return
+        self.foreground = hwnd
+        if hwnd is not None:
+            self._raise(hwnd)
+            self.emit(we.EVENT_SYSTEM_FOREGROUND, hwnd)
+
+    def _activate_next(self) -> None:
+        """Hand the foreground to the topmost window that can take it, like the OS does when it is lost."""
+        if (window := self.windows.get(self.foreground)) is not None and self._is_activatable(window):
+            return
+        self.foreground = None
+        for hwnd in self.z_order:
+            if self._is_activatable(self.windows[hwnd]):
+                self._set_foreground(hwnd)
+                return
+
+    def _set_monitors(self, monitor_rects: typing.Sequence[RECT]) -> None:
+        # Named by position, with new handles every time, as the OS may hand out.
+        self.monitors = []
+        for i, rect in enumerate(monitor_rects):
+            self.monitors.append(
+                MonitorInfo(
+                    handle=MONITOR_HANDLE(self._next_monitor_handle),
+                    rect=tuple(rect),
+                    work_area=(rect[0], rect[1], rect[2], rect[3] - self.taskbar_height),
+                    name=f"DISPLAY{i + 1}",
+                )
+            )
+            self._next_monitor_handle += 1
+        self._monitor_rects = {monitor.handle: monitor.rect for monitor in self.monitors}
+
+    def _monitor_of(self, rect: RECT) -> MonitorInfo:
+        handle = monitor_from_rect(rect, self._monitor_rects)
+        return next(monitor for monitor in self.monitors if monitor.handle == handle)
+
+    def _set_rect(self, window: SimulatedWindow, rect: RECT) -> None:
+        if window.rect != rect:
+            window.rect = rect
+            self.emit(we.EVENT_OBJECT_LOCATIONCHANGE, window.hwnd)
+
+    # scenario
+    def create_window(
+        self,
+        title: str = "Window",
+        rect: typing.Optional[RECT] = None,
+        monitor: int = 0,
+        virtual_desktop: typing.Optional[int] = None,
+        visible: bool = True,
+        activate: bool = True,
+        state_system_invisible: bool = False,
+        class_name: str = "SimulatedWindow",
+        executable: str = "simulated.exe",
+    ) -> WINDOW_HANDLE:
+        hwnd = WINDOW_HANDLE(self._next_hwnd)
+        self._next_hwnd += 4
+        if rect is None:
+            left, top, _, _ = self.monitors[monitor].work_area
+            rect = (left + 100, top + 100, left + 900, top + 700)
+        window = SimulatedWindow(
+            hwnd=hwnd,
+            title=title,
+            rect=rect,
+            virtual_desktop=self.virtual_desktop if virtual_desktop is None else virtual_desktop,
+            visible=False,
+            state_system_invisible=state_system_invisible,
+            class_name=class_name,
+            executable=executable,
+        )
+        self.windows[hwnd] = window
+        self.z_order.insert(0, hwnd)
+        self.emit(we.EVENT_OBJECT_CREATE, hwnd)
+        if visible:
+            self.show_window(hwnd, activate=activate)
+        return hwnd
+
+    def destroy_window(self, hwnd: int) -> None:
+        window = self._window(hwnd)
+        if window.visible:
+            self.hide_window(hwnd)
+        del self.windows[hwnd]
+        self.z_order.remove(hwnd)
+        self.emit(we.EVENT_OBJECT_DESTROY, hwnd)
+        self._activate_next()
+
+    def show_window(self, hwnd: int, activate: bool = True) -> None:
+        window = self._window(hwnd)
+        if not window.visible:
+            window.visible = True
+            self.emit(we.EVENT_OBJECT_SHOW, hwnd)
+        if activate and self._is_activatable(window):
+            self._set_foreground(window.hwnd)
+
+    def hide_window(self, hwnd: int) -> None:
+        window = self._window(hwnd)
+        if window.visible:
+            window.visible = False
+            self.emit(we.EVENT_OBJECT_HIDE, hwnd)
+            self._activate_next()
+
+    def move_window(self, hwnd: int, rect: RECT) -> None:
+        window = self._window(hwnd)
+        window.maximised = False
+        self._set_rect(window, rect)
+
+    def drag_window(self, hwnd: int, rect: RECT, steps: int = 10) -> None:
+        """A mouse drag, with a location change per frame in between the move/size start and end."""
+        window = self._window(hwnd)
+        self._set_foreground(window.hwnd)
+        self.emit(we.EVENT_SYSTEM_CAPTURESTART, hwnd)
+        self.emit(we.EVENT_SYSTEM_MOVESIZESTART, hwnd)
+        start = window.rect
+        for step in range(1, steps + 1):
+            self.advance(DRAG_STEP_MS)
+            self.move_window(
+                hwnd, typing.cast(RECT, tuple(a + (b - a) * step // steps for a, b in zip(start, rect)))
+            )
+        self.emit(we.EVENT_SYSTEM_MOVESIZEEND, hwnd)
+        self.emit(we.EVENT_SYSTEM_CAPTUREEND, hwnd)
+
+    def change_monitors(self, monitor_rects: typing.Sequence[RECT]) -> None:
+        """Docking, undocking or a resolution change, broadcast as `WM_DISPLAYCHANGE`.
+
+        Windows left off every monitor are moved onto the first one, before the broadcast.
+
+        """
+        self._set_monitors(monitor_rects)
+        left, top, _, _ = self.monitors[0].work_area
+        for window in self.windows.values():
+            w_left, w_top, w_right, w_bottom = window.rect
+            if not any(
+                min(w_right, right) > max(w_left, m_left) and min(w_bottom, bottom) > max(w_top, m_top)
+                for m_left, m_top, right, bottom in self._monitor_rects.values()
+            ):
+                width, height = w_right - w_left, w_bottom - w_top
+                self._set_rect(window, (left + 100, top + 100, left + 100 + width, top + 100 + height))
+        for sink in self._message_sinks:
+            sink(0, we.WM_DISPLAYCHANGE, 0)
+
+    def set_title(self, hwnd: int, title: str) -> None:
+        window = self._window(hwnd)
+        if window.title != title:
+            window.title = title
+            self.emit(we.EVENT_OBJECT_NAMECHANGE, hwnd)
+
+    def populate(
+        self, count: int, virtual_desktop: typing.Optional[int] = None
+    ) -> typing.List[WINDOW_HANDLE]:
+        """Open `count` windows spread over the monitors, as a starting point for a benchmark."""
+        return [
+            self.create_window(
+                title=f"Window {i}",
+                monitor=i % len(self.monitors),
+                virtual_desktop=virtual_desktop,
+                activate=False,
+            )
+            for i in range(count)
+        ]
+
+    def storm(self, count: int, seed: int = 0, interval_ms: int = 1) -> None:
+        """`count` location and name changes of random windows, the bulk of what a busy desktop sends."""
+        rng = random.Random(seed)
+        hwnds = sorted(self.windows)
+        for i in range(count):
+            self.advance(interval_ms)
+            window = self.windows[rng.choice(hwnds)]
+            if rng.random() < 0.1:
+                self.set_title(window.hwnd, f"{window.title.split(' #')[0]} #{i}")
+            else:
+                dx, dy = rng.randint(-20, 20), rng.randint(-20, 20)
+                left, top, right, bottom = window.rect
+                self.move_window(window.hwnd, (left + dx, top + dy, right + dx, bottom + dy))
+
+    def apply_win_event(self, win_event: int, hwnd: int) -> None:
+        """Silently bring the world in line with a recorded win event, for replays."""
+        if win_event == we.EVENT_OBJECT_DESTROY:
+            if self.windows.pop(hwnd, None) is not None:
+                self.z_order.remove(hwnd)
+            self._destroyed.add(WINDOW_HANDLE(hwnd))
+            return
+        if win_event == we.EVENT_OBJECT_SHOW:
+            # handles get reused
+            self._destroyed.discard(WINDOW_HANDLE(hwnd))
+        if (window := self._find(hwnd)) is None:
+            return
+        if win_event == we.EVENT_OBJECT_SHOW:
+            window.visible = True
+        elif win_event == we.EVENT_OBJECT_HIDE:
+            window.visible = False
+        elif win_event == we.EVENT_SYSTEM_MINIMIZESTART:
+            window.minimised = True
+        elif win_event == we.EVENT_SYSTEM_MINIMIZEEND:
+            window.minimised = False
+        elif win_event in (we.EVENT_OBJECT_CLOAKED, we.EVENT_OBJECT_UNCLOAKED):
+            window.cloaked = win_event == we.EVENT_OBJECT_CLOAKED
+        elif win_event in (we.EVENT_SYSTEM_FOREGROUND, we.EVENT_OBJECT_FOCUS):
+            self.foreground = window.hwnd
+
+    # window queries
+    def enum_windows(self) -> typing.List[WINDOW_HANDLE]:
+        return list(self.z_order)
+
+    def is_window(self, hwnd: int) -> bool:
+        return self._find(hwnd) is not None
+
+    def is_window_visible(self, hwnd: int) -> bool:
+        return (window := self._find(hwnd)) is not None and window.visible
+
+    def is_window_minimised(self, hwnd: int) -> bool:
+        return (window := self._find(hwnd)) is not None and window.minimised
+
+    def is_window_cloaked(self, hwnd: int) -> bool:
+        return (window := self._find(hwnd)) is not None and self._is_cloaked(window)
+
+    def is_window_state_system_invisible(self, hwnd: int) -> bool:
+        return (window := self._find(hwnd)) is not None and window.state_system_invisible
+
+    def get_window_text(self, hwnd: int) -> str:
+        return window.title if (window := self._find(hwnd)) is not None else ""
+
+    def get_window_rect(self, hwnd: int) -> RECT:
+        return self._window(hwnd).rect
+
+    def is_window_hung(self, hwnd: int) -> bool:
+        return (window := self._find(hwnd)) is not None and window.hung
+
+    def get_window_class_name(self, hwnd: int) -> str:
+        return window.class_name if (window := self._find(hwnd)) is not None else ""
+
+    def get_window_style(self, hwnd: int) -> int:
+        return window.style if (window := self._find(hwnd)) is not None else 0
+
+    def get_window_process_id(self, hwnd: int) -> int:
+        if (window := self._find(hwnd)) is None:
+            return 0
+        return self._process_ids.setdefault(window.executable, 1000 + 4 * len(self._process_ids))
+
+    def get_process_executable(self, process_id: int) -> str:
+        for executable, known_process_id in self._process_ids.items():
+            if known_process_id == process_id:
+                return f"C:\\Program Files\\{executable}"
+        return ""
+
+    # monitors
+    def enum_display_monitors(self) -> typing.List[MonitorInfo]:
+        return list(self.monitors)
+
+    def get_monitor_handle_from_window(self, hwnd: int) -> MONITOR_HANDLE:
+        if (window := self._find(hwnd)) is None:
+            # MonitorFromWindow returns NULL for an invalid hwnd
+            return MONITOR_HANDLE(0)
+        return self._monitor_of(window.rect).handle
+
+    # window operations
+    def raise_and_focus_window(self, hwnd: int) -> None:
+        self._set_foreground(self._operated_window(hwnd).hwnd)
+
+    def centre_mouse_in_rect(self, rect: RECT) -> None:
+        left, top, right, bottom = rect
+        self.cursor = (int((left + right) / 2), int((top + bottom) / 2))
+
+    def window_relative_move(
+        self, hwnd: int, from_coordinates: COORDINATES_ISH, to_coordinates: COORDINATES_ISH
+    ) -> None:
+        window = self._operated_window(hwnd)
+        dx, dy = to_coordinates[0] - from_coordinates[0], to_coordinates[1] - from_coordinates[1]
+        self._raise(window.hwnd)
+        if not (dx or dy):
+            return
+        left, top, right, bottom = window.restore_rect if window.maximised else window.rect
+        moved = (left + dx, top + dy, right + dx, bottom + dy)
+        if window.maximised:
+            window.restore_rect = moved
+            self._set_rect(window, self._monitor_of(moved).work_area)
+        else:
+            self._set_rect(window, moved)
+
+    def focus_desktop(self) -> None:
+        # The desktop window is not something we manage, nor does it report a foreground event we handle.
+        self.foreground = None
+
+    def window_max_toggle(self, hwnd: int) -> None:
+        window = self._operated_window(hwnd)
+        if window.maximised:
+            window.maximised = False
+            self._set_rect(window, window.restore_rect)
+        else:
+            window.restore_rect = window.rect
+            window.maximised = True
+            self._set_rect(window, self._monitor_of(window.rect).work_area)
+
+    def apply_window_rects(self, rects: typing.Dict[WINDOW_HANDLE, RECT]) -> None:
+        self.batches += 1
+        windows = [self._operated_window(hwnd) for hwnd in rects]
+        for window in windows:
+            window.maximised = False
+            window.minimised = False
+        # Everything is moved before any location change is reported, like EndDeferWindowPos.
+        for window in windows:
+            self._set_rect(window, rects[window.hwnd])
+
+    def minimise_window(self, hwnd: int) -> None:
+        window = self._operated_window(hwnd)
+        if not window.minimised:
+            window.minimised = True
+            self.emit(we.EVENT_SYSTEM_MINIMIZESTART, hwnd)
+            self._activate_next()
+
+    def restore_window(self, hwnd: int) -> None:
+        window = self._operated_window(hwnd)
+        if window.minimised:
+            window.minimised = False
+            self.emit(we.EVENT_SYSTEM_MINIMIZEEND, hwnd)
+
+    def toggle_pin_window(self, hwnd: int) -> None:
+        window = self._window(hwnd)
+        window.pinned = not window.pinned
+
+    # virtual desktops
+    def current_virtual_desktop(self) -> int:
+        return self.virtual_desktop
+
+    def virtual_desktop_count(self) -> int:
+        return self.virtual_desktops
+
+    def create_virtual_desktop(self) -> None:
+        self.virtual_desktops += 1
+
+    def go_to_virtual_desktop(self, number: int) -> None:
+        if not 1 <= number <= self.virtual_desktops:
+            raise ValueError(f"No virtual desktop {number}")
+        if number == self.virtual_desktop:
+            return
+        was_cloaked = {hwnd: self._is_cloaked(window) for hwnd, window in self.windows.items()}
+        self.virtual_desktop = number
+        for hwnd, window in self.windows.items():
+            if (cloaked := self._is_cloaked(window)) != was_cloaked[hwnd]:
+                self.emit(we.EVENT_OBJECT_CLOAKED if cloaked else we.EVENT_OBJECT_UNCLOAKED, hwnd)
+        self.foreground = None
+        self._activate_next()
+
+    def move_window_to_virtual_desktop(self, hwnd: int, number: int) -> None:
+        window = self._window(hwnd)
+        was_cloaked = self._is_cloaked(window)
+        window.virtual_desktop = number
+        if (cloaked := self._is_cloaked(window)) != was_cloaked:
+            self.emit(we.EVENT_OBJECT_CLOAKED if cloaked else we.EVENT_OBJECT_UNCLOAKED, hwnd)
+            self._activate_next()
+
+    # misc
+    def boot_time(self) -> float:
+        return self.booted_at
+
+    def on_console_interrupt(self, callback: typing.Callable[[], None]) -> None:
+        # No console, and the window manager is drained rather than run.
+        pass
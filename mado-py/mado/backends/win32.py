@@ -0,0 +1,318 @@
+﻿import ctypes
+import ctypes.wintypes
+import functools
+import time
+import typing
+
+import win32con
+import win32gui
+import win32process
+from win32api import EnumDisplayMonitors, GetMonitorInfo, SetConsoleCtrlHandler, SetCursorPos
+from win32gui import GetForegroundWindow
+
+from mado.backends import RECT, Backend, MonitorInfo
+from mado.types_ import COORDINATES_ISH, MONITOR_HANDLE, WINDOW_HANDLE
+
+if typing.TYPE_CHECKING:
+    import pynput.mouse
+
+
+class TITLEBARINFO(ctypes.Structure):  # noqa
+    _fields_ = [
+        ("cbSize", ctypes.wintypes.DWORD),
+        ("rcTitleBar", ctypes.wintypes.RECT),
+        ("rgstate", ctypes.wintypes.DWORD * 6),  # noqa
+    ]
+
+
+class Win32Backend(Backend):
+    """The real thing.
+
+    pyvda (i.e. its COM objects), the mouse controller and dwmapi are only loaded on first use, they are slow
+    to load and not every run needs them.
+
+    """
+
+    @functools.cached_property
+    def pyvda(self):
+        import pyvda
+
+        return pyvda
+
+    @functools.cached_property
+    def mouse(self) -> "pynput.mouse.Controller":
+        from pynput.mouse import Controller
+
+        return Controller()
+
+    @functools.cached_property
+    def dwmapi(self) -> ctypes.WinDLL:
+        return ctypes.WinDLL("dwmapi")
+
+    def release_left_mouse_button(self) -> None:
+        from pynput.mouse import Button
+
+        self.mouse.release(Button.left)
+
+    def enum_windows(self) -> typing.List[WINDOW_HANDLE]:
+        window_handles = []
+
+        def register_window(hwnd, lParam):  # noqa
+            window_handles.append(WINDOW_HANDLE(hwnd))
+
+        win32gui.EnumWindows(register_window, None)
+        return window_handles
+
+    def is_window(self, hwnd: int) -> bool:
+        return bool(win32gui.IsWindow(hwnd))
+
+    def is_window_visible(self, hwnd: int) -> bool:
+        return bool(win32gui.IsWindowVisible(hwnd))
+
+    def is_window_minimised(self, hwnd: int) -> bool:
+        return bool(win32gui.IsIconic(hwnd))
+
+    def is_window_cloaked(self, hwnd: int) -> bool:
+        res = ctypes.c_int(0)
+        # https://learn.microsoft.com/en-us/windows/win32/api/dwmapi/ne-dwmapi-dwmwindowattribute
+        DWMWA_CLOAKED = 14
+        self.dwmapi.DwmGetWindowAttribute(hwnd, DWMWA_CLOAKED, ctypes.byref(res), ctypes.sizeof(res))
+        return bool(res.value)
+
+    def is_window_state_system_invisible(self, hwnd: int) -> bool:
+        # Title Info Initialization
+        title_info = TITLEBARINFO()
+        title_info.cbSize = ctypes.sizeof(title_info)
+        ctypes.windll.user32.GetTitleBarInfo(hwnd, ctypes.byref(title_info))
+
+        return bool(title_info.rgstate[0] & win32con.STATE_SYSTEM_INVISIBLE)
+
+    def get_window_text(self, hwnd: int) -> str:
+        return win32gui.GetWindowText(hwnd)
+
+    def get_window_rect(self, hwnd: int) -> RECT:
+        # https://learn.microsoft.com/en-us/windows/win32/api/dwmapi/ne-dwmapi-dwmwindowattribute
+        DWMWA_EXTENDED_FRAME_BOUNDS = 9
+        res = ctypes.wintypes.RECT()
+        status = self.dwmapi.DwmGetWindowAttribute(
+            hwnd, DWMWA_EXTENDED_FRAME_BOUNDS, ctypes.byref(res), ctypes.sizeof(res)
+        )
+        if status != 0:
+            res = win32gui.GetWindowRect(hwnd)
+        else:
+            res = (res.left, res.top, res.right, res.bottom)
+
+        return res
+
+    def is_window_hung(self, hwnd: int) -> bool:
+        return bool(ctypes.windll.user32.IsHungAppWindow(hwnd))
+
+    def get_window_class_name(self, hwnd: int) -> str:
+        return win32gui.GetClassName(hwnd)
+
+    def get_window_style(self, hwnd: int) -> int:
+        return win32gui.GetWindowLong(hwnd, win32con.GWL_STYLE)
+
+    def get_window_process_id(self, hwnd: int) -> int:
+        return win32process.GetWindowThreadProcessId(hwnd)[1]
+
+    def get_process_executable(self, process_id: int) -> str:
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        kernel32 = ctypes.windll.kernel32
+        process = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, process_id)
+        if not process:
+            return ""
+        try:
+            size = ctypes.wintypes.DWORD(1024)
+            buffer = ctypes.create_unicode_buffer(size.value)
+            if not kernel32.QueryFullProcessImageNameW(process, 0, buffer, ctypes.byref(size)):
+                return ""
+            return buffer.value
+        finally:
+            kernel32.CloseHandle(process)
+
+    def enum_display_monitors(self) -> typing.List[MonitorInfo]:
+        monitors = []
+        for monitor_handle, _, _ in EnumDisplayMonitors():
+            monitor_info = GetMonitorInfo(monitor_handle)
+            monitors.append(
+                MonitorInfo(
+                    handle=MONITOR_HANDLE(int(monitor_handle)),
+                    rect=monitor_info["Monitor"],
+                    work_area=monitor_info["Work"],
+                    name=monitor_info["Device"].replace("\\\\.\\", ""),
+                )
+            )
+        return monitors
+
+    def get_monitor_handle_from_window(self, hwnd: int) -> MONITOR_HANDLE:
+        return MONITOR_HANDLE(ctypes.windll.user32.MonitorFromWindow(hwnd, win32con.MONITOR_DEFAULTTONEAREST))
+
+    def raise_and_focus_window(self, hwnd: int) -> None:
+        foreground = GetForegroundWindow()
+        if foreground == hwnd:
+            return
+        # send a dummy input to pass check, otherwise we can't focus the window for some reason.
+        # ideally we should send a completely bogus input but i can't figure out how.
+        self.release_left_mouse_button()
+
+        win32gui.SetWindowPos(
+            hwnd,
+            win32con.HWND_TOP,
+            0,
+            0,
+            0,
+            0,
+            win32con.SWP_NOSIZE | win32con.SWP_NOMOVE | win32con.SWP_SHOWWINDOW,
+        )
+        win32gui.SetForegroundWindow(hwnd)
+
+    def centre_mouse_in_rect(self, rect: RECT) -> None:
+        left, top, right, bottom = rect
+        pos = (
+            int((left + right) / 2),
+            int((top + bottom) / 2),
+        )
+        SetCursorPos(pos)
+
+    def window_relative_move(
+        self, hwnd: int, from_coordinates: COORDINATES_ISH, to_coordinates: COORDINATES_ISH
+    ) -> None:
+        offsets = (
+            to_coordinates[0] - from_coordinates[0],
+            to_coordinates[1] - from_coordinates[1],
+        )
+        requires_move = any(offsets)
+
+        is_maximised = win32gui.GetWindowPlacement(hwnd)[1] == win32con.SW_SHOWMAXIMIZED
+        # We restore here because just setting the window pos while it being maximised causes weird issue
+        # later e.g. upon minimised and maximised, it will be sent back to the original screen in the real
+        # world.
+        if is_maximised and requires_move:
+            win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
+
+        rect = self.get_window_rect(hwnd)
+        if requires_move:
+            win32gui.SetWindowPos(
+                hwnd,
+                win32con.HWND_TOP,
+                rect[0] + offsets[0],
+                rect[1] + offsets[1],
+                0,
+                0,
+                win32con.SWP_NOSIZE,
+            )
+        else:
+            win32gui.SetWindowPos(
+                hwnd,
+                win32con.HWND_TOP,
+                0,
+                0,
+                0,
+                0,
+                win32con.SWP_NOSIZE | win32con.SWP_NOMOVE,
+            )
+
+        if is_maximised and requires_move:
+            win32gui.ShowWindow(hwnd, win32con.SW_MAXIMIZE)
+
+    def focus_desktop(self) -> None:
+        # send a dummy input to pass check, otherwise we can't focus the window for some reason.
+        # ideally we should send a completely bogus input but i can't figure out how.
+        self.release_left_mouse_button()
+        win32gui.SetForegroundWindow(win32gui.GetDesktopWindow())
+
+    def window_max_toggle(self, hwnd: int) -> None:
+        is_maximised = win32gui.GetWindowPlacement(hwnd)[1] == win32con.SW_SHOWMAXIMIZED
+        if is_maximised:
+            win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
+        else:
+            win32gui.ShowWindow(hwnd, win32con.SW_MAXIMIZE)
+
+    def apply_window_rects(self, rects: typing.Dict[WINDOW_HANDLE, RECT]) -> None:
+        user32 = ctypes.windll.user32
+        user32.BeginDeferWindowPos.restype = ctypes.wintypes.HANDLE
+        user32.DeferWindowPos.restype = ctypes.wintypes.HANDLE
+        user32.DeferWindowPos.argtypes = [
+            ctypes.wintypes.HANDLE,
+            ctypes.wintypes.HWND,
+            ctypes.wintypes.HWND,
+            ctypes.c_int,
+            ctypes.c_int,
+            ctypes.c_int,
+            ctypes.c_int,
+            ctypes.wintypes.UINT,
+        ]
+        flags = win32con.SWP_NOZORDER | win32con.SWP_NOOWNERZORDER | win32con.SWP_NOACTIVATE
+
+        positions = []
+        for hwnd, (left, top, right, bottom) in rects.items():
+            # A hung window would block the whole batch.
+            if self.is_window_hung(hwnd):
+                continue
+            if win32gui.GetWindowPlacement(hwnd)[1] != win32con.SW_SHOWNORMAL:
+                win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
+            # SetWindowPos takes the window rect, larger than the visible frame by the invisible borders.
+            w_left, w_top, w_right, w_bottom = win32gui.GetWindowRect(hwnd)
+            f_left, f_top, f_right, f_bottom = self.get_window_rect(hwnd)
+            left -= f_left - w_left
+            top -= f_top - w_top
+            right += w_right - f_right
+            bottom += w_bottom - f_bottom
+            positions.append((hwnd, left, top, right - left, bottom - top))
+
+        hdwp = user32.BeginDeferWindowPos(len(positions))
+        for hwnd, x, y, cx, cy in positions:
+            if not hdwp:
+                break
+            hdwp = user32.DeferWindowPos(hdwp, hwnd, None, x, y, cx, cy, flags)
+        if hdwp:
+            user32.EndDeferWindowPos(hdwp)
+        else:
+            # DeferWindowPos destroys the whole batch on failure, fall back to moving one by one.
+            for hwnd, x, y, cx, cy in positions:
+                win32gui.SetWindowPos(hwnd, 0, x, y, cx, cy, flags)
+
+    def minimise_window(self, hwnd: int) -> None:
+        win32gui.ShowWindow(hwnd, win32con.SW_MINIMIZE)
+
+    def restore_window(self, hwnd: int) -> None:
+        win32gui.ShowWindow(hwnd, win32con.SW_SHOWNOACTIVATE)
+
+    def toggle_pin_window(self, hwnd: int) -> None:
+        view = self.pyvda.AppView(hwnd)
+        if view.is_pinned():
+            view.unpin()
+        else:
+            view.pin()
+
+    def current_virtual_desktop(self) -> int:
+        return self.pyvda.VirtualDesktop.current().number
+
+    def virtual_desktop_count(self) -> int:
+        return len(self.pyvda.get_virtual_desktops())
+
+    def create_virtual_desktop(self) -> None:
+        self.pyvda.VirtualDesktop.create()
+
+    def go_to_virtual_desktop(self, number: int) -> None:
+        self.pyvda.VirtualDesktop(number=number).go()
+
+    def move_window_to_virtual_desktop(self, hwnd: int, number: int) -> None:
+        self.pyvda.AppView(hwnd=hwnd).move(self.pyvda.VirtualDesktop(number=number))
+
+    def boot_time(self) -> float:
+        # `GetTickCount` wraps after 49.7 days.
+        kernel32 = ctypes.windll.kernel32
+        kernel32.GetTickCount64.restype = ctypes.c_ulonglong
+        return time.time() - kernel32.GetTickCount64() / 1000
+
+    def on_console_interrupt(self, callback: typing.Callable[[], None]) -> None:
+        def handler(ctrl_type: int) -> bool:
+            if ctrl_type not in (win32con.CTRL_C_EVENT, win32con.CTRL_BREAK_EVENT):
+                return False
+            callback()
+            # Handled, instead of the KeyboardInterrupt a blocked lock acquire wouldn't see anyway.
+            return True
+
+        SetConsoleCtrlHandler(handler, True)
@@ -0,0 +1,96 @@
+﻿"""Send commands to a running mado, e.g. `mado-cli "FocusScreen MID" "SetLayout columns"`, see `mado.ipc`.
+
+The port and the token to authenticate with are read from the file the command server writes on start, so it
+has to be enabled with `IPC_PORT`.
+
+The results of queries, e.g. `mado-cli "query state"`, are printed one per line. `mado-cli --subscribe` prints
+the state feed instead, see `mado.feed`, which has to be enabled with `FEED_PORT`.
+
+"""
+
+import argparse
+import socket
+import sys
+import typing
+
+from mado.config import FEED_PORT, IPC_CREDENTIALS_PATH
+from mado.ipc import ENCODING, read_credentials
+
+
+def send_commands(
+    lines: typing.List[str],
+    port: typing.Optional[int] = None,
+    credentials_path: str = IPC_CREDENTIALS_PATH,
+) -> typing.List[str]:
+    """Send all the commands at once, then read their responses, in the same order.
+
+    Raises `PermissionError` if mado doesn't take the token of `credentials_path`.
+
+    """
+    saved_port, token = read_credentials(credentials_path)
+    with socket.create_connection(("127.0.0.1", port or saved_port)) as connection:
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection.sendall("".join(f"{line}\n" for line in [f"auth {token}", *lines]).encode(ENCODING))
+        connection.shutdown(socket.SHUT_WR)
+        with connection.makefile("r", encoding=ENCODING) as file:
+            responses = [response.rstrip("\n") for response in file]
+    if not responses or responses[0] != "ok":
+        raise PermissionError(responses[0] if responses else "connection closed before authenticating")
+    return responses[1:]
+
+
+def subscribe(port: int) -> None:
+    """Print the state feed as it comes, until mado goes away."""
+    with socket.create_connection(("127.0.0.1", port)) as connection:
+        with connection.makefile("r", encoding=ENCODING) as messages:
+            for message in messages:
+                print(message, end="", flush=True)
+
+
+def run():
+    parser = argparse.ArgumentParser(prog="mado-cli", description=__doc__)
+    parser.add_argument("commands", nargs="*", help="commands, one per argument, read from stdin if none")
+    parser.add_argument(
+        "--port", type=int, default=None, help="defaults to the one mado wrote, or FEED_PORT to subscribe"
+    )
+    parser.add_argument(
+        "--subscribe", action="store_true", help="print the state feed instead of sending commands"
+    )
+    args = parser.parse_args()
+
+    if args.subscribe:
+        port = args.port or FEED_PORT
+        if port is None:
+            print("Nothing to subscribe to, set FEED_PORT or pass --port", file=sys.stderr)
+            sys.exit(2)
+        try:
+            subscribe(port)
+        except KeyboardInterrupt:
+            pass
+        except OSError as exc:
+            print(f"Can't reach mado on port {port}: {exc}", file=sys.stderr)
+            sys.exit(2)
+        return
+
+    lines = args.commands or [line.strip() for line in sys.stdin if line.strip()]
+    try:
+        responses = send_commands(lines, args.port)
+    except OSError as exc:
+        print(f"Can't reach mado, is IPC_PORT set? {exc}", file=sys.stderr)
+        sys.exit(2)
+
+    failed = False
+    for line, response in zip(lines, responses):
+        if response.startswith("ok "):
+            print(response[len("ok ") :])
+        elif response != "ok":
+            failed = True
+            print(f"{line}: {response}", file=sys.stderr)
+    if len(responses) < len(lines):
+        failed = True
+        print(f"Only {len(responses)} of {len(lines)} commands were answered", file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,122 @@
+﻿"""Fixed-size binary encoding of window manager events and commands.
+
+Every item is `RECORD_SIZE` bytes, so a stream of them can be sought, rotated and shared without framing. Type
+codes are positions in `EVENT_TYPES`/`COMMAND_TYPES`, only ever append to those.
+
+"""
+
+import dataclasses
+import enum
+import struct
+import typing
+
+from mado.types_ import WINDOW_HANDLE
+from mado.window_manager import commands
+from mado.window_manager import events
+
+EVENT_TYPES: typing.Tuple[typing.Type[events.WindowManagerEvent], ...] = (
+    events.Destroy,
+    events.FocusChange,
+    events.Hide,
+    events.Cloak,
+    events.Minimise,
+    events.Show,
+    events.Uncloak,
+    events.MoveResizeStart,
+    events.MoveResizeEnd,
+    events.MouseCapture,
+    events.Moved,
+    events.NameChange,
+    events.DisplayChange,
+)
+COMMAND_TYPES: typing.Tuple[typing.Type[commands.WindowManagerCommand], ...] = (
+    commands.FocusVirtualDesktop,
+    commands.SendToVirtualDesktop,
+    commands.StateDump,
+    commands.CycleFocusedWindow,
+    commands.Minimise,
+    commands.ToggleMaximise,
+    commands.MoveToScreen,
+    commands.SendToScreen,
+    commands.FocusScreen,
+    commands.RecreateState,
+    commands.TogglePinWindow,
+    commands.Noop,
+    commands.SetLayout,
+    commands.DumpFlightRecorder,
+    commands.FocusPrevious,
+    commands.CycleMRU,
+    commands.FocusDirection,
+    commands.SwapDirection,
+)
+_EVENT_CODES = {type_: code for code, type_ in enumerate(EVENT_TYPES)}
+_COMMAND_CODES = {type_: code for code, type_ in enumerate(COMMAND_TYPES)}
+
+KIND_EVENT = 1
+KIND_COMMAND = 2
+
+FLAG_HAS_TIMESTAMP = 0x01
+
+TEXT_SIZE = 12
+# kind, type code, flags, win event, hwnd or integer argument, event timestamp, text argument
+_RECORD = struct.Struct(f"<BBBxIqI{TEXT_SIZE}s")
+RECORD_SIZE = _RECORD.size
+
+
+class UnsupportedItem(ValueError):
+    """The item, or one of its arguments, has no binary encoding."""
+
+
+def encode(item: typing.Any) -> bytes:
+    if isinstance(item, events.WindowManagerEvent):
+        code = _EVENT_CODES.get(type(item))
+        if code is None:
+            raise UnsupportedItem(item)
+        flags = 0 if item.timestamp is None else FLAG_HAS_TIMESTAMP
+        return _RECORD.pack(KIND_EVENT, code, flags, item.win_event or 0, item.hwnd, item.timestamp or 0, b"")
+
+    if isinstance(item, commands.IpcCommand):
+        item = item.command
+    if isinstance(item, commands.WindowManagerCommand):
+        code = _COMMAND_CODES.get(type(item))
+        if code is None:
+            raise UnsupportedItem(item)
+        integer, text = 0, b""
+        for field in dataclasses.fields(item):
+            value = getattr(item, field.name)
+            if isinstance(value, enum.Enum):
+                integer = value.value
+            elif isinstance(value, int):
+                integer = value
+            elif isinstance(value, str) and len(text := value.encode("utf-8")) <= TEXT_SIZE:
+                pass
+            else:
+                raise UnsupportedItem(item)
+        return _RECORD.pack(KIND_COMMAND, code, 0, 0, integer, 0, text)
+
+    raise UnsupportedItem(item)
+
+
+def decode(data: bytes) -> typing.Any:
+    kind, code, flags, win_event, integer, timestamp, text = _RECORD.unpack(data)
+
+    if kind == KIND_EVENT:
+        return EVENT_TYPES[code](
+            win_event or None,
+            WINDOW_HANDLE(integer),
+            timestamp if flags & FLAG_HAS_TIMESTAMP else None,
+        )
+
+    if kind == KIND_COMMAND:
+        command_type = COMMAND_TYPES[code]
+        kwargs = {}
+        for field in dataclasses.fields(command_type):
+            if isinstance(field.type, type) and issubclass(field.type, enum.Enum):
+                kwargs[field.name] = field.type(integer)
+            elif field.type is int:
+                kwargs[field.name] = integer
+            else:
+                kwargs[field.name] = text.rstrip(b"\0").decode("utf-8")
+        return command_type(**kwargs)
+
+    raise ValueError(f"Unknown record kind {kind}")
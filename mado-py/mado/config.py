@@ -1,4 +1,8 @@
-﻿from mado.types_ import SCREEN_ID, VIRTUAL_DESKTOP_ID
+﻿import os
+import re
+
+from mado.types_ import SCREEN_ID, VIRTUAL_DESKTOP_ID
+from mado.window_rules import Action, WindowRule
 
 VIRTUAL_DESKTOP_IDS = [
     VIRTUAL_DESKTOP_ID(1),  # Editor
@@ -34,6 +38,59 @@ IGNORED_WINDOW_TITLES = {
     "Chrome Legacy Window",
 }
 
+# What to do with the windows matching, the first matching rule wins, see `mado.window_rules`. E.g.
+# `WindowRule(Action.pin, executable="spotify.exe", virtual_desktop_id=4)`
+# or `WindowRule(Action.float, class_name="#32770")`.
+WINDOW_RULES = [
+    *(WindowRule(Action.ignore, title=f"^{re.escape(title)}$") for title in sorted(IGNORED_WINDOW_TITLES)),
+]
+
 MOUSE_FOLLOWS_FOCUS = True
 
 DEFAULT_ORIGIN = (0, 0)
+
+# Log the window registration and focus hot paths at debug level, read at import so it costs nothing when off.
+TRACE = False
+# Number of the last events, commands and state transitions kept in memory, dumped on errors.
+FLIGHT_RECORDER_SIZE = 4096
+
+# Accept commands from `mado-cli` (or anything else) on this localhost port, see `mado.ipc`. Off unless set,
+# e.g. to 47017, 0 picks a free port.
+IPC_PORT = None
+# Where the command server writes its port and the token clients authenticate with, for `mado-cli`.
+IPC_CREDENTIALS_PATH = os.path.join(os.path.expanduser("~"), ".mado-ipc.json")
+# Seconds an IPC client waits for a command to be handled before it is answered with an error.
+IPC_COMMAND_TIMEOUT = 5.0
+
+# Stream the state to subscribers (e.g. status bars) on this localhost port, see `mado.feed`. Off unless set,
+# e.g. to 47018. Any local process can subscribe, and the feed has the handle of every window managed.
+FEED_PORT = None
+# Deltas sent to a subscriber at once before sending it the whole state instead, e.g. when it fell behind.
+FEED_MAX_DELTAS = 64
+
+# Capture the keyboard in a process of its own, so the hook never waits on the window manager, see
+# `mado.keyboard_process`.
+ISOLATED_KEYBOARD = False
+# Keybind commands the keyboard process can have in flight to the window manager, a power of two.
+KEYBOARD_RING_CAPACITY = 256
+
+# Serve metrics in the Prometheus text format on this localhost port, and/or write them to this file.
+METRICS_PORT = None
+METRICS_FILE = None
+METRICS_FILE_INTERVAL = 5.0
+
+# Tiling layouts: pixels between windows (and around the work area), and the share of the master window.
+LAYOUT_GAP = 0
+LAYOUT_MASTER_RATIO = 0.55
+
+# Window operations run on this many worker threads, and are given up on after this many seconds.
+WINDOW_OPERATION_WORKERS = 2
+WINDOW_OPERATION_TIMEOUT = 1.0
+
+# Rotation of the event journal recorded with `mado-run --journal`.
+JOURNAL_MAX_BYTES = 64 * 1024 * 1024
+JOURNAL_BACKUP_COUNT = 3
+
+# Snapshot of the screens and their windows, saved at most every this many seconds for warm restarts.
+STATE_SNAPSHOT_PATH = os.path.join(os.path.expanduser("~"), ".mado-state.json")
+STATE_SNAPSHOT_INTERVAL = 10.0
@@ -0,0 +1,127 @@
+﻿"""State feed for status bars and other subscribers, pushed instead of polled.
+
+A subscriber connects to the localhost port `FEED_PORT` and reads JSON objects, one per line. The first one is
+the whole state (`"type": "snapshot"`, the fields of `StateSnapshot.to_dict`), the next ones are the deltas of
+`mado.window_manager.state_snapshot.diff` as the state changes, each with the `version` it brings them to.
+The feed is off unless `FEED_PORT` is set, there is no authentication so any local process can subscribe.
+
+Subscribers never hold up the event loop: it only wakes them once it published a new snapshot. Each subscriber
+keeps the last snapshot it sent and diffs it against the latest one when it gets to write, so one which fell
+behind gets the deltas merged (a window opened and closed in between is never mentioned), and the whole state
+again once they would be more than `FEED_MAX_DELTAS`. Nothing is queued per subscriber but the socket buffer.
+
+"""
+
+import json
+import socket
+import socketserver
+import threading
+import typing
+
+from loguru import logger
+
+from mado.config import FEED_MAX_DELTAS
+from mado.ipc import ENCODING
+from mado.window_manager import state_snapshot
+from mado.window_manager.state_snapshot import StateSnapshot
+
+
+def _line(message: typing.Dict[str, typing.Any]) -> bytes:
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode(ENCODING)
+
+
+def snapshot_message(snapshot: StateSnapshot) -> bytes:
+    return _line({"type": "snapshot", **snapshot.to_dict()})
+
+
+def delta_messages(
+    sent: StateSnapshot, latest: StateSnapshot, max_deltas: int = FEED_MAX_DELTAS
+) -> typing.List[bytes]:
+    """What brings a subscriber from `sent` to `latest`, the whole state instead of more than `max_deltas`."""
+    deltas = state_snapshot.diff(sent, latest)
+    if len(deltas) > max_deltas:
+        return [snapshot_message(latest)]
+    return [_line({**delta, "version": latest.version}) for delta in deltas]
+
+
+class FeedServer(threading.Thread):
+    """Serve the `mado.feed` on a localhost port, from the snapshots the window manager publishes."""
+
+    def __init__(
+        self,
+        port: int,
+        snapshot_source: typing.Callable[[], StateSnapshot],
+        max_deltas: int = FEED_MAX_DELTAS,
+    ) -> None:
+        super().__init__(daemon=True)
+        self.snapshot_source = snapshot_source
+        self.max_deltas = max_deltas
+        self._published = threading.Condition()
+        self.stopped = False
+        # the last messages computed, which the subscribers keeping up all need
+        self._last_messages: typing.Tuple[typing.Any, typing.Any, typing.List[bytes]] = (None, None, [])
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", port), self._make_handler())
+        self.server.daemon_threads = True
+
+    def run(self) -> None:
+        logger.info("Serving the state feed on 127.0.0.1:{}", self.server.server_address[1])
+        self.server.serve_forever()
+
+    def notify(self) -> None:
+        """A new snapshot was published, called from the event loop."""
+        with self._published:
+            self._published.notify_all()
+
+    def stop(self) -> None:
+        self.stopped = True
+        self.notify()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def wait_for_change(self, sent: StateSnapshot, cancelled: typing.Callable[[], bool]) -> StateSnapshot:
+        with self._published:
+            self._published.wait_for(
+                lambda: self.stopped or cancelled() or self.snapshot_source() is not sent
+            )
+        return self.snapshot_source()
+
+    def messages(self, sent: StateSnapshot, latest: StateSnapshot) -> typing.List[bytes]:
+        last_sent, last_latest, messages = self._last_messages
+        if last_sent is not sent or last_latest is not latest:
+            messages = delta_messages(sent, latest, self.max_deltas)
+            self._last_messages = (sent, latest, messages)
+        return messages
+
+    def _make_handler(self) -> typing.Type[socketserver.StreamRequestHandler]:
+        feed_server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            wbufsize = -1
+
+            def handle(self) -> None:
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                # Subscribers don't send anything, reading only finds out when they go away.
+                self.disconnected = False
+                threading.Thread(target=self.watch_disconnect, daemon=True).start()
+                sent = feed_server.snapshot_source()
+                messages = [snapshot_message(sent)]
+                try:
+                    while not feed_server.stopped and not self.disconnected:
+                        self.wfile.writelines(messages)
+                        self.wfile.flush()
+                        latest = feed_server.wait_for_change(sent, lambda: self.disconnected)
+                        messages = feed_server.messages(sent, latest)
+                        sent = latest
+                except OSError:
+                    return
+
+            def watch_disconnect(self) -> None:
+                try:
+                    while self.rfile.read(4096):
+                        pass
+                except OSError:
+                    pass
+                self.disconnected = True
+                feed_server.notify()
+
+        return Handler
@@ -0,0 +1,38 @@
+﻿import collections
+import time
+import typing
+
+from mado.config import FLIGHT_RECORDER_SIZE
+
+
+class FlightRecorder:
+    """The last events, commands and state transitions, kept as tuples and only formatted when dumped.
+
+    Always on, recording is a tuple and a bounded deque append. Recording happens on the event loop thread,
+    dumps may come from any thread.
+
+    """
+
+    def __init__(self, size: int) -> None:
+        # (monotonic ns, kind, details)
+        self.entries: typing.Deque[typing.Tuple[int, str, tuple]] = collections.deque(maxlen=size)
+
+    def record(self, kind: str, *details: typing.Any) -> None:
+        self.entries.append((time.monotonic_ns(), kind, details))
+
+    def dump(self) -> str:
+        # Formatting calls `str` on the details, Python code during which the event loop thread can append,
+        # which would fail iterating the deque itself with "deque mutated during iteration". `copy` runs in C
+        # without calling back into Python, so nothing else runs while it copies.
+        entries = self.entries.copy()
+        if not entries:
+            return "(empty)"
+        last = entries[-1][0]
+        return "\n".join(
+            f"{(recorded_at - last) / 1e6:>+12.3f}ms {kind:<14}"
+            f" {' '.join(str(getattr(detail, '__name__', detail)) for detail in details)}"
+            for recorded_at, kind, details in entries
+        )
+
+
+FLIGHT_RECORDER = FlightRecorder(FLIGHT_RECORDER_SIZE)
@@ -0,0 +1,233 @@
+﻿"""Local command server, which `mado-cli` talks to.
+
+The server is off unless `IPC_PORT` is set. On start it writes its port and a new random token to
+`IPC_CREDENTIALS_PATH`, readable by the current user only, and the first line of a connection has to be
+`auth <token>`: anything else, e.g. a web page posting to the port, gets the connection closed without a
+command being queued. So does the first request which doesn't parse.
+
+The protocol is line based. A request is a command name followed by its arguments, e.g. `FocusScreen MID`,
+`SetLayout columns` or `CycleFocusedWindow forward`. Every request is answered with `ok` or `error <reason>`,
+in request order. Requests are queued as soon as they are read, so a client can pipeline as many as it likes
+and read the responses afterwards.
+
+`query state` is answered with `ok` followed by the last published state snapshot as JSON, and `query version`
+with `ok` followed by its version, see `mado.window_manager.state_snapshot`. Queries are answered from the
+snapshot without going through the event loop, once the responses of the requests before them are written, so
+they see the effect of the commands pipelined before them.
+
+"""
+
+import concurrent.futures
+import dataclasses
+import enum
+import hmac
+import json
+import os
+import queue
+import secrets
+import socket
+import socketserver
+import threading
+import typing
+
+from loguru import logger
+
+from mado import codec
+from mado.config import IPC_CREDENTIALS_PATH, SCREEN_IDS, VIRTUAL_DESKTOP_IDS
+from mado.window_manager import commands
+from mado.window_manager.state_snapshot import StateSnapshot
+
+ENCODING = "utf-8"
+
+COMMAND_TYPES_BY_NAME: typing.Dict[str, typing.Type[commands.WindowManagerCommand]] = {
+    command_type.__name__: command_type for command_type in codec.COMMAND_TYPES
+}
+
+QUERIES = ("state", "version")
+
+# Arguments which only take configured values, anything else would fail in the event loop instead.
+ALLOWED_VALUES: typing.Dict[str, typing.Sequence[typing.Any]] = {
+    "screen_id": SCREEN_IDS,
+    "virtual_desktop_id": VIRTUAL_DESKTOP_IDS,
+}
+
+_END = object()
+
+
+def write_credentials(path: str, port: int) -> str:
+    """Write `port` and a new token to `path`, readable by the current user only, and return the token."""
+    token = secrets.token_hex(16)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    # Created exclusively, so the mode applies even if another user raced us to the path.
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding=ENCODING) as file:
+        json.dump({"port": port, "token": token}, file)
+    return token
+
+
+def read_credentials(path: str = IPC_CREDENTIALS_PATH) -> typing.Tuple[int, str]:
+    with open(path, encoding=ENCODING) as file:
+        credentials = json.load(file)
+    return credentials["port"], credentials["token"]
+
+
+def parse_command(line: str) -> commands.WindowManagerCommand:
+    """`FocusScreen MID` to `FocusScreen(screen_id="MID")`, raises `ValueError` for anything else."""
+    name, *args = line.split()
+    command_type = COMMAND_TYPES_BY_NAME.get(name)
+    if command_type is None:
+        raise ValueError(f"unknown command {name}")
+    fields = dataclasses.fields(command_type)
+    if len(args) != len(fields):
+        raise ValueError(f"{name} takes {len(fields)} arguments, got {len(args)}")
+
+    kwargs = {}
+    for field, arg in zip(fields, args):
+        if isinstance(field.type, type) and issubclass(field.type, enum.Enum):
+            try:
+                kwargs[field.name] = field.type[arg]
+            except KeyError:
+                raise ValueError(f"{field.name} is one of {', '.join(field.type.__members__)}") from None
+        elif field.type is int:
+            kwargs[field.name] = int(arg)
+        else:
+            kwargs[field.name] = arg
+        allowed = ALLOWED_VALUES.get(field.name)
+        if allowed is not None and kwargs[field.name] not in allowed:
+            raise ValueError(f"{field.name} is one of {', '.join(map(str, allowed))}")
+    return command_type(**kwargs)
+
+
+def format_result(future: concurrent.futures.Future, timeout: float) -> str:
+    try:
+        result = future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        return "error timed out"
+    except Exception as exc:  # noqa
+        return f"error {type(exc).__name__}: {exc}".replace("\n", " ")
+    return "ok" if result is None else f"ok {result}"
+
+
+def answer_query(line: str, snapshot: typing.Optional[StateSnapshot]) -> concurrent.futures.Future:
+    """`query state` or `query version`, from `snapshot`."""
+    future = concurrent.futures.Future()
+    what = line.split()[1]
+    if snapshot is None:
+        future.set_exception(ValueError("no state snapshot to query"))
+    elif what == "state":
+        future.set_result(json.dumps(snapshot.to_dict(), separators=(",", ":")))
+    else:
+        future.set_result(snapshot.version)
+    return future
+
+
+def failed(exc: Exception) -> concurrent.futures.Future:
+    future = concurrent.futures.Future()
+    future.set_exception(exc)
+    return future
+
+
+class IpcServer(threading.Thread):
+    """Serve `mado.ipc` requests on a localhost port, feeding them to the event loop like keybinds."""
+
+    def __init__(
+        self,
+        event_queue: queue.Queue,
+        port: int,
+        command_timeout: float,
+        snapshot_source: typing.Optional[typing.Callable[[], StateSnapshot]] = None,
+        credentials_path: str = IPC_CREDENTIALS_PATH,
+    ) -> None:
+        super().__init__(daemon=True)
+        self.event_queue = event_queue
+        self.command_timeout = command_timeout
+        self.snapshot_source = snapshot_source
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", port), self._make_handler())
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.credentials_path = credentials_path
+        self.token = write_credentials(credentials_path, self.port)
+
+    def run(self) -> None:
+        logger.info("Accepting commands on 127.0.0.1:{}, credentials in {}", self.port, self.credentials_path)
+        self.server.serve_forever()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        try:
+            os.remove(self.credentials_path)
+        except OSError:
+            pass
+
+    def authenticate(self, line: str) -> bool:
+        name, _, token = line.strip().partition(" ")
+        return name == "auth" and hmac.compare_digest(token.encode(ENCODING), self.token.encode(ENCODING))
+
+    def submit(
+        self, line: str
+    ) -> typing.Union[concurrent.futures.Future, typing.Callable[[], concurrent.futures.Future]]:
+        """The future of the response, or for a query a function answering it once the requests before it are.
+
+        Raises `ValueError` if `line` doesn't parse.
+
+        """
+        name, *args = line.split()
+        if name == "query":
+            if len(args) != 1 or args[0] not in QUERIES:
+                raise ValueError(f"query one of {', '.join(QUERIES)}")
+            return lambda: answer_query(line, self.snapshot_source() if self.snapshot_source else None)
+        command = commands.IpcCommand(parse_command(line))
+        self.event_queue.put(command)
+        return command.future
+
+    def _make_handler(self) -> typing.Type[socketserver.StreamRequestHandler]:
+        ipc_server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            # Buffered, flushed once no more results are queued, so pipelined responses go out in batches.
+            wbufsize = -1
+
+            def handle(self) -> None:
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                if not ipc_server.authenticate(self.rfile.readline().decode(ENCODING, errors="replace")):
+                    logger.warning(
+                        "Closing IPC connection from {}, it didn't authenticate", self.client_address
+                    )
+                    self.wfile.write(b"error not authenticated\n")
+                    return
+                self.wfile.write(b"ok\n")
+                self.wfile.flush()
+                # Answered by another thread, so reading and queueing the next request never waits.
+                results: queue.SimpleQueue = queue.SimpleQueue()
+                writer = threading.Thread(target=self.write_results, args=(results,), daemon=True)
+                writer.start()
+                try:
+                    for raw_line in self.rfile:
+                        if not (line := raw_line.decode(ENCODING, errors="replace").strip()):
+                            continue
+                        try:
+                            results.put(ipc_server.submit(line))
+                        except ValueError as exc:
+                            results.put(failed(exc))
+                            break
+                finally:
+                    results.put(_END)
+                    writer.join()
+
+            def write_results(self, results: queue.SimpleQueue) -> None:
+                while (future := results.get()) is not _END:
+                    if callable(future):
+                        future = future()
+                    response = format_result(future, ipc_server.command_timeout) + "\n"
+                    try:
+                        self.wfile.write(response.encode(ENCODING))
+                        if results.empty():
+                            self.wfile.flush()
+                    except OSError:
+                        return
+
+        return Handler
@@ -0,0 +1,111 @@
+﻿import os
+import queue
+import struct
+import threading
+import time
+import typing
+
+from loguru import logger
+
+from mado import codec
+
+MAGIC = b"MADOJRNL"
+VERSION = 1
+_HEADER = struct.Struct("<8sII")
+# monotonic capture time in ns, then the encoded item
+_RECORD = struct.Struct(f"<q{codec.RECORD_SIZE}s")
+RECORD_SIZE = _RECORD.size
+
+# Flush to disk every this many records, so a crash loses little of the session we want to look at.
+FLUSH_EVERY = 256
+
+_STOP = object()
+
+
+def journal_paths(path: str) -> typing.List[str]:
+    """The files of a rotated journal, oldest first."""
+    backups = []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        backups.append(f"{path}.{index}")
+        index += 1
+    return [*backups[::-1], *([path] if os.path.exists(path) else [])]
+
+
+class JournalWriter:
+    """Append events and commands to a binary journal, rotated like `logging.handlers.RotatingFileHandler`.
+
+    `record` is called from the hook threads, which Windows unhooks if they take too long, so it only
+    timestamps the item and hands it over. Encoding, writing and rotating happen on the writer thread.
+
+    """
+
+    def __init__(self, path: str, max_bytes: int, backup_count: int) -> None:
+        self.path = path
+        self.max_bytes = max(max_bytes, _HEADER.size + RECORD_SIZE)
+        self.backup_count = backup_count
+        self.recorded = 0
+        self.unsupported = 0
+        self._items: queue.SimpleQueue = queue.SimpleQueue()
+        self._unflushed = 0
+        self._file = self._open()
+        self._writer = threading.Thread(target=self._write_items, name="mado-journal", daemon=True)
+        self._writer.start()
+
+    def _open(self) -> typing.BinaryIO:
+        f = open(self.path, "ab")
+        if f.tell() == 0:
+            f.write(_HEADER.pack(MAGIC, VERSION, RECORD_SIZE))
+        return f
+
+    def _rotate(self) -> None:
+        self._file.close()
+        for index in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(source := f"{self.path}.{index}"):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = self._open()
+
+    def record(self, item: typing.Any) -> None:
+        self._items.put((time.monotonic_ns(), item))
+
+    def _write_items(self) -> None:
+        while (entry := self._items.get()) is not _STOP:
+            captured_at, item = entry
+            try:
+                data = _RECORD.pack(captured_at, codec.encode(item))
+            except codec.UnsupportedItem:
+                self.unsupported += 1
+                continue
+            if self._file.tell() + RECORD_SIZE > self.max_bytes:
+                self._rotate()
+            self._file.write(data)
+            self.recorded += 1
+            self._unflushed += 1
+            if self._unflushed >= FLUSH_EVERY:
+                self._file.flush()
+                self._unflushed = 0
+        self._file.close()
+
+    def close(self) -> None:
+        """Write what was recorded so far and close the journal, items recorded afterwards are dropped."""
+        if not self._writer.is_alive():
+            return
+        self._items.put(_STOP)
+        self._writer.join()
+        logger.info("Journal {} closed, {} items recorded", self.path, self.recorded)
+
+
+def read_journal(path: str) -> typing.Iterator[typing.Tuple[int, typing.Any]]:
+    """Yield (capture time in ns, item) from a journal and its rotated backups, oldest first."""
+    for file_path in journal_paths(path):
+        with open(file_path, "rb") as f:
+            magic, version, record_size = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+                raise ValueError(f"{file_path} is not a version {VERSION} mado journal")
+            while len(data := f.read(RECORD_SIZE)) == RECORD_SIZE:
+                captured_at, payload = _RECORD.unpack(data)
+                yield captured_at, codec.decode(payload)
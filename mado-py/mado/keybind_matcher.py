@@ -0,0 +1,65 @@
+﻿"""Matching the held keys against the keybinds, apart from the keyboard hook so it imports and runs anywhere.
+
+A key is whatever the hook makes of a keystroke, a canonical pynput key in `mado.keyboard_manager`, anything
+hashable here. Keybinds are ordered, the first one whose keys are all held wins, so the most specific ones go
+first. Every keybind has the prefix, a keystroke while it isn't held costs a set insert and a lookup.
+
+"""
+
+import queue
+import typing
+
+from mado.window_manager import commands
+
+
+class Keybind:
+    def __init__(self, keys: typing.FrozenSet, command: commands.WindowManagerCommand):
+        self._keys = keys
+        self._command = command
+
+    def activate(self, event_queue: queue.Queue) -> None:
+        event_queue.put(self._command)
+
+
+class KeybindMatcher:
+    """The keys held down, and the keybind they match as each key is pressed."""
+
+    # Bound on the memoised held-key sets beyond the exact chords, which are always precomputed.
+    MAX_MATCH_CACHE_SIZE = 1024
+
+    def __init__(self, prefix: typing.Hashable, keybinds: typing.Iterable[Keybind] = ()) -> None:
+        self.prefix = prefix
+        self.keys: typing.Set[typing.Hashable] = set()
+        self.keybinds: typing.List[Keybind] = []
+        self._matches: typing.Dict[typing.FrozenSet, typing.Optional[Keybind]] = {}
+        self.set_keybinds(keybinds)
+
+    def set_keybinds(self, keybinds: typing.Iterable[Keybind]) -> None:
+        """Precompute the keybind for every exact chord, honouring the most specific first ordering."""
+        self.keybinds = list(keybinds)
+        # Swapped in whole, the hook may be matching on another thread.
+        self._matches = {keybind._keys: self.scan(keybind._keys) for keybind in self.keybinds}
+
+    def scan(self, keys: typing.FrozenSet) -> typing.Optional[Keybind]:
+        return next((keybind for keybind in self.keybinds if keys >= keybind._keys), None)
+
+    def match(self, keys: typing.FrozenSet) -> typing.Optional[Keybind]:
+        try:
+            return self._matches[keys]
+        except KeyError:
+            keybind = self.scan(keys)
+            if len(self._matches) < self.MAX_MATCH_CACHE_SIZE:
+                self._matches[keys] = keybind
+            return keybind
+
+    def press(self, key: typing.Hashable) -> typing.Optional[Keybind]:
+        """The keybind `key` completes, `None` for a repeat of a held key or while the prefix isn't held."""
+        previous = len(self.keys)
+        self.keys.add(key)
+        # Bail out as cheaply as possible on any other keystroke.
+        if len(self.keys) == previous or self.prefix not in self.keys:
+            return None
+        return self.match(frozenset(self.keys))
+
+    def release(self, key: typing.Hashable) -> None:
+        self.keys.discard(key)
@@ -5,25 +5,21 @@ from loguru import logger
 from pynput import keyboard
 from pynput.keyboard import KeyCode
 
-from mado import config
+from mado import config, keybind_matcher
+from mado.keybind_matcher import KeybindMatcher
+from mado.startup_profile import STARTUP_PROFILE
 from mado.types_ import SCREEN_ID, VIRTUAL_DESKTOP_ID
 from mado.window_manager import commands
-from mado.window_manager.state import WINDOW_MANAGER_STATE, WindowManagerState
+from mado.window_manager.layout import Layout
+from mado.window_manager.spatial_index import Direction
 
 parse = keyboard.HotKey.parse
 
 
-class Keybind:
+class Keybind(keybind_matcher.Keybind):
 
     def __init__(self, keys: str, command: commands.WindowManagerCommand):
-        self._keys = set(parse(keys))
-        self._command = command
-
-    def maybe_activate(self, keys: typing.Set[keyboard.KeyCode], event_queue: queue.Queue) -> bool:
-        if keys >= self._keys:
-            event_queue.put(self._command)
-            return True
-        return False
+        super().__init__(frozenset(parse(keys)), command)
 
 
 class KeyboardManager(keyboard.Listener):
@@ -31,6 +27,10 @@ class KeyboardManager(keyboard.Listener):
 
     # This is manually ordered, so list the most specific ones first.
     KEYBINDS = [
+        Keybind(f"{PREFIX}+<shift>+f", commands.SetLayout(Layout.floating)),
+        Keybind(f"{PREFIX}+<shift>+n", commands.SetLayout(Layout.master_stack)),
+        Keybind(f"{PREFIX}+<shift>+c", commands.SetLayout(Layout.columns)),
+        Keybind(f"{PREFIX}+<shift>+m", commands.SetLayout(Layout.monocle)),
         Keybind(f"{PREFIX}+<shift>+1", commands.SendToVirtualDesktop(VIRTUAL_DESKTOP_ID(1))),
         Keybind(f"{PREFIX}+<shift>+2", commands.SendToVirtualDesktop(VIRTUAL_DESKTOP_ID(2))),
         Keybind(f"{PREFIX}+<shift>+3", commands.SendToVirtualDesktop(VIRTUAL_DESKTOP_ID(3))),
@@ -51,6 +51,17 @@ class KeyboardManager(keyboard.Listener):
         Keybind(f"{PREFIX}+i", commands.FocusScreen(SCREEN_ID("MID"))),
         Keybind(f"{PREFIX}+8", commands.FocusScreen(SCREEN_ID("TOP"))),
         Keybind(f"{PREFIX}+o", commands.FocusScreen(SCREEN_ID("RIGHT"))),
+        Keybind(f"{PREFIX}+<shift>+r", commands.DumpFlightRecorder()),
+        Keybind(f"{PREFIX}+<shift>+<tab>", commands.CycleMRU()),
+        Keybind(f"{PREFIX}+<shift>+<left>", commands.SwapDirection(Direction.left)),
+        Keybind(f"{PREFIX}+<shift>+<up>", commands.SwapDirection(Direction.up)),
+        Keybind(f"{PREFIX}+<shift>+<right>", commands.SwapDirection(Direction.right)),
+        Keybind(f"{PREFIX}+<shift>+<down>", commands.SwapDirection(Direction.down)),
+        Keybind(f"{PREFIX}+<left>", commands.FocusDirection(Direction.left)),
+        Keybind(f"{PREFIX}+<up>", commands.FocusDirection(Direction.up)),
+        Keybind(f"{PREFIX}+<right>", commands.FocusDirection(Direction.right)),
+        Keybind(f"{PREFIX}+<down>", commands.FocusDirection(Direction.down)),
+        Keybind(f"{PREFIX}+<tab>", commands.FocusPrevious()),
         Keybind(f"{PREFIX}+r", commands.StateDump()),
         Keybind(f"{PREFIX}+f", commands.RecreateState()),
         Keybind(f"{PREFIX}+b", commands.TogglePinWindow()),
@@ -64,24 +75,51 @@ class KeyboardManager(keyboard.Listener):
         ),
     ]
 
-    def __init__(self, event_queue: queue.Queue, *args, **kwargs) -> None:
-        self._keys = set()
+    def __init__(
+        self,
+        event_queue: queue.Queue,
+        *args,
+        screen_ids: typing.Optional[typing.Iterable[SCREEN_ID]] = None,
+        **kwargs,
+    ) -> None:
+        """Drop the keybinds of screens not in `screen_ids`, by default the screens of the current state."""
         self._event_queue = event_queue
+        self._matcher = KeybindMatcher(parse(self.PREFIX)[0])
         super().__init__(win32_event_filter=self.win32_event_filter_as_handler, *args, **kwargs)
-        self.cull_keybinds()
+        self.reset_vk_table()
+        with STARTUP_PROFILE.phase("KeyboardManager.cull_keybinds"):
+            self.cull_keybinds(screen_ids)
+
+    def reset_vk_table(self) -> None:
+        """Canonical key per virtual key code, so the hook doesn't translate every keystroke typed anywhere.
+
+        Special keys are known upfront, character keys are filled in as they are first seen since they depend
+        on the keyboard layout.
+
+        """
+        self._vk_to_key: typing.Dict[int, typing.Any] = {
+            vk: self.canonical(key) for vk, key in self._SPECIAL_KEYS.items()
+        }
+
+    def cull_keybinds(self, screen_ids: typing.Optional[typing.Iterable[SCREEN_ID]] = None) -> None:
+        if screen_ids is None:
+            # Not at the top, the keyboard process has no state to import.
+            from mado.window_manager.state import WINDOW_MANAGER_STATE
 
-    def cull_keybinds(self) -> None:
-        state: WindowManagerState = WINDOW_MANAGER_STATE.get()
+            screen_ids = WINDOW_MANAGER_STATE.get().screens
 
-        valid_screen_ids =  set(state.screens)
+        valid_screen_ids = set(screen_ids)
+        # From the class attribute, so keybinds culled for a screen gone before come back with it.
         self.KEYBINDS = [
             keybind
-            for keybind in self.KEYBINDS
-            if not isinstance(keybind._command, (commands.FocusScreen, commands.MoveToScreen)) or (
-                    isinstance(keybind._command, (commands.FocusScreen, commands.MoveToScreen))
-                    and keybind._command.screen_id in valid_screen_ids
+            for keybind in type(self).KEYBINDS
+            if not isinstance(keybind._command, (commands.FocusScreen, commands.MoveToScreen))
+            or (
+                isinstance(keybind._command, (commands.FocusScreen, commands.MoveToScreen))
+                and keybind._command.screen_id in valid_screen_ids
             )
         ]
+        self._matcher.set_keybinds(self.KEYBINDS)
 
     def win32_event_filter_as_handler(self, msg, data):
         """Hacky way of getting on keybind match -> suppress working.
@@ -91,24 +129,19 @@ class KeyboardManager(keyboard.Listener):
         processed.
 
         """
-        if data.vkCode == self._VK_PACKET:
-            msg, vk = msg | self._UTF16_FLAG, data.scanCode
-        else:
-            msg, vk = msg, data.vkCode
-
-        # If the key has the UTF-16 flag, we treat it as a unicode character,
-        # otherwise convert the event to a KeyCode; this may fail, and in that
-        # case we pass None
-        is_utf16 = msg & self._UTF16_FLAG
-        if is_utf16:
-            msg = msg ^ self._UTF16_FLAG
-            scan = vk
-            key = KeyCode.from_char(chr(scan))
+        vk = data.vkCode
+        # If it is a packet, we treat it as a unicode character, otherwise convert the event to a KeyCode;
+        # this may fail, and in that case we pass None
+        if vk == self._VK_PACKET:
+            key = self.canonical(KeyCode.from_char(chr(data.scanCode)))
         else:
             try:
-                key = self._event_to_key(msg, vk)
-            except OSError:
-                key = None
+                key = self._vk_to_key[vk]
+            except KeyError:
+                try:
+                    key = self._vk_to_key[vk] = self.canonical(self._event_to_key(msg, vk))
+                except OSError:
+                    key = None
 
         if msg in self._PRESS_MESSAGES:
             self._on_press(key)
@@ -118,19 +151,18 @@ class KeyboardManager(keyboard.Listener):
 
         return False
 
-    def _on_press(self, key):
-        previous = len(self._keys)
-        self._keys.add(self.canonical(key))
-        after = len(self._keys)
+    def _on_notification(self, code, wparam, lparam):
+        super()._on_notification(code, wparam, lparam)
+        if code == self._WM_INPUTLANGCHANGE:
+            self.reset_vk_table()
 
-        if previous != after:
-            for keybind in self.KEYBINDS:
-                if keybind.maybe_activate(self._keys, self._event_queue):
-                    self.suppress_event()
-                    break
+    def _on_press(self, key):
+        if (keybind := self._matcher.press(key)) is not None:
+            keybind.activate(self._event_queue)
+            self.suppress_event()
 
     def _on_release(self, key):
-        self._keys.discard(self.canonical(key))
+        self._matcher.release(key)
 
     def run(self):
         logger.info("Starting keyboard manager...")
@@ -0,0 +1,73 @@
+﻿"""Keyboard capture in a process of its own, with `ISOLATED_KEYBOARD`.
+
+A low level keyboard hook runs on the thread which installed it, for every keystroke on the desktop, and
+Windows silently unhooks it once a call takes longer than `LowLevelHooksTimeout`. In the window manager
+process the hook has to take the GIL from the event loop first, here it has the interpreter to itself. Matched
+keybinds come back as `mado.codec` records through a `SharedRing`.
+
+The keyboard process keeps the keybinds of every screen id, the window manager ignores those of screens it
+doesn't have, since the monitors may change after it started.
+
+"""
+
+import multiprocessing
+import queue
+
+from loguru import logger
+
+from mado.config import KEYBOARD_RING_CAPACITY, SCREEN_IDS
+from mado.shared_ring import RingReader, RingWriter, SharedRing
+
+# Seconds between checks that the window manager process is still there.
+PARENT_CHECK_INTERVAL = 1.0
+
+
+def _run(ring_name: str, capacity: int, semaphore, ready) -> None:
+    from mado.keyboard_manager import KeyboardManager
+
+    ring = SharedRing.attach(ring_name, capacity)
+    keyboard_manager = KeyboardManager(event_queue=RingWriter(ring, semaphore), screen_ids=SCREEN_IDS)
+    keyboard_manager.start()
+    keyboard_manager.wait()
+    ready.set()
+    parent = multiprocessing.parent_process()
+    while keyboard_manager.is_alive():
+        keyboard_manager.join(PARENT_CHECK_INTERVAL)
+        if parent is not None and not parent.is_alive():
+            keyboard_manager.stop()
+    ring.close()
+
+
+class IsolatedKeyboard:
+    """Runs a `KeyboardManager` in a child process, stands in for one in the window manager."""
+
+    def __init__(self, event_queue: queue.Queue, capacity: int = KEYBOARD_RING_CAPACITY) -> None:
+        context = multiprocessing.get_context("spawn")
+        self.ring = SharedRing.create(capacity)
+        semaphore = context.Semaphore(0)
+        self.ready = context.Event()
+        self.process = context.Process(
+            target=_run,
+            args=(self.ring.name, capacity, semaphore, self.ready),
+            name="mado-keyboard",
+            daemon=True,
+        )
+        self.reader = RingReader(self.ring, semaphore, event_queue)
+
+    def start(self) -> None:
+        logger.info("Starting keyboard process...")
+        self.reader.start()
+        self.process.start()
+
+    def wait(self) -> None:
+        """Until the keyboard hook is installed."""
+        self.ready.wait()
+
+    def cull_keybinds(self) -> None:
+        """Nothing to do, see the module docstring."""
+
+    def stop(self) -> None:
+        self.process.terminate()
+        self.process.join()
+        self.reader.stop()
+        self.ring.close()
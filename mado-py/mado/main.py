@@ -1,18 +1,47 @@
-﻿import sys
+﻿import argparse
+import sys
 
 from loguru import logger
 
-from mado.window_manager import WindowManager
+from mado import config
+from mado.config import STATE_SNAPSHOT_PATH
+from mado.startup_profile import STARTUP_PROFILE
 
 
 def run():
+    parser = argparse.ArgumentParser(prog="mado-run")
+    parser.add_argument("--journal", metavar="PATH", help="record events and commands, see mado-replay")
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="log how long each start up phase took, once hooks are in",
+    )
+    parser.add_argument(
+        "--trace", action="store_true", help="debug log window registration and focus changes"
+    )
+    parser.add_argument(
+        "--isolated-keyboard", action="store_true", help="capture the keyboard in a process of its own"
+    )
+    args = parser.parse_args()
+
     logger.remove()
-    logger.add(sys.stderr, level="INFO")
+    logger.add(sys.stderr, level="DEBUG" if args.trace else "INFO")
+    # Before importing the window manager, which reads it at import.
+    config.TRACE = args.trace
+    config.ISOLATED_KEYBOARD = config.ISOLATED_KEYBOARD or args.isolated_keyboard
+
+    STARTUP_PROFILE.enabled = args.profile_startup
+    with STARTUP_PROFILE.phase("imports"):
+        from mado.window_manager import WindowManager
 
+    with STARTUP_PROFILE.phase("WindowManager"):
+        window_manager = WindowManager(journal_path=args.journal, snapshot_path=STATE_SNAPSHOT_PATH)
     try:
-        WindowManager().run()
+        window_manager.run()
     except KeyboardInterrupt:
         pass
+    finally:
+        window_manager.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,255 @@
+﻿import bisect
+import functools
+import os
+import threading
+import time
+import typing
+
+from loguru import logger
+
+if typing.TYPE_CHECKING:
+    import http.server
+
+LABEL_VALUES = typing.Tuple[str, ...]
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _format_labels(label_names: typing.Tuple[str, ...], label_values: LABEL_VALUES, **extra) -> str:
+    pairs = [*zip(label_names, label_values), *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Metric:
+    TYPE = ""
+
+    def __init__(self, name: str, help_: str, label_names: typing.Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_
+        self.label_names = tuple(label_names)
+
+    def render(self) -> typing.List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.TYPE}", *self.samples()]
+
+    def samples(self) -> typing.List[str]:
+        raise NotImplementedError()
+
+
+class Counter(Metric):
+    TYPE = "counter"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: typing.Dict[LABEL_VALUES, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        # No lock: almost everything is recorded from the event loop thread, a rare lost increment is fine.
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self) -> typing.List[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, label_values)} {value}"
+            for label_values, value in list(self._values.items())
+        ]
+
+
+class Gauge(Metric):
+    TYPE = "gauge"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: typing.Dict[LABEL_VALUES, typing.Union[float, typing.Callable[[], float]]] = {}
+
+    def set(self, value: float, *label_values: str) -> None:
+        self._values[label_values] = value
+
+    def set_function(self, function: typing.Callable[[], float], *label_values: str) -> None:
+        """Evaluate `function` on collection instead of keeping the gauge up to date."""
+        self._values[label_values] = function
+
+    def samples(self) -> typing.List[str]:
+        samples = []
+        for label_values, value in list(self._values.items()):
+            if callable(value):
+                value = value()
+            samples.append(f"{self.name}{_format_labels(self.label_names, label_values)} {value}")
+        return samples
+
+
+class Histogram(Metric):
+    """Fixed bucket histogram, observing is a bisect and two increments."""
+
+    TYPE = "histogram"
+
+    def __init__(self, *args, buckets: typing.Sequence[float] = LATENCY_BUCKETS, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket (non-cumulative, last one is +Inf), sum]
+        self._series: typing.Dict[LABEL_VALUES, typing.Tuple[typing.List[int], typing.List[float]]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = ([0] * (len(self.buckets) + 1), [0.0])
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    def samples(self) -> typing.List[str]:
+        lines = []
+        for label_values, (counts, total) in list(self._series.items()):
+            cumulative = 0
+            for upper_bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, label_values, le=upper_bound)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {total[0]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+
+    def __init__(self) -> None:
+        self._metrics: typing.Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicated metric {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+EVENTS = REGISTRY.register(Counter("mado_events_total", "Window manager events handled.", ["type"]))
+COMMANDS = REGISTRY.register(Counter("mado_commands_total", "Window manager commands handled.", ["type"]))
+EVENT_LATENCY_SECONDS = REGISTRY.register(
+    Histogram(
+        "mado_event_latency_seconds",
+        "From the win event hook callback to the completion of its handler.",
+        ["type"],
+    )
+)
+COMMAND_LATENCY_SECONDS = REGISTRY.register(
+    Histogram(
+        "mado_command_latency_seconds",
+        "From the command being queued (i.e. the keypress) to the completion of its handler.",
+        ["type"],
+    )
+)
+HANDLER_SECONDS = REGISTRY.register(
+    Histogram("mado_handler_seconds", "Time spent in the handler of an event or command.", ["type"])
+)
+QUEUE_DELAY_SECONDS = REGISTRY.register(
+    Histogram("mado_queue_delay_seconds", "Time items spent in the event queue.", ["lane"])
+)
+QUEUE_DEPTH = REGISTRY.register(Gauge("mado_queue_depth", "Items pending in the event queue.", ["lane"]))
+QUEUE_DROPPED = REGISTRY.register(
+    Counter("mado_queue_dropped_total", "Events coalesced or dropped by the event queue.", ["lane"])
+)
+WIN32_CALL_SECONDS = REGISTRY.register(
+    Histogram("mado_win32_call_seconds", "Time spent in window_api functions.", ["function"])
+)
+WINDOW_OPERATIONS = REGISTRY.register(
+    Counter(
+        "mado_window_operations_total",
+        "Window operations run by the executor, by outcome (ok, superseded, hung or the exception).",
+        ["operation", "outcome"],
+    )
+)
+WINDOW_MOVES = REGISTRY.register(
+    Counter(
+        "mado_window_moves_total",
+        "Moves of registered windows, by outcome: noop if still on their screen's monitor,"
+        " pinned if a rule keeps them on their screen, or migrated.",
+        ["outcome"],
+    )
+)
+STATE_VERSION = REGISTRY.register(
+    Gauge("mado_state_version", "Version of the last state snapshot published, moves with every change.")
+)
+MANAGED_WINDOWS = REGISTRY.register(
+    Gauge("mado_managed_windows", "Windows managed on the current virtual desktop, by screen.", ["screen"])
+)
+
+
+def win32_call(func: typing.Callable) -> typing.Callable:
+    """Count and time calls of a `window_api` function."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            WIN32_CALL_SECONDS.observe(time.perf_counter() - start, name)
+
+    return wrapper
+
+
+class MetricsExporter(threading.Thread):
+    """Serve the registry on a localhost port and/or periodically write it to a file."""
+
+    def __init__(
+        self,
+        registry: MetricsRegistry = REGISTRY,
+        port: typing.Optional[int] = None,
+        path: typing.Optional[str] = None,
+        interval: float = 5.0,
+    ) -> None:
+        super().__init__(daemon=True)
+        self.registry = registry
+        self.port = port
+        self.path = path
+        self.interval = interval
+
+    def run(self) -> None:
+        if self.port is not None:
+            import http.server
+
+            server = http.server.ThreadingHTTPServer(("127.0.0.1", self.port), self._make_handler())
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            logger.info("Serving metrics on http://127.0.0.1:{}/metrics", self.port)
+
+        if self.path is not None:
+            logger.info("Writing metrics to {} every {}s", self.path, self.interval)
+            while True:
+                self.write()
+                time.sleep(self.interval)
+
+    def write(self) -> None:
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            f.write(self.registry.render())
+        os.replace(temporary_path, self.path)
+
+    def _make_handler(self) -> typing.Type["http.server.BaseHTTPRequestHandler"]:
+        import http.server
+
+        registry = self.registry
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args) -> None:  # noqa
+                pass
+
+        return Handler
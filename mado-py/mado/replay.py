@@ -0,0 +1,109 @@
+﻿"""Replay a journal recorded with `mado-run --journal` on the simulated backend, reporting handler timings."""
+
+import argparse
+import collections
+import sys
+import time
+import typing
+
+from loguru import logger
+
+from mado.backends import set_backend
+from mado.backends.simulated import SimulatedBackend
+from mado.config import VIRTUAL_DESKTOP_IDS
+from mado.journal import read_journal
+from mado.win_event_listener import invalidate_window_cache
+from mado.window_manager import WindowManager, events
+
+
+def _parse_rect(value: str) -> typing.Tuple[int, int, int, int]:
+    left, top, right, bottom = (int(part) for part in value.split(","))
+    return left, top, right, bottom
+
+
+def _percentile(sorted_values: typing.List[float], fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def replay(journal_path: str, simulated_backend: SimulatedBackend, speed: typing.Optional[float]) -> None:
+    """Feed a journal to the handlers of a `WindowManager`, at `speed` times the recorded pace or flat out."""
+    set_backend(simulated_backend)
+    window_manager = WindowManager(install_hooks=False)
+    handler_seconds: typing.DefaultDict[str, typing.List[float]] = collections.defaultdict(list)
+    errors: typing.Counter[str] = collections.Counter()
+
+    first_captured_at = None
+    started_at = time.perf_counter()
+    for captured_at, item in read_journal(journal_path):
+        if first_captured_at is None:
+            first_captured_at = captured_at
+        if speed is not None:
+            delay = started_at + (captured_at - first_captured_at) / 1e9 / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        item_type = type(item).__name__
+        start = time.perf_counter()
+        try:
+            if isinstance(item, events.WindowManagerEvent):
+                if item.timestamp is not None:
+                    simulated_backend.tick = item.timestamp
+                simulated_backend.apply_win_event(item.win_event, item.hwnd)
+                invalidate_window_cache(type(item), item.hwnd)
+                window_manager.handle_window_manager_event(item)
+            else:
+                window_manager.handle_window_manager_command(item)
+        except Exception as exc:  # noqa
+            errors[item_type] += 1
+            logger.opt(exception=exc).debug("Failed to handle {}", item)
+        handler_seconds[item_type].append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - started_at
+
+    total = sum(len(seconds) for seconds in handler_seconds.values())
+    print(f"Replayed {total} items in {elapsed:.3f}s ({total / elapsed if elapsed else 0:.0f} items/s)")
+    print(
+        f"{'type':<24}{'count':>9}{'errors':>8}{'total ms':>11}"
+        f"{'mean us':>10}{'p50 us':>10}{'p99 us':>10}{'max us':>10}"
+    )
+    for item_type, seconds in sorted(handler_seconds.items(), key=lambda kv: -sum(kv[1])):
+        seconds.sort()
+        print(
+            f"{item_type:<24}{len(seconds):>9}{errors[item_type]:>8}{sum(seconds) * 1e3:>11.2f}"
+            f"{sum(seconds) / len(seconds) * 1e6:>10.1f}{_percentile(seconds, 0.5) * 1e6:>10.1f}"
+            f"{_percentile(seconds, 0.99) * 1e6:>10.1f}{seconds[-1] * 1e6:>10.1f}"
+        )
+
+
+def run():
+    parser = argparse.ArgumentParser(prog="mado-replay", description=__doc__)
+    parser.add_argument("journal", help="journal path, as given to mado-run --journal")
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=None,
+        help="replay at this multiple of the recorded pace, default is max speed",
+    )
+    parser.add_argument(
+        "--monitor",
+        type=_parse_rect,
+        action="append",
+        metavar="LEFT,TOP,RIGHT,BOTTOM",
+        help="a simulated monitor, can be repeated, default is a single 1920x1080 one",
+    )
+    parser.add_argument("--virtual-desktops", type=int, default=len(VIRTUAL_DESKTOP_IDS))
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+    simulated_backend = SimulatedBackend(
+        monitor_rects=args.monitor or [(0, 0, 1920, 1080)],
+        virtual_desktop_count=args.virtual_desktops,
+        auto_create_windows=True,
+    )
+    replay(args.journal, simulated_backend, args.speed)
+
+
+if __name__ == "__main__":
+    run()
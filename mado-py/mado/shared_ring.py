@@ -0,0 +1,146 @@
+﻿"""Single producer, single consumer ring of fixed-size records in shared memory, e.g. of `mado.codec` records.
+
+The ring is preallocated: a header with the head (records written) and tail (records read) counters, each on a
+cache line of its own, then `capacity` record slots. Each counter only ever grows and is only written by one
+side, the producer writes a record before moving the head past it and the consumer reads it before moving the
+tail, so neither side ever takes a lock.
+
+"""
+
+import struct
+import threading
+import typing
+from multiprocessing import shared_memory
+
+from loguru import logger
+
+from mado import codec
+
+_COUNTER = struct.Struct("<Q")
+_HEAD_OFFSET = 0
+_TAIL_OFFSET = 64
+_RECORDS_OFFSET = 128
+
+# Seconds the reader waits for a record before checking whether it was stopped.
+READ_TIMEOUT = 0.5
+
+
+def _check_capacity(capacity: int) -> None:
+    if capacity <= 0 or capacity & (capacity - 1):
+        raise ValueError(f"capacity must be a power of two, got {capacity}")
+
+
+class SharedRing:
+    def __init__(
+        self, memory: shared_memory.SharedMemory, capacity: int, record_size: int, owner: bool
+    ) -> None:
+        _check_capacity(capacity)
+        if memory.size < _RECORDS_OFFSET + capacity * record_size:
+            raise ValueError(f"shared memory {memory.name} is too small for {capacity} records")
+        self.memory = memory
+        self.capacity = capacity
+        self.record_size = record_size
+        self.owner = owner
+        self._mask = capacity - 1
+        self._buf = memory.buf
+
+    @classmethod
+    def create(cls, capacity: int, record_size: int = codec.RECORD_SIZE) -> "SharedRing":
+        _check_capacity(capacity)
+        memory = shared_memory.SharedMemory(create=True, size=_RECORDS_OFFSET + capacity * record_size)
+        memory.buf[:_RECORDS_OFFSET] = bytes(_RECORDS_OFFSET)
+        return cls(memory, capacity, record_size, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, capacity: int, record_size: int = codec.RECORD_SIZE) -> "SharedRing":
+        # Only the creator unlinks it. On POSIX, a process spawned by the creator shares its resource tracker,
+        # so attaching doesn't have the memory unlinked when this side exits either.
+        memory = shared_memory.SharedMemory(name=name)
+        return cls(memory, capacity, record_size, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    def _load(self, offset: int) -> int:
+        return _COUNTER.unpack_from(self._buf, offset)[0]
+
+    def _store(self, offset: int, value: int) -> None:
+        _COUNTER.pack_into(self._buf, offset, value)
+
+    def push(self, record: bytes) -> bool:
+        """Producer side, returns `False` without writing anything if the ring is full."""
+        if len(record) != self.record_size:
+            raise ValueError(f"records are {self.record_size} bytes, got {len(record)}")
+        head = self._load(_HEAD_OFFSET)
+        if head - self._load(_TAIL_OFFSET) >= self.capacity:
+            return False
+        start = _RECORDS_OFFSET + (head & self._mask) * self.record_size
+        self._buf[start : start + self.record_size] = record
+        self._store(_HEAD_OFFSET, head + 1)
+        return True
+
+    def pop(self) -> typing.Optional[bytes]:
+        """Consumer side, the oldest record not read yet, if any."""
+        tail = self._load(_TAIL_OFFSET)
+        if tail == self._load(_HEAD_OFFSET):
+            return None
+        start = _RECORDS_OFFSET + (tail & self._mask) * self.record_size
+        record = bytes(self._buf[start : start + self.record_size])
+        self._store(_TAIL_OFFSET, tail + 1)
+        return record
+
+    def close(self) -> None:
+        self._buf = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+    def __len__(self) -> int:
+        return self._load(_HEAD_OFFSET) - self._load(_TAIL_OFFSET)
+
+    def __repr__(self) -> str:
+        return f"SharedRing(name={self.name}, capacity={self.capacity}, pending={len(self)})"
+
+
+class RingWriter:
+    """The producer end for items, with the `put` of a queue so that it can stand in for an event queue.
+
+    `semaphore` is released once per record written, for the `RingReader` to wait on.
+
+    """
+
+    def __init__(self, ring: SharedRing, semaphore: typing.Any) -> None:
+        self.ring = ring
+        self.semaphore = semaphore
+        self.dropped = 0
+
+    def put(self, item: typing.Any) -> None:
+        if not self.ring.push(codec.encode(item)):
+            # Never block the producer, it is a keyboard hook.
+            self.dropped += 1
+            logger.warning("Ring {} is full, dropped {}", self.ring.name, item)
+            return
+        self.semaphore.release()
+
+
+class RingReader(threading.Thread):
+    """The consumer end, putting the items read on an event queue."""
+
+    def __init__(self, ring: SharedRing, semaphore: typing.Any, event_queue: typing.Any) -> None:
+        super().__init__(daemon=True)
+        self.ring = ring
+        self.semaphore = semaphore
+        self.event_queue = event_queue
+        self._stopped = False
+
+    def run(self) -> None:
+        while not self._stopped:
+            self.semaphore.acquire(timeout=READ_TIMEOUT)
+            while (record := self.ring.pop()) is not None:
+                self.event_queue.put(codec.decode(record))
+
+    def stop(self) -> None:
+        self._stopped = True
+        self.semaphore.release()
+        self.join()
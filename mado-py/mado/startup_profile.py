@@ -0,0 +1,46 @@
+﻿"""Timings of the start up phases of `mado-run`, reported with `mado-run --profile-startup`."""
+
+import contextlib
+import time
+import typing
+
+
+class StartupProfile:
+    """Time named phases, which can nest, until `finish`. Always timed, it is a few `perf_counter` calls."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.finished = False
+        self.started_at = time.perf_counter()
+        # (depth, name, seconds), in the order the phases started
+        self.phases: typing.List[typing.Tuple[int, str, float]] = []
+        self._depth = 0
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> typing.Iterator[None]:
+        if self.finished:
+            yield
+            return
+        index = len(self.phases)
+        self.phases.append((self._depth, name, 0.0))
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.phases[index] = (self._depth, name, time.perf_counter() - start)
+
+    def finish(self) -> None:
+        self.finished = True
+
+    def report(self) -> str:
+        width = max((2 * depth + len(name) for depth, name, _ in self.phases), default=0) + 2
+        rows = [
+            f"{'  ' * depth + name:<{width}}{seconds * 1e3:>10.1f} ms" for depth, name, seconds in self.phases
+        ]
+        rows.append(f"{'total':<{width}}{(time.perf_counter() - self.started_at) * 1e3:>10.1f} ms")
+        return "\n".join(rows)
+
+
+STARTUP_PROFILE = StartupProfile()
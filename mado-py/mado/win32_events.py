@@ -0,0 +1,33 @@
+﻿"""Win event constants, defined here so that they are available without pywin32 (and some are missing in it).
+
+https://learn.microsoft.com/en-us/windows/win32/winauto/event-constants
+"""
+
+EVENT_SYSTEM_FOREGROUND = 0x0003
+EVENT_SYSTEM_CAPTURESTART = 0x0008
+EVENT_SYSTEM_CAPTUREEND = 0x0009
+EVENT_SYSTEM_MOVESIZESTART = 0x000A
+EVENT_SYSTEM_MOVESIZEEND = 0x000B
+EVENT_SYSTEM_MINIMIZESTART = 0x0016
+EVENT_SYSTEM_MINIMIZEEND = 0x0017
+
+EVENT_OBJECT_CREATE = 0x8000
+EVENT_OBJECT_DESTROY = 0x8001
+EVENT_OBJECT_SHOW = 0x8002
+EVENT_OBJECT_HIDE = 0x8003
+EVENT_OBJECT_FOCUS = 0x8005
+EVENT_OBJECT_LOCATIONCHANGE = 0x800B
+EVENT_OBJECT_NAMECHANGE = 0x800C
+EVENT_OBJECT_CLOAKED = 0x8017
+EVENT_OBJECT_UNCLOAKED = 0x8018
+
+OBJID_WINDOW = 0
+
+WINEVENT_OUTOFCONTEXT = 0x0000
+WINEVENT_SKIPOWNPROCESS = 0x0002
+
+# window messages broadcast to top level windows when the monitors change
+WM_DISPLAYCHANGE = 0x007E
+WM_SETTINGCHANGE = 0x001A
+# `wParam` of the `WM_SETTINGCHANGE` of a work area change, e.g. the taskbar moving or resizing
+SPI_SETWORKAREA = 0x002F
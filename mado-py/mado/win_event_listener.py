@@ -2,18 +2,73 @@
 import ctypes.wintypes
 import queue
 import threading
+import time
+import typing
 
-import win32con
 from loguru import logger
 
+from mado import win32_events as we
+from mado import window_cache
 from mado.types_ import WINDOW_HANDLE
 from mado.window_manager import events as wme
-from mado.window import Window
 
-# Some of these codes are not available in win32con for some reason. Define it ourselves
-# https://learn.microsoft.com/en-us/windows/win32/winauto/event-constants
-win32con.EVENT_OBJECT_CLOAKED = 0x8017
-win32con.EVENT_OBJECT_UNCLOAKED = 0x8018
+# This is mostly ported from komorebi, we should eventually check this actually make sense for us too.
+WIN_EVENT_TO_WINDOW_MANAGER_EVENT: typing.Dict[int, typing.Type[wme.WindowManagerEvent]] = {
+    we.EVENT_OBJECT_DESTROY: wme.Destroy,
+    we.EVENT_OBJECT_HIDE: wme.Hide,
+    we.EVENT_OBJECT_CLOAKED: wme.Cloak,
+    we.EVENT_SYSTEM_MINIMIZESTART: wme.Minimise,
+    we.EVENT_OBJECT_SHOW: wme.Show,
+    we.EVENT_SYSTEM_MINIMIZEEND: wme.Show,
+    we.EVENT_OBJECT_UNCLOAKED: wme.Uncloak,
+    we.EVENT_SYSTEM_FOREGROUND: wme.FocusChange,
+    we.EVENT_OBJECT_FOCUS: wme.FocusChange,
+    we.EVENT_SYSTEM_MOVESIZESTART: wme.MoveResizeStart,
+    we.EVENT_SYSTEM_MOVESIZEEND: wme.MoveResizeEnd,
+    we.EVENT_SYSTEM_CAPTURESTART: wme.MouseCapture,
+    we.EVENT_OBJECT_NAMECHANGE: wme.NameChange,
+    we.EVENT_OBJECT_LOCATIONCHANGE: wme.Moved,
+}
+
+_VISIBILITY = (
+    window_cache.VISIBLE,
+    window_cache.MINIMISED,
+    window_cache.STATE_SYSTEM_INVISIBLE,
+    window_cache.STYLE,
+)
+_GEOMETRY = (window_cache.FRAME_RECT, window_cache.MONITOR)
+# Cached window attributes each event makes stale, `Destroy` drops the whole entry.
+WIN_EVENT_INVALIDATES: typing.Dict[typing.Type[wme.WindowManagerEvent], typing.Tuple[str, ...]] = {
+    wme.Show: _VISIBILITY,
+    wme.Hide: _VISIBILITY,
+    wme.Minimise: _VISIBILITY,
+    wme.Cloak: (window_cache.CLOAKED,),
+    wme.Uncloak: (window_cache.CLOAKED,),
+    wme.NameChange: (window_cache.TITLE,),
+    wme.Moved: _GEOMETRY,
+    wme.MoveResizeEnd: _GEOMETRY,
+}
+
+
+def win_event_hook_ranges(win_events: typing.Iterable[int]) -> typing.List[typing.Tuple[int, int]]:
+    """Merge event codes into the fewest inclusive (min, max) ranges covering exactly those codes."""
+    ranges = []
+    for win_event in sorted(set(win_events)):
+        if ranges and ranges[-1][1] + 1 == win_event:
+            ranges[-1] = (ranges[-1][0], win_event)
+        else:
+            ranges.append((win_event, win_event))
+    return ranges
+
+
+WIN_EVENT_HOOK_RANGES = win_event_hook_ranges(WIN_EVENT_TO_WINDOW_MANAGER_EVENT)
+
+
+def invalidate_window_cache(event_type: typing.Type[wme.WindowManagerEvent], hwnd: int) -> None:
+    if event_type is wme.Destroy:
+        window_cache.WINDOW_CACHE.forget(hwnd)
+    elif attributes := WIN_EVENT_INVALIDATES.get(event_type):
+        window_cache.WINDOW_CACHE.invalidate(hwnd, attributes)
 
 
 class WinEventHookListener(threading.Thread):
@@ -22,6 +77,7 @@ class WinEventHookListener(threading.Thread):
         super().__init__(*args, **kwargs)
         self.daemon = True
         self.event_queue = event_queue
+        self.hooks_installed = threading.Event()
 
     # https://learn.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-setwineventhook
     def callback(
@@ -32,41 +88,73 @@ class WinEventHookListener(threading.Thread):
         idObject,  # noqa
         idChild,  # noqa
         dwEventThread,  # noqa
-        dwmsEventTime,  # noqa
+        dwmsEventTime,
     ) -> None:
-        wm_event = None
-        if idObject == win32con.OBJID_WINDOW:
-            window = Window(hwnd=WINDOW_HANDLE(hwnd))
-            match event:
-                # This is mostly ported from komorebi, we should eventually check this actually make sense for us too.
-                case win32con.EVENT_OBJECT_DESTROY:
-                    wm_event = wme.Destroy(event, window)
-                case win32con.EVENT_OBJECT_HIDE:
-                    wm_event = wme.Hide(event, window)
-                case win32con.EVENT_OBJECT_CLOAKED:  # noqa
-                    wm_event = wme.Cloak(event, window)
-                case win32con.EVENT_SYSTEM_MINIMIZESTART:
-                    wm_event = wme.Minimise(event, window)
-                case win32con.EVENT_OBJECT_SHOW | win32con.EVENT_SYSTEM_MINIMIZEEND:
-                    wm_event = wme.Show(event, window)
-                case win32con.EVENT_OBJECT_UNCLOAKED:  # noqa
-                    wm_event = wme.Uncloak(event, window)
-                case win32con.EVENT_SYSTEM_FOREGROUND | win32con.EVENT_OBJECT_FOCUS:
-                    wm_event = wme.FocusChange(event, window)
-                case win32con.EVENT_SYSTEM_MOVESIZESTART:
-                    wm_event = wme.MoveResizeStart(event, window)
-                case win32con.EVENT_SYSTEM_MOVESIZEEND:
-                    wm_event = wme.MoveResizeEnd(event, window)
-                case win32con.EVENT_SYSTEM_CAPTURESTART | win32con.EVENT_SYSTEM_CAPTURESTART:
-                    wm_event = wme.MouseCapture(event, window)
-                case (
-                    win32con.EVENT_OBJECT_NAMECHANGE
-                ):  # TODO: Might need to handle this to handle some weird cases of window creation?
-                    pass
-                case win32con.EVENT_OBJECT_LOCATIONCHANGE:
-                    wm_event = wme.Moved(event, window)
-        if wm_event is not None:
-            self.event_queue.put(wm_event)
+        if idObject != we.OBJID_WINDOW:
+            return
+        # Only build the Window once we know the event is one we handle.
+        event_type = WIN_EVENT_TO_WINDOW_MANAGER_EVENT.get(event)
+        if event_type is None:
+            return
+
+        # Invalidate here, not in the event loop, so nothing served ahead of this event sees stale values.
+        invalidate_window_cache(event_type, hwnd)
+
+        self.event_queue.put(event_type(event, hwnd, dwmsEventTime, time.perf_counter()))
+
+    def on_window_message(self, hwnd: int, message: int, wparam: int) -> None:
+        """Messages broadcast to our hidden window, the monitor changes aren't win events."""
+        work_area_changed = message == we.WM_SETTINGCHANGE and wparam == we.SPI_SETWORKAREA
+        if message == we.WM_DISPLAYCHANGE or work_area_changed:
+            self.event_queue.put(wme.DisplayChange(message, WINDOW_HANDLE(hwnd or 0)))
+
+    def create_message_window(self, user32) -> typing.Tuple[int, typing.Any]:
+        """A hidden top level window, message-only windows don't get broadcast messages.
+
+        Returns the window and its window proc, which must be kept alive for as long as the window.
+
+        """
+        WndProcType = ctypes.WINFUNCTYPE(  # noqa
+            ctypes.wintypes.LPARAM,
+            ctypes.wintypes.HWND,
+            ctypes.wintypes.UINT,
+            ctypes.wintypes.WPARAM,
+            ctypes.wintypes.LPARAM,
+        )
+
+        class WNDCLASSW(ctypes.Structure):
+            _fields_ = [
+                ("style", ctypes.wintypes.UINT),
+                ("lpfnWndProc", WndProcType),
+                ("cbClsExtra", ctypes.c_int),
+                ("cbWndExtra", ctypes.c_int),
+                ("hInstance", ctypes.wintypes.HINSTANCE),
+                ("hIcon", ctypes.wintypes.HICON),
+                ("hCursor", ctypes.wintypes.HANDLE),
+                ("hbrBackground", ctypes.wintypes.HBRUSH),
+                ("lpszMenuName", ctypes.wintypes.LPCWSTR),
+                ("lpszClassName", ctypes.wintypes.LPCWSTR),
+            ]
+
+        user32.DefWindowProcW.argtypes = [
+            ctypes.wintypes.HWND,
+            ctypes.wintypes.UINT,
+            ctypes.wintypes.WPARAM,
+            ctypes.wintypes.LPARAM,
+        ]
+        user32.DefWindowProcW.restype = ctypes.wintypes.LPARAM
+        user32.CreateWindowExW.restype = ctypes.wintypes.HWND
+
+        def window_proc(hwnd, message, wparam, lparam):
+            self.on_window_message(hwnd, message, wparam)
+            return user32.DefWindowProcW(hwnd, message, wparam, lparam)
+
+        window_proc = WndProcType(window_proc)
+        instance = ctypes.windll.kernel32.GetModuleHandleW(None)
+        window_class = WNDCLASSW(lpfnWndProc=window_proc, hInstance=instance, lpszClassName="mado")
+        user32.RegisterClassW(ctypes.byref(window_class))
+        hwnd = user32.CreateWindowExW(0, "mado", "mado", 0, 0, 0, 0, 0, None, None, instance, None)
+        return hwnd, window_proc
 
     def run(self):
         logger.info("Starting win event listener...")
@@ -92,22 +180,30 @@ class WinEventHookListener(threading.Thread):
         win_event_proc = WinEventProcType(self.callback)
 
         user32.SetWinEventHook.restype = ctypes.wintypes.HANDLE
-        hook = user32.SetWinEventHook(
-            win32con.EVENT_MIN,
-            win32con.EVENT_MAX,
-            0,
-            win_event_proc,
-            0,
-            0,
-            win32con.WINEVENT_OUTOFCONTEXT | win32con.WINEVENT_SKIPOWNPROCESS,
-        )
-        if hook == 0:
-            exit(99)
+        # Only hook the events we map, otherwise every accessibility event on the desktop is marshalled to us.
+        hooks = []
+        for event_min, event_max in WIN_EVENT_HOOK_RANGES:
+            hook = user32.SetWinEventHook(
+                event_min,
+                event_max,
+                0,
+                win_event_proc,
+                0,
+                0,
+                we.WINEVENT_OUTOFCONTEXT | we.WINEVENT_SKIPOWNPROCESS,
+            )
+            if hook == 0:
+                exit(99)
+            hooks.append(hook)
+        message_window, _window_proc = self.create_message_window(user32)
+        self.hooks_installed.set()
 
         msg = ctypes.wintypes.MSG()
         while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) != 0:
             user32.TranslateMessageW(msg)
             user32.DispatchMessageW(msg)
 
-        user32.UnhookWinEvent(hook)
+        for hook in hooks:
+            user32.UnhookWinEvent(hook)
+        user32.DestroyWindow(message_window)
         ole32.CoUninitialize()
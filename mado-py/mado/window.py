@@ -8,7 +8,7 @@ if typing.TYPE_CHECKING:
     from mado.window_manager import Screen
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Window:
     hwnd: WINDOW_HANDLE
     # screen information which we can attach in internal logic/states, will not be used to compare.
@@ -17,3 +17,5 @@ class Window:
     origin: typing.Optional[typing.Tuple[int, int]] = dataclasses.field(
         init=False, default=DEFAULT_ORIGIN, compare=False
     )
+    # left out of the tiling layouts, see `mado.window_rules.Action.float`
+    floating: bool = dataclasses.field(init=False, default=False, compare=False)
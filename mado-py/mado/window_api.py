@@ -1,161 +1,167 @@
-﻿import ctypes
-import ctypes.wintypes
-import typing
+﻿import typing
 
-import win32con
-import win32gui
-from pynput.mouse import Button, Controller
-from pyvda import AppView
-from win32api import SetCursorPos
-from win32gui import GetForegroundWindow
+from mado.backends import RECT, MonitorInfo, get_backend
+from mado.metrics import win32_call
+from mado.types_ import COORDINATES_ISH, MONITOR_HANDLE, WINDOW_HANDLE
 
-from mado.types_ import COORDINATES_ISH, MONITOR_HANDLE
 
+@win32_call
+def enum_windows() -> typing.List[WINDOW_HANDLE]:
+    return get_backend().enum_windows()
 
-mouse = Controller()
-dwmapi = ctypes.WinDLL("dwmapi")
 
+@win32_call
+def is_window(hwnd: int) -> bool:
+    return get_backend().is_window(hwnd)
 
+
+@win32_call
+def is_window_visible(hwnd: int) -> bool:
+    return get_backend().is_window_visible(hwnd)
+
+
+@win32_call
+def is_window_minimised(hwnd: int) -> bool:
+    return get_backend().is_window_minimised(hwnd)
+
+
+@win32_call
 def is_window_cloaked(hwnd: int) -> bool:
-    res = ctypes.c_int(0)
-    # https://github.com/LorenzCK/WindowsFormsAero/blob/master/src/WindowsFormsAero/Native/DwmWindowAttribute.cs
-    DWMWA_CLOAKED = 14
-    dwmapi.DwmGetWindowAttribute(hwnd, DWMWA_CLOAKED, ctypes.byref(res), ctypes.sizeof(res))
-    return bool(res.value)
+    return get_backend().is_window_cloaked(hwnd)
+
+
+@win32_call
+def is_window_state_system_invisible(hwnd: int) -> bool:
+    return get_backend().is_window_state_system_invisible(hwnd)
+
+
+@win32_call
+def get_window_text(hwnd: int) -> str:
+    return get_backend().get_window_text(hwnd)
+
 
+@win32_call
+def get_window_rect(hwnd: int) -> RECT:
+    return get_backend().get_window_rect(hwnd)
 
-class TITLEBARINFO(ctypes.Structure):  # noqa
-    _fields_ = [
-        ("cbSize", ctypes.wintypes.DWORD),
-        ("rcTitleBar", ctypes.wintypes.RECT),
-        ("rgstate", ctypes.wintypes.DWORD * 6),  # noqa
-    ]
 
+@win32_call
+def is_window_hung(hwnd: int) -> bool:
+    return get_backend().is_window_hung(hwnd)
 
-def is_window_state_system_invisible(hwnd: int) -> int:
-    # Title Info Initialization
-    title_info = TITLEBARINFO()
-    title_info.cbSize = ctypes.sizeof(title_info)
-    ctypes.windll.user32.GetTitleBarInfo(hwnd, ctypes.byref(title_info))
 
-    return title_info.rgstate[0] & win32con.STATE_SYSTEM_INVISIBLE
+@win32_call
+def get_window_class_name(hwnd: int) -> str:
+    return get_backend().get_window_class_name(hwnd)
 
 
+@win32_call
+def get_window_style(hwnd: int) -> int:
+    return get_backend().get_window_style(hwnd)
+
+
+@win32_call
+def get_window_process_id(hwnd: int) -> int:
+    return get_backend().get_window_process_id(hwnd)
+
+
+@win32_call
+def get_process_executable(process_id: int) -> str:
+    return get_backend().get_process_executable(process_id)
+
+
+@win32_call
+def enum_display_monitors() -> typing.List[MonitorInfo]:
+    return get_backend().enum_display_monitors()
+
+
+@win32_call
 def get_monitor_handle_from_window(hwnd: int) -> MONITOR_HANDLE:
-    return MONITOR_HANDLE(ctypes.windll.user32.MonitorFromWindow(hwnd, win32con.MONITOR_DEFAULTTONEAREST))
+    return get_backend().get_monitor_handle_from_window(hwnd)
 
 
+@win32_call
 def raise_and_focus_window(hwnd: int) -> None:
-    foreground = GetForegroundWindow()
-    if foreground == hwnd:
-        return
-    # send a dummy input to pass check, otherwise we can't focus the window for some reason.
-    # ideally we should send a completely bogus input but i can't figure out how.
-    mouse.release(Button.left)
-
-    win32gui.SetWindowPos(
-        hwnd,
-        win32con.HWND_TOP,
-        0,
-        0,
-        0,
-        0,
-        win32con.SWP_NOSIZE | win32con.SWP_NOMOVE | win32con.SWP_SHOWWINDOW,
-    )
-    win32gui.SetForegroundWindow(hwnd)
-
-
-def centre_mouse_in_rect(rect) -> None:
-    left, top, right, bottom = rect
-    pos = (
-        int((left + right) / 2),
-        int((top + bottom) / 2),
-    )
-    SetCursorPos(pos)
-
-
-def get_window_rect(hwnd: int) -> typing.Tuple[int, int, int, int]:
-    # https://github.com/LorenzCK/WindowsFormsAero/blob/master/src/WindowsFormsAero/Native/DwmWindowAttribute.cs
-    DWMWA_EXTENDED_FRAME_BOUNDS = 9
-    res = ctypes.wintypes.RECT()
-    status = dwmapi.DwmGetWindowAttribute(
-        hwnd, DWMWA_EXTENDED_FRAME_BOUNDS, ctypes.byref(res), ctypes.sizeof(res)
-    )
-    if status != 0:
-        res = win32gui.GetWindowRect(hwnd)
-    else:
-        res = (res.left, res.top, res.right, res.bottom)
-
-    return res
+    get_backend().raise_and_focus_window(hwnd)
+
+
+@win32_call
+def centre_mouse_in_rect(rect: RECT) -> None:
+    get_backend().centre_mouse_in_rect(rect)
 
 
+def centre_mouse_in_window(hwnd: int) -> None:
+    """Unlike centring on the cached rect, this sees where the window is after the operations before it."""
+    centre_mouse_in_rect(get_window_rect(hwnd))
+
+
+@win32_call
 def window_relative_move(
     hwnd: int, from_coordinates: COORDINATES_ISH, to_coordinates: COORDINATES_ISH
 ) -> None:
-    offsets = (
-        to_coordinates[0] - from_coordinates[0],
-        to_coordinates[1] - from_coordinates[1],
-    )
-    requires_move = any(offsets)
-
-    is_maximised = win32gui.GetWindowPlacement(hwnd)[1] == win32con.SW_SHOWMAXIMIZED
-    # We restore here because just setting the window pos while it being maximised causes weird issue later
-    # e.g. upon minimised and maximised, it will be sent back to the original screen in the real world.
-    if is_maximised and requires_move:
-        win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
-
-    rect = get_window_rect(hwnd)
-    if requires_move:
-        win32gui.SetWindowPos(
-            hwnd,
-            win32con.HWND_TOP,
-            rect[0] + offsets[0],
-            rect[1] + offsets[1],
-            0,
-            0,
-            win32con.SWP_NOSIZE,
-        )
-    else:
-        win32gui.SetWindowPos(
-            hwnd,
-            win32con.HWND_TOP,
-            0,
-            0,
-            0,
-            0,
-            win32con.SWP_NOSIZE | win32con.SWP_NOMOVE,
-        )
-
-    if is_maximised and requires_move:
-        win32gui.ShowWindow(hwnd, win32con.SW_MAXIMIZE)
-
-
-def focus_desktop():
-    # send a dummy input to pass check, otherwise we can't focus the window for some reason.
-    # ideally we should send a completely bogus input but i can't figure out how.
-    mouse.release(Button.left)
-    win32gui.SetForegroundWindow(win32gui.GetDesktopWindow())
+    get_backend().window_relative_move(hwnd, from_coordinates, to_coordinates)
+
 
+@win32_call
+def focus_desktop() -> None:
+    get_backend().focus_desktop()
 
+
+@win32_call
 def window_max_toggle(hwnd: int) -> None:
-    is_maximised = win32gui.GetWindowPlacement(hwnd)[1] == win32con.SW_SHOWMAXIMIZED
-    if is_maximised:
-        win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
-    else:
-        win32gui.ShowWindow(hwnd, win32con.SW_MAXIMIZE)
+    get_backend().window_max_toggle(hwnd)
+
 
+@win32_call
+def apply_window_rects(rects: typing.Dict[WINDOW_HANDLE, RECT]) -> None:
+    get_backend().apply_window_rects(rects)
 
+
+@win32_call
 def minimise_window(hwnd: int) -> None:
-    win32gui.ShowWindow(hwnd, win32con.SW_MINIMIZE)
+    get_backend().minimise_window(hwnd)
 
 
+@win32_call
 def restore_window(hwnd: int) -> None:
-    win32gui.ShowWindow(hwnd, win32con.SW_SHOWNOACTIVATE)
+    get_backend().restore_window(hwnd)
 
 
+@win32_call
 def toggle_pin_window(hwnd: int) -> None:
-    view = AppView(hwnd)
-    if view.is_pinned():
-        view.unpin()
-    else:
-        view.pin()
+    get_backend().toggle_pin_window(hwnd)
+
+
+@win32_call
+def current_virtual_desktop() -> int:
+    return get_backend().current_virtual_desktop()
+
+
+@win32_call
+def virtual_desktop_count() -> int:
+    return get_backend().virtual_desktop_count()
+
+
+@win32_call
+def create_virtual_desktop() -> None:
+    get_backend().create_virtual_desktop()
+
+
+@win32_call
+def go_to_virtual_desktop(number: int) -> None:
+    get_backend().go_to_virtual_desktop(number)
+
+
+@win32_call
+def move_window_to_virtual_desktop(hwnd: int, number: int) -> None:
+    get_backend().move_window_to_virtual_desktop(hwnd, number)
+
+
+def boot_time() -> float:
+    """When the system started, in seconds since the epoch."""
+    return get_backend().boot_time()
+
+
+def on_console_interrupt(callback: typing.Callable[[], None]) -> None:
+    """Have a Ctrl+C or Ctrl+Break in the console call `callback`, on a thread of its own."""
+    get_backend().on_console_interrupt(callback)
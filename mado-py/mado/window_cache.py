@@ -0,0 +1,172 @@
+﻿import collections
+import threading
+import typing
+
+from mado import window_api
+from mado.types_ import MONITOR_HANDLE, WINDOW_HANDLE
+
+RECT = typing.Tuple[int, int, int, int]
+
+VISIBLE = "visible"
+IS_WINDOW = "is_window"
+MINIMISED = "minimised"
+CLOAKED = "cloaked"
+STATE_SYSTEM_INVISIBLE = "state_system_invisible"
+TITLE = "title"
+FRAME_RECT = "frame_rect"
+MONITOR = "monitor"
+# WS_VISIBLE and WS_MINIMIZE, among others
+STYLE = "style"
+# never invalidated, these don't change for the lifetime of a window
+CLASS_NAME = "class_name"
+PROCESS_ID = "process_id"
+
+# Handles forgotten recently, whose late lookups must not bring their entry back.
+FORGOTTEN_CAPACITY = 4096
+
+_MISSING = object()
+
+
+def monitor_from_rect(
+    rect: RECT, monitor_rects: typing.Dict[MONITOR_HANDLE, RECT]
+) -> typing.Optional[MONITOR_HANDLE]:
+    """Pure equivalent of `MonitorFromWindow(..., MONITOR_DEFAULTTONEAREST)` over a known monitor layout."""
+    left, top, right, bottom = rect
+    best, best_area = None, 0
+    for monitor_handle, (m_left, m_top, m_right, m_bottom) in monitor_rects.items():
+        width = max(0, min(right, m_right) - max(left, m_left))
+        height = max(0, min(bottom, m_bottom) - max(top, m_top))
+        area = width * height
+        if area > best_area:
+            best, best_area = monitor_handle, area
+    if best is not None:
+        return best
+
+    best_distance = None
+    for monitor_handle, (m_left, m_top, m_right, m_bottom) in monitor_rects.items():
+        dx = max(m_left - right, 0, left - m_right)
+        dy = max(m_top - bottom, 0, top - m_bottom)
+        distance = dx * dx + dy * dy
+        if best_distance is None or distance < best_distance:
+            best, best_distance = monitor_handle, distance
+    return best
+
+
+class WindowAttributeCache:
+    """Per hwnd cache of window attributes we probe through the win api.
+
+    Entries are only dropped by `invalidate`/`forget`, which is driven by the win events changing them, see
+    `mado.win_event_listener.WIN_EVENT_INVALIDATES`. Monitor lookups are answered from the known monitors.
+
+    Lookups come from the event loop while the listener thread invalidates, so `invalidate` never changes the
+    dict of a window in place, it swaps in a copy, and a probed value is only stored if the dict it was looked
+    up in is still the window's: a probe which raced an invalidation (or `forget`) returns its value without
+    caching it. Hits don't take the lock.
+
+    """
+
+    def __init__(self) -> None:
+        self._attributes: typing.Dict[WINDOW_HANDLE, typing.Dict[str, typing.Any]] = {}
+        self._forgotten: typing.OrderedDict[WINDOW_HANDLE, None] = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._monitor_rects: typing.Dict[MONITOR_HANDLE, RECT] = {}
+        self.hits: typing.Counter[str] = collections.Counter()
+        self.misses: typing.Counter[str] = collections.Counter()
+
+    def _get(self, hwnd: WINDOW_HANDLE, attribute: str, probe: typing.Callable[[WINDOW_HANDLE], typing.Any]):
+        attributes = self._attributes.get(hwnd)
+        if attributes is not None and (value := attributes.get(attribute, _MISSING)) is not _MISSING:
+            self.hits[attribute] += 1
+            return value
+
+        with self._lock:
+            attributes = self._attributes.get(hwnd)
+            if attributes is None and hwnd not in self._forgotten:
+                attributes = self._attributes[hwnd] = {}
+        # Not holding the lock, it is a win api call.
+        value = probe(hwnd)
+        with self._lock:
+            self.misses[attribute] += 1
+            if attributes is not None and self._attributes.get(hwnd) is attributes:
+                attributes[attribute] = value
+        return value
+
+    def is_visible(self, hwnd: WINDOW_HANDLE) -> bool:
+        return self._get(hwnd, VISIBLE, window_api.is_window_visible)
+
+    def is_window(self, hwnd: WINDOW_HANDLE) -> bool:
+        return self._get(hwnd, IS_WINDOW, window_api.is_window)
+
+    def is_minimised(self, hwnd: WINDOW_HANDLE) -> bool:
+        return self._get(hwnd, MINIMISED, window_api.is_window_minimised)
+
+    def is_cloaked(self, hwnd: WINDOW_HANDLE) -> bool:
+        return self._get(hwnd, CLOAKED, window_api.is_window_cloaked)
+
+    def is_state_system_invisible(self, hwnd: WINDOW_HANDLE) -> bool:
+        return self._get(
+            hwnd, STATE_SYSTEM_INVISIBLE, lambda h: bool(window_api.is_window_state_system_invisible(h))
+        )
+
+    def title(self, hwnd: WINDOW_HANDLE) -> str:
+        return self._get(hwnd, TITLE, window_api.get_window_text)
+
+    def class_name(self, hwnd: WINDOW_HANDLE) -> str:
+        return self._get(hwnd, CLASS_NAME, window_api.get_window_class_name)
+
+    def style(self, hwnd: WINDOW_HANDLE) -> int:
+        return self._get(hwnd, STYLE, window_api.get_window_style)
+
+    def process_id(self, hwnd: WINDOW_HANDLE) -> int:
+        return self._get(hwnd, PROCESS_ID, window_api.get_window_process_id)
+
+    def rect(self, hwnd: WINDOW_HANDLE) -> RECT:
+        return self._get(hwnd, FRAME_RECT, window_api.get_window_rect)
+
+    def monitor_handle(self, hwnd: WINDOW_HANDLE) -> MONITOR_HANDLE:
+        return self._get(hwnd, MONITOR, self._probe_monitor_handle)
+
+    def _probe_monitor_handle(self, hwnd: WINDOW_HANDLE) -> MONITOR_HANDLE:
+        # A window destroyed since its event was queued has no rect, let the win api answer for those.
+        if self._monitor_rects and window_api.is_window(hwnd):
+            return monitor_from_rect(self.rect(hwnd), self._monitor_rects)
+        return window_api.get_monitor_handle_from_window(hwnd)
+
+    def set_monitor_rects(self, monitor_rects: typing.Dict[MONITOR_HANDLE, RECT]) -> None:
+        self._monitor_rects = dict(monitor_rects)
+        with self._lock:
+            for hwnd, attributes in self._attributes.items():
+                if MONITOR in attributes:
+                    self._attributes[hwnd] = {k: v for k, v in attributes.items() if k != MONITOR}
+
+    def invalidate(self, hwnd: WINDOW_HANDLE, attributes: typing.Collection[str]) -> None:
+        with self._lock:
+            # A forgotten handle with events again was reused by a new window.
+            self._forgotten.pop(hwnd, None)
+            if (cached := self._attributes.get(hwnd)) is not None:
+                self._attributes[hwnd] = {k: v for k, v in cached.items() if k not in attributes}
+
+    def forget(self, hwnd: WINDOW_HANDLE) -> None:
+        with self._lock:
+            self._attributes.pop(hwnd, None)
+            self._forgotten[hwnd] = None
+            if len(self._forgotten) > FORGOTTEN_CAPACITY:
+                self._forgotten.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every entry, e.g. when the backend is swapped for another desktop with the same handles."""
+        with self._lock:
+            self._attributes.clear()
+            self._forgotten.clear()
+
+    def __repr__(self) -> str:
+        return (
+            f"WindowAttributeCache("
+            f"windows={len(self._attributes)}"
+            f", hits={sum(self.hits.values())}"
+            f", misses={sum(self.misses.values())}"
+            f", misses_by_attribute={dict(self.misses)})"
+        )
+
+
+WINDOW_CACHE = WindowAttributeCache()
@@ -1,147 +1,563 @@
-﻿import queue
-from itertools import zip_longest
+﻿import functools
+import queue
+import time
+import typing
 
-import pyvda
 from loguru import logger
 
-from mado import window_api
-from mado.config import MOUSE_FOLLOWS_FOCUS, VIRTUAL_DESKTOP_IDS
-from mado.keyboard_manager import KeyboardManager
+from mado import metrics, window_api
+from mado.config import (
+    FEED_PORT,
+    IPC_COMMAND_TIMEOUT,
+    IPC_PORT,
+    ISOLATED_KEYBOARD,
+    JOURNAL_BACKUP_COUNT,
+    JOURNAL_MAX_BYTES,
+    METRICS_FILE,
+    METRICS_FILE_INTERVAL,
+    METRICS_PORT,
+    MOUSE_FOLLOWS_FOCUS,
+    SCREEN_IDS,
+    STATE_SNAPSHOT_INTERVAL,
+    VIRTUAL_DESKTOP_IDS,
+    WINDOW_OPERATION_TIMEOUT,
+    WINDOW_OPERATION_WORKERS,
+)
+from mado.flight_recorder import FLIGHT_RECORDER
+from mado.startup_profile import STARTUP_PROFILE
+from mado.types_ import SCREEN_ID, VIRTUAL_DESKTOP_ID
+from mado.window_cache import WINDOW_CACHE
 from mado.win_event_listener import WinEventHookListener
 from mado.window import Window
+from mado.window_operations import FOCUS_LANE, GLOBAL_LANE, WindowOperation, WindowOperationExecutor
 from mado.window_manager import commands
 from mado.window_manager import events
-from mado.window_manager.state import Screen, WindowManagerState
+from mado.window_manager import event_queue
+from mado.window_manager import layout
+from mado.window_manager import persistence
+from mado.window_manager import state_snapshot
+from mado.window_manager import topology
+from mado.window_manager.layout import Layout
+from mado.window_manager.spatial_index import Direction
+from mado.window_manager.state import COMPILED_WINDOW_RULES, Screen, WindowManagerState
+from mado.window_rules import Action
 
 
 class WindowManager:
 
-    def __init__(self) -> None:
-        self.state = WindowManagerState.new()
+    def __init__(
+        self,
+        install_hooks: bool = True,
+        journal_path: typing.Optional[str] = None,
+        window_operation_workers: typing.Optional[int] = None,
+        snapshot_path: typing.Optional[str] = None,
+    ) -> None:
+        """`install_hooks=False` runs without the win event and keyboard hooks, for a simulated backend.
+
+        With `journal_path`, every event and command queued is recorded there, see `mado.journal`.
+
+        `window_operation_workers` defaults to `WINDOW_OPERATION_WORKERS`, or to 0 (i.e. running window
+        operations inline, deterministically) without hooks.
+
+        With `snapshot_path`, the states are warm started from the snapshot there if it is still usable, and
+        saved back to it periodically and on stop, see `mado.window_manager.persistence`.
 
-        self.event_queue = queue.Queue()
+        """
+        self.install_hooks = install_hooks
+        self.virtual_desktop_id = VIRTUAL_DESKTOP_ID(window_api.current_virtual_desktop())
+        # States of the virtual desktops we have visited, so switching back does not need a full rebuild.
+        self.states: typing.Dict[VIRTUAL_DESKTOP_ID, WindowManagerState] = {}
+        self.snapshot_path = snapshot_path
+        self.snapshot_saved_at = time.monotonic()
+        # `state_snapshot.version` as of the last save, there's nothing new to save while it stays the same.
+        self.snapshot_saved_version: typing.Optional[int] = None
+        if snapshot_path is not None:
+            with STARTUP_PROFILE.phase("state snapshot restore"):
+                if (snapshot := persistence.load_snapshot(snapshot_path)) is not None:
+                    self.states = persistence.restore_states(snapshot, self.virtual_desktop_id)
+        if (state := self.states.get(self.virtual_desktop_id)) is None:
+            with STARTUP_PROFILE.phase("WindowManagerState.new"):
+                self.recreate_state()
+        else:
+            state.activate()
+            self.state = state
+
+        self.event_queue = event_queue.PriorityEventQueue()
+        self.journal = None
+        if journal_path is not None:
+            from mado.journal import JournalWriter
+
+            self.journal = JournalWriter(journal_path, JOURNAL_MAX_BYTES, JOURNAL_BACKUP_COUNT)
+            self.event_queue.tap = self.journal.record
+            # A replay has nothing else to build its initial state from.
+            for hwnd in self.state.windows:
+                self.journal.record(events.Show(None, hwnd))
+            logger.info("Recording events and commands to {}", journal_path)
         self.win_event_listener = WinEventHookListener(event_queue=self.event_queue)
-        self.keyboard_manager = KeyboardManager(event_queue=self.event_queue)
+        self.keyboard_manager = None
+        if install_hooks:
+            with STARTUP_PROFILE.phase("KeyboardManager"):
+                if ISOLATED_KEYBOARD:
+                    from mado.keyboard_process import IsolatedKeyboard
+
+                    self.keyboard_manager = IsolatedKeyboard(event_queue=self.event_queue)
+                else:
+                    from mado.keyboard_manager import KeyboardManager
+
+                    self.keyboard_manager = KeyboardManager(event_queue=self.event_queue)
 
+        if window_operation_workers is None:
+            window_operation_workers = WINDOW_OPERATION_WORKERS if install_hooks else 0
+        self.window_operations = WindowOperationExecutor(
+            workers=window_operation_workers,
+            timeout=WINDOW_OPERATION_TIMEOUT,
+            on_error=self.on_window_operation_error,
+        )
+
+        self.ipc_server = None
+        self.feed_server = None
         self.should_not_manage_next_focus = False
 
-        self.maybe_populate_virtual_desktop()
+        # Published after every event and command handled, for reading from other threads.
+        self.state_snapshot = state_snapshot.publish(None, self.state, self.virtual_desktop_id)
+        metrics.STATE_VERSION.set_function(lambda: self.state_snapshot.version)
+        for screen_id in SCREEN_IDS:
+            metrics.MANAGED_WINDOWS.set_function(
+                functools.partial(self.managed_windows, screen_id), screen_id
+            )
+
+        with STARTUP_PROFILE.phase("maybe_populate_virtual_desktop"):
+            self.maybe_populate_virtual_desktop()
 
     @staticmethod
     def maybe_populate_virtual_desktop() -> None:
-        for virtual_desktop_id, virtual_desktop in zip_longest(
-            VIRTUAL_DESKTOP_IDS, pyvda.get_virtual_desktops()
-        ):
-            if virtual_desktop is None:
-                pyvda.VirtualDesktop.create()
+        for _ in range(len(VIRTUAL_DESKTOP_IDS) - window_api.virtual_desktop_count()):
+            window_api.create_virtual_desktop()
+
+    def managed_windows(self, screen_id: SCREEN_ID) -> int:
+        screen = self.state_snapshot.screen(screen_id)
+        return len(screen.windows) if screen is not None else 0
+
+    def recreate_state(self) -> None:
+        self.state = WindowManagerState.new()
+        self.states[self.virtual_desktop_id] = self.state
+
+    def switch_virtual_desktop(self, virtual_desktop_id: VIRTUAL_DESKTOP_ID) -> None:
+        self.virtual_desktop_id = virtual_desktop_id
+        if (state := self.states.get(virtual_desktop_id)) is None:
+            self.recreate_state()
+        else:
+            state.reconcile()
+            state.activate()
+            self.state = state
 
     def run(self) -> None:
         logger.info("Starting Mado WindowManager...")
-        self.win_event_listener.start()
-        self.keyboard_manager.start()
+        if METRICS_PORT is not None or METRICS_FILE is not None:
+            exporter = metrics.MetricsExporter(
+                port=METRICS_PORT, path=METRICS_FILE, interval=METRICS_FILE_INTERVAL
+            )
+            exporter.start()
+        if IPC_PORT is not None:
+            from mado.ipc import IpcServer
+
+            self.ipc_server = IpcServer(
+                self.event_queue,
+                port=IPC_PORT,
+                command_timeout=IPC_COMMAND_TIMEOUT,
+                snapshot_source=lambda: self.state_snapshot,
+            )
+            self.ipc_server.start()
+        if FEED_PORT is not None:
+            from mado.feed import FeedServer
+
+            self.feed_server = FeedServer(port=FEED_PORT, snapshot_source=lambda: self.state_snapshot)
+            self.feed_server.start()
+        if self.install_hooks:
+            with STARTUP_PROFILE.phase("hook installation"):
+                self.win_event_listener.start()
+                self.keyboard_manager.start()
+                if STARTUP_PROFILE.enabled:
+                    self.win_event_listener.hooks_installed.wait()
+                    self.keyboard_manager.wait()
+        STARTUP_PROFILE.finish()
+        if STARTUP_PROFILE.enabled:
+            logger.info("Startup profile:\n{}", STARTUP_PROFILE.report())
+        # The loop waits on the queue without a timeout, which a KeyboardInterrupt can't break on Windows.
+        window_api.on_console_interrupt(self.event_queue.close)
         self.event_processing_loop()
 
+    def stop(self) -> None:
+        if self.ipc_server is not None:
+            self.ipc_server.stop()
+        if self.feed_server is not None:
+            self.feed_server.stop()
+        if self.keyboard_manager is not None:
+            self.keyboard_manager.stop()
+        self.event_queue.close()
+        self.window_operations.close()
+        self.save_snapshot()
+        if self.journal is not None:
+            self.journal.close()
+
     def event_processing_loop(self) -> None:
         logger.info("Starting event processing loop")
         while True:
             try:
-                event = self.event_queue.get(timeout=0.5)  # timeout for a quicker sigint handling.
-            except queue.Empty:
-                continue
+                event, enqueued_at = self.event_queue.get_entry()
+            except event_queue.Closed:
+                logger.info("Event queue closed, stopping event processing loop")
+                return
+            self.handle_item(event, enqueued_at)
+
+    def drain(self) -> int:
+        """Handle everything queued so far without blocking, returns the number of items handled."""
+        handled = 0
+        while True:
+            try:
+                event, enqueued_at = self.event_queue.get_entry(block=False)
+            except (queue.Empty, event_queue.Closed):
+                return handled
+            self.handle_item(event, enqueued_at)
+            handled += 1
 
-            if isinstance(event, events.WindowManagerEvent):
-                self.handle_window_manager_event(event)
-            elif isinstance(event, commands.WindowManagerCommand):
+    def handle_item(self, event: typing.Any, enqueued_at: float) -> None:
+        start = time.perf_counter()
+        future = None
+        if isinstance(event, commands.IpcCommand):
+            event, future = event.command, event.future
+        event_type = type(event).__name__
+        if isinstance(event, events.WindowManagerEvent):
+            FLIGHT_RECORDER.record("event", event_type, event.hwnd)
+            self.handle_window_manager_event(event)
+            self.publish_state()
+            metrics.EVENTS.inc(event_type)
+            if event.received_at is not None:
+                metrics.EVENT_LATENCY_SECONDS.observe(time.perf_counter() - event.received_at, event_type)
+        elif isinstance(event, commands.WindowManagerCommand):
+            FLIGHT_RECORDER.record("command", event)
+            try:
                 self.handle_window_manager_command(event)
+            except Exception as exc:
+                if future is None:
+                    raise
+                # A client's command failing is the client's problem, it mustn't take the event loop down.
+                logger.exception("IPC command {} failed", event)
+                self.publish_state()
+                future.set_exception(exc)
             else:
-                pass
+                # Before completing the future, so a client sees the effect of its command in its next query.
+                self.publish_state()
+                if future is not None:
+                    future.set_result(None)
+            metrics.COMMANDS.inc(event_type)
+            metrics.COMMAND_LATENCY_SECONDS.observe(time.perf_counter() - enqueued_at, event_type)
+        else:
+            pass
+        metrics.HANDLER_SECONDS.observe(time.perf_counter() - start, event_type)
+        if (
+            time.monotonic() - self.snapshot_saved_at > STATE_SNAPSHOT_INTERVAL
+            and self.state_snapshot.version != self.snapshot_saved_version
+        ):
+            self.save_snapshot()
+
+    def publish_state(self) -> None:
+        previous = self.state_snapshot
+        self.state_snapshot = state_snapshot.publish(previous, self.state, self.virtual_desktop_id)
+        if self.feed_server is not None and self.state_snapshot is not previous:
+            self.feed_server.notify()
+
+    def save_snapshot(self) -> None:
+        self.snapshot_saved_at = time.monotonic()
+        self.snapshot_saved_version = self.state_snapshot.version
+        if self.snapshot_path is None:
+            return
+        try:
+            persistence.save_snapshot(self.snapshot_path, self.states)
+        except Exception as exc:  # noqa
+            # Not just OSError, a window api call failing raises whatever the backend raises.
+            logger.warning("Failed to save state snapshot {}: {}", self.snapshot_path, exc)
 
     def handle_window_manager_event(self, event: events.WindowManagerEvent) -> None:
         # make sure we have the correct focused screen first.
         if isinstance(event, (events.FocusChange, events.Show, events.MoveResizeEnd)):
-            if maybe_montior_handle := window_api.get_monitor_handle_from_window(event.window.hwnd):
-                self.state.set_focused_screen_id(
-                    monitor_handle=maybe_montior_handle
-                )
+            if maybe_montior_handle := WINDOW_CACHE.monitor_handle(event.hwnd):
+                self.state.set_focused_screen_id(monitor_handle=maybe_montior_handle)
+
+        moved = isinstance(event, (events.MoveResizeEnd, events.Moved))
+        if moved and self.state.query_is_window_registered(event.hwnd):
+            self.state.spatial_index.mark_dirty(event.hwnd)
 
         if isinstance(event, events.FocusChange):
-            self.state.set_focused_window(event.window)
+            self.state.set_focused_window(event.hwnd)
 
         if isinstance(event, events.Destroy):
-            maybe_window_to_focus = self.state.unregister_window(event.window.hwnd)
+            self.forget_window_elsewhere(event.hwnd)
+            COMPILED_WINDOW_RULES.forget(event.hwnd)
+            maybe_window_to_focus = self.state.unregister_window(event.hwnd)
             if maybe_window_to_focus is not None:
                 self.composited_focus_window(maybe_window_to_focus, disregard_mouse_move=True)
-        elif isinstance(event, (events.Minimise, events.Hide)):
-            self.state.unregister_window(event.window.hwnd)
+        elif isinstance(event, (events.Minimise, events.Hide, events.Cloak)):
+            # Cloaked while its virtual desktop is the current one, i.e. moved to another one.
+            self.state.unregister_window(event.hwnd)
+        elif isinstance(event, events.DisplayChange):
+            self.apply_display_change()
         elif isinstance(event, (events.Show, events.Uncloak)):
-            self.state.register_window(event.window.hwnd)
+            if (window := self.state.register_window(event.hwnd)) is not None:
+                # Moved here from another virtual desktop while that one wasn't the current one.
+                self.forget_window_elsewhere(event.hwnd)
+                self.apply_window_rule(window)
+        elif moved and self.state.query_is_window_registered(event.hwnd):
+            moved_screen = self.state.track_window_move(event.hwnd)
+            # Moved within its tiled screen, by the layout or the user. Put it back once the user lets go, not
+            # on every location change, a window refusing its target rect would otherwise be moved forever.
+            if (
+                not moved_screen
+                and isinstance(event, events.MoveResizeEnd)
+                and (screen := self.tiled_screen(event.hwnd))
+            ):
+                screen.layout_rects.pop(event.hwnd, None)
+                screen.layout_dirty = True
         elif isinstance(event, events.MoveResizeEnd):
-            self.state.force_register_window(event.window.hwnd)
-        elif isinstance(event, events.Moved):
-            if self.state.query_is_window_registered(event.window.hwnd):
-                self.state.force_register_window(event.window.hwnd)
+            self.state.force_register_window(event.hwnd)
+
+        self.apply_layouts()
+
+    def forget_window_elsewhere(self, hwnd: int) -> None:
+        """Drop a window from the states of the other virtual desktops."""
+        for state in self.states.values():
+            if state is not self.state:
+                state.forget_window(hwnd)
+
+    def apply_display_change(self) -> None:
+        """Bring the screens of every state in line with the monitors, without re-enumerating the windows."""
+        monitors = window_api.enum_display_monitors()
+        diff = topology.diff_topology(
+            {screen_id: screen.monitor_info for screen_id, screen in self.state.screens.items()}, monitors
+        )
+        if not diff:
+            return
+        logger.info("Display change: {}", diff)
+        WINDOW_CACHE.set_monitor_rects({monitor.handle: monitor.rect for monitor in monitors})
+        for state in self.states.values():
+            state.apply_topology(diff)
+        if self.keyboard_manager is not None:
+            self.keyboard_manager.cull_keybinds()
+
+    def tiled_screen(self, hwnd: int) -> typing.Optional[Screen]:
+        """The screen of a registered window, if the layout of the screen places it."""
+        window = self.state.windows.get(hwnd)
+        if window is None or window.floating or window.screen is None:
+            return None
+        if window.screen.layout is Layout.floating:
+            return None
+        return window.screen
+
+    def apply_layouts(self) -> None:
+        """Move the windows of the screens the current event or command changed, in one batch per screen."""
+        for screen in self.state.screens.values():
+            if not screen.layout_dirty:
+                continue
+            screen.layout_dirty = False
+            if screen.layout is Layout.floating:
+                continue
+            targets = layout.compute_layout(
+                screen.layout,
+                screen.work_area_size,
+                [window.hwnd for window in screen.windows if not window.floating],
+            )
+            changed = layout.diff_rects(screen.layout_rects, targets)
+            screen.layout_rects = targets
+            if changed:
+                # Not superseded by a later batch, which only has what changed since this one.
+                self.window_operations.submit(GLOBAL_LANE, window_api.apply_window_rects, changed)
 
     def handle_window_manager_command(self, event: commands.WindowManagerCommand) -> None:
         # logger.debug("Handling window manager command, {} (State: {})", event, self)
 
         if isinstance(event, commands.FocusVirtualDesktop):
-            pyvda.VirtualDesktop(number=event.virtual_desktop_id).go()
-            # fully reset state, tracking state changes as we move virtual desktop is more pain than it's worth.
-            self.state = WindowManagerState.new()
+            window_api.go_to_virtual_desktop(event.virtual_desktop_id)
+            self.switch_virtual_desktop(VIRTUAL_DESKTOP_ID(event.virtual_desktop_id))
             if window_to_focus := self.state.focused_screen.focused_window:
                 self.composited_focus_window(window_to_focus)
         elif isinstance(event, commands.SendToVirtualDesktop):
             if window_to_move := self.state.focused_screen.focused_window:
-                pyvda.AppView(hwnd=window_to_move.hwnd).move(
-                    pyvda.VirtualDesktop(number=event.virtual_desktop_id)
+                self.send_window_to_virtual_desktop(
+                    window_to_move, VIRTUAL_DESKTOP_ID(event.virtual_desktop_id)
                 )
         elif isinstance(event, commands.StateDump):
             logger.info("State dump: {}", self.state)
+            logger.info("Event queue: {}", self.event_queue)
+            logger.info("Window cache: {}", WINDOW_CACHE)
+            logger.info("Window operations: {}", self.window_operations)
+            logger.info("Window rules: {}", COMPILED_WINDOW_RULES)
+        elif isinstance(event, commands.DumpFlightRecorder):
+            logger.info("Flight recorder:\n{}", FLIGHT_RECORDER.dump())
         elif isinstance(event, commands.CycleFocusedWindow):
             maybe_window_to_focus = self.state.command__cycle_window(event.direction)
             if maybe_window_to_focus is not None:
                 self.composited_focus_window(maybe_window_to_focus)
+        elif (
+            isinstance(event, (commands.SendToScreen, commands.MoveToScreen, commands.FocusScreen))
+            and event.screen_id not in self.state.screens
+        ):
+            # e.g. from the keyboard process, which has the keybinds of every screen id
+            logger.info("No screen {}, ignoring {}", event.screen_id, event)
         elif isinstance(event, (commands.SendToScreen, commands.MoveToScreen)):
             res = self.state.command__move_to_screen(screen_id=event.screen_id)
             if res is not None and res[1] != res[2]:  # from_screen != to_screen
                 window_to_move_and_focus, from_screen, to_screen = res
-                window_api.window_relative_move(
-                    window_to_move_and_focus.hwnd, from_screen.size, to_screen.size
-                )
+                # The layout of a tiled screen gives the window its place.
+                if to_screen.layout is Layout.floating:
+                    self.window_operations.submit(
+                        window_to_move_and_focus.hwnd,
+                        window_api.window_relative_move,
+                        window_to_move_and_focus.hwnd,
+                        from_screen.size,
+                        to_screen.size,
+                    )
                 if isinstance(event, commands.MoveToScreen):
                     self.composited_focus_window(window_to_move_and_focus)
                 else:
-                    window_api.centre_mouse_in_rect(self.state.focused_screen.work_area_size)
-                    window_api.focus_desktop()
+                    self.composited_focus_desktop()
+        elif isinstance(event, (commands.FocusPrevious, commands.CycleMRU)):
+            if isinstance(event, commands.FocusPrevious):
+                maybe_window_to_focus = self.state.command__focus_previous()
+            else:
+                maybe_window_to_focus = self.state.command__cycle_mru()
+            if maybe_window_to_focus is not None:
+                self.composited_focus_window(maybe_window_to_focus)
+        elif isinstance(event, commands.FocusDirection):
+            if (window := self.state.window_in_direction(event.direction)) is not None:
+                self.state.focused_screen_id = window.screen.screen_id
+                window.screen.focus_window(window)
+                self.composited_focus_window(window)
+            elif (screen := self.state.screen_in_direction(event.direction)) is not None:
+                self.handle_window_manager_command(commands.FocusScreen(screen.screen_id))
+        elif isinstance(event, commands.SwapDirection):
+            self.swap_direction(event.direction)
         elif isinstance(event, commands.FocusScreen):
             maybe_window_to_focus = self.state.command__focus_screen(screen_id=event.screen_id)
             if maybe_window_to_focus is not None:
                 self.composited_focus_window(maybe_window_to_focus)
             else:
-                window_api.centre_mouse_in_rect(self.state.focused_screen.work_area_size)
-                window_api.focus_desktop()
+                self.composited_focus_desktop()
         elif isinstance(event, commands.Minimise):
             maybe_window_to_toggle = self.state.focused_screen.focused_window
             if maybe_window_to_toggle is not None:
-                window_api.minimise_window(maybe_window_to_toggle.hwnd)
+                self.window_operations.submit(
+                    maybe_window_to_toggle.hwnd, window_api.minimise_window, maybe_window_to_toggle.hwnd
+                )
         elif isinstance(event, commands.ToggleMaximise):
             maybe_window_to_toggle = self.state.focused_screen.focused_window
             if maybe_window_to_toggle is not None:
-                window_api.window_max_toggle(maybe_window_to_toggle.hwnd)
+                self.window_operations.submit(
+                    maybe_window_to_toggle.hwnd, window_api.window_max_toggle, maybe_window_to_toggle.hwnd
+                )
         elif isinstance(event, commands.RecreateState):
             logger.info("Recreating state...")
-            self.state = WindowManagerState.new()
+            self.recreate_state()
         elif isinstance(event, commands.TogglePinWindow):
             maybe_window_to_toggle = self.state.focused_screen.focused_window
             if maybe_window_to_toggle is not None:
                 window_api.toggle_pin_window(maybe_window_to_toggle.hwnd)
+        elif isinstance(event, commands.SetLayout):
+            self.state.focused_screen.set_layout(event.layout)
+
+        self.apply_layouts()
+
+    def swap_direction(self, direction: Direction) -> None:
+        """Swap the focused window with the nearest one in `direction`, keeping it focused.
+
+        Tiled screens only need their rings swapped, the layouts move the windows. Floating windows trade
+        rects. Without a window in that direction, the focused window moves to the screen there, if any.
+
+        """
+        window = self.state.focused_screen.focused_window
+        if window is None:
+            return
+        other_window = self.state.window_in_direction(direction)
+        if other_window is None:
+            if (screen := self.state.screen_in_direction(direction)) is not None:
+                self.handle_window_manager_command(commands.MoveToScreen(screen.screen_id))
+            return
+
+        rect = self.state.spatial_index.rect(window.hwnd)
+        other_rect = self.state.spatial_index.rect(other_window.hwnd)
+        screen, other_screen = window.screen, other_window.screen
+        if screen is other_screen:
+            screen.swap_windows(window, other_window)
+        else:
+            screen.replace_window(window, other_window)
+            other_screen.replace_window(other_window, window)
+            other_screen.focus_window(window)
+            self.state.focused_screen_id = other_screen.screen_id
+
+        rects = {}
+        if other_rect is not None and (window.floating or window.screen.layout is Layout.floating):
+            rects[window.hwnd] = other_rect
+        if rect is not None and (other_window.floating or other_window.screen.layout is Layout.floating):
+            rects[other_window.hwnd] = rect
+        if rects:
+            self.window_operations.submit(GLOBAL_LANE, window_api.apply_window_rects, rects)
+        self.composited_focus_window(window)
+
+    def send_window_to_virtual_desktop(self, window: Window, virtual_desktop_id: VIRTUAL_DESKTOP_ID) -> None:
+        window_api.move_window_to_virtual_desktop(window.hwnd, virtual_desktop_id)
+        self.state.unregister_window(window.hwnd)
+        if target_state := self.states.get(virtual_desktop_id):
+            target_state.adopt_window(window)
+
+    def apply_window_rule(self, window: Window) -> None:
+        """Move a newly registered window pinned by a rule to where it belongs."""
+        rule = COMPILED_WINDOW_RULES.decide(window.hwnd)
+        if rule is None or rule.action is not Action.pin:
+            return
+        if rule.virtual_desktop_id is not None and rule.virtual_desktop_id != self.virtual_desktop_id:
+            self.send_window_to_virtual_desktop(window, VIRTUAL_DESKTOP_ID(rule.virtual_desktop_id))
+            return
+        monitor_screen = self.state.screens_by_monitor_handle.get(WINDOW_CACHE.monitor_handle(window.hwnd))
+        if monitor_screen in (None, window.screen):
+            return
+        # The layout of a tiled screen gives the window its place.
+        if window.screen.layout is Layout.floating:
+            self.window_operations.submit(
+                window.hwnd,
+                window_api.window_relative_move,
+                window.hwnd,
+                monitor_screen.size,
+                window.screen.size,
+            )
 
     def composited_focus_window(self, window: Window, disregard_mouse_move: bool = False) -> None:
-        try:
-            window_api.raise_and_focus_window(window.hwnd)
-            if MOUSE_FOLLOWS_FOCUS and not disregard_mouse_move:
-                window_api.centre_mouse_in_rect(window_api.get_window_rect(window.hwnd))
-        except Exception as exc:
-            logger.critical("Boom. Exception: {}", exc)
-            # fully reset state upon failure, cba to figure out what went wrong.
-            self.state = WindowManagerState.new()
+        # Only the latest focus and mouse move matter, earlier ones still pending are dropped.
+        self.window_operations.submit(
+            FOCUS_LANE,
+            window_api.raise_and_focus_window,
+            window.hwnd,
+            supersede_key="focus",
+            hwnd=window.hwnd,
+        )
+        if MOUSE_FOLLOWS_FOCUS and not disregard_mouse_move:
+            self.window_operations.submit(
+                FOCUS_LANE,
+                window_api.centre_mouse_in_window,
+                window.hwnd,
+                supersede_key="mouse",
+                hwnd=window.hwnd,
+            )
+
+    def composited_focus_desktop(self) -> None:
+        self.window_operations.submit(
+            FOCUS_LANE,
+            window_api.centre_mouse_in_rect,
+            self.state.focused_screen.work_area_size,
+            supersede_key="mouse",
+        )
+        self.window_operations.submit(FOCUS_LANE, window_api.focus_desktop, supersede_key="focus")
+
+    def on_window_operation_error(self, operation: WindowOperation, exc: BaseException) -> None:
+        logger.critical("Boom. Exception in {}: {}", operation.name, exc)
+        logger.critical("Flight recorder:\n{}", FLIGHT_RECORDER.dump())
+        # fully reset state upon failure, cba to figure out what went wrong.
+        self.event_queue.put(commands.RecreateState())
@@ -1,7 +1,10 @@
-﻿import dataclasses
+﻿import concurrent.futures
+import dataclasses
 import enum
 
 from mado.types_ import SCREEN_ID
+from mado.window_manager.layout import Layout
+from mado.window_manager.spatial_index import Direction
 
 
 @dataclasses.dataclass
@@ -86,3 +89,53 @@ class Noop(WindowManagerCommand):
     """Noop for silencing prefix hold down."""
 
     pass
+
+
+@dataclasses.dataclass
+class DumpFlightRecorder(WindowManagerCommand):
+    """Log the last events, commands and state transitions."""
+
+    pass
+
+
+@dataclasses.dataclass
+class SetLayout(WindowManagerCommand):
+    """Set the layout of the focused screen."""
+
+    layout: Layout
+
+
+@dataclasses.dataclass
+class FocusPrevious(WindowManagerCommand):
+    """Focus the window of the focused screen which was focused before the current one."""
+
+    pass
+
+
+@dataclasses.dataclass
+class CycleMRU(WindowManagerCommand):
+    """Focus the least recently focused window of the focused screen, repeating goes through all of them."""
+
+    pass
+
+
+@dataclasses.dataclass
+class FocusDirection(WindowManagerCommand):
+    """Focus the nearest window in a direction, on any screen, or the screen there if it has none."""
+
+    direction: Direction
+
+
+@dataclasses.dataclass
+class SwapDirection(WindowManagerCommand):
+    """Swap the focused window with the nearest window in a direction, or move it to the screen there."""
+
+    direction: Direction
+
+
+@dataclasses.dataclass
+class IpcCommand(WindowManagerCommand):
+    """A command sent over IPC, handled like `command` and then resolving `future`, see `mado.ipc`."""
+
+    command: WindowManagerCommand
+    future: concurrent.futures.Future = dataclasses.field(default_factory=concurrent.futures.Future)
@@ -0,0 +1,232 @@
+﻿import collections
+import dataclasses
+import enum
+import functools
+import queue
+import threading
+import time
+import typing
+
+from mado import metrics
+from mado.window_manager import commands
+from mado.window_manager import events
+
+
+class Closed(Exception):
+    """Raised by `PriorityEventQueue.get` once the queue has been closed and drained."""
+
+
+class Lane(enum.IntEnum):
+    """Priority lanes of the event loop, lower is served first."""
+
+    command = 0
+    lifecycle = 1
+    geometry = 2
+
+
+GEOMETRY_EVENT_TYPES = (
+    events.Moved,
+    events.MoveResizeStart,
+    events.MoveResizeEnd,
+    events.MouseCapture,
+    events.NameChange,
+)
+# Events after which a pending geometry event of the same window is meaningless, or even harmful to handle
+# (e.g. a `MoveResizeEnd` re-registering a destroyed window).
+BARRIER_EVENT_TYPES = (events.Destroy, events.Hide, events.Minimise, events.Cloak)
+
+_DROPPED = object()
+
+
+class _Slot:
+    """A queued item, which a coalesced event is swapped into so that it keeps its position."""
+
+    __slots__ = ("item", "enqueued_at")
+
+    def __init__(self, item: typing.Any, enqueued_at: float) -> None:
+        self.item = item
+        self.enqueued_at = enqueued_at
+
+
+def lane_of(item: typing.Any) -> Lane:
+    if isinstance(item, commands.WindowManagerCommand):
+        return Lane.command
+    if isinstance(item, GEOMETRY_EVENT_TYPES):
+        return Lane.geometry
+    return Lane.lifecycle
+
+
+@dataclasses.dataclass
+class LaneStats:
+    served: int = 0
+    dropped: int = 0
+    total_delay: float = 0.0
+    max_delay: float = 0.0
+
+    @property
+    def mean_delay(self) -> float:
+        return self.total_delay / self.served if self.served else 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"LaneStats(served={self.served}"
+            f", dropped={self.dropped}"
+            f", mean_delay={self.mean_delay * 1000:.3f}ms"
+            f", max_delay={self.max_delay * 1000:.3f}ms)"
+        )
+
+
+class PriorityEventQueue:
+    """The event loop queue, serving keyboard commands ahead of the window event backlog.
+
+    Items go into one of the `Lane`s, each of which is FIFO, and the highest priority non-empty lane is served
+    first. A lane which has been passed over `STARVATION_LIMIT` times in a row while non-empty is served next
+    regardless, so a flood of commands can't starve window events forever.
+
+    Dragging a window or an animating browser produces hundreds of `Moved` events per second, all of which are
+    equivalent to the last one as far as the window manager is concerned. Only the latest pending `Moved`,
+    `MoveResizeEnd` and `NameChange` is kept per window (taking the queue position of the first one), and
+    `BARRIER_EVENT_TYPES` drop the pending ones of their window.
+
+    """
+
+    STARVATION_LIMIT = 16
+    COALESCED_EVENT_TYPES = (events.Moved, events.MoveResizeEnd, events.NameChange, events.DisplayChange)
+
+    def __init__(self) -> None:
+        self._mutex = threading.Lock()
+        self._not_empty = threading.Condition(self._mutex)
+        self._lanes: typing.Tuple[typing.Deque[_Slot], ...] = tuple(collections.deque() for _ in Lane)
+        self._pending: typing.Dict[typing.Tuple[int, type], _Slot] = {}
+        self._passed_over = [0] * len(Lane)
+        self._size = 0
+        self._closed = False
+        self.stats: typing.Dict[Lane, LaneStats] = {lane: LaneStats() for lane in Lane}
+        # Called with every item put, before coalescing, e.g. `mado.journal.JournalWriter.record`.
+        self.tap: typing.Optional[typing.Callable[[typing.Any], None]] = None
+        for lane in Lane:
+            metrics.QUEUE_DEPTH.set_function(functools.partial(self._lane_depth, lane), lane.name)
+
+    def _lane_depth(self, lane: Lane) -> int:
+        # Approximate, tombstones are counted too.
+        return len(self._lanes[lane])
+
+    @property
+    def dropped(self) -> int:
+        return sum(stats.dropped for stats in self.stats.values())
+
+    def put(self, item: typing.Any) -> None:
+        if self.tap is not None:
+            self.tap(item)
+        enqueued_at = time.perf_counter()
+        lane = lane_of(item)
+        with self._not_empty:
+            if isinstance(item, self.COALESCED_EVENT_TYPES):
+                key = (item.hwnd, type(item))
+                if (slot := self._pending.get(key)) is not None:
+                    slot.item = item
+                    self.stats[lane].dropped += 1
+                    metrics.QUEUE_DROPPED.inc(lane.name)
+                    return
+                slot = _Slot(item, enqueued_at)
+                self._pending[key] = slot
+            else:
+                if isinstance(item, BARRIER_EVENT_TYPES):
+                    self._drop_pending(item.hwnd)
+                slot = _Slot(item, enqueued_at)
+            self._lanes[lane].append(slot)
+            self._size += 1
+            self._not_empty.notify()
+
+    def _drop_pending(self, hwnd: int) -> None:
+        for event_type in self.COALESCED_EVENT_TYPES:
+            if (slot := self._pending.pop((hwnd, event_type), None)) is not None:
+                # Left in its lane as a tombstone, skipped by `get`.
+                slot.item = _DROPPED
+                self._size -= 1
+                self.stats[Lane.geometry].dropped += 1
+                metrics.QUEUE_DROPPED.inc(Lane.geometry.name)
+
+    def get(self, block: bool = True, timeout: typing.Optional[float] = None) -> typing.Any:
+        return self.get_entry(block, timeout)[0]
+
+    def get_entry(
+        self, block: bool = True, timeout: typing.Optional[float] = None
+    ) -> typing.Tuple[typing.Any, float]:
+        """Like `get`, but also returns the `time.perf_counter` at which the item was queued."""
+        with self._not_empty:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while True:
+                while not self._size:
+                    if self._closed:
+                        raise Closed
+                    if not block:
+                        raise queue.Empty
+                    if deadline is None:
+                        self._not_empty.wait()
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0.0:
+                            raise queue.Empty
+                        self._not_empty.wait(remaining)
+
+                lane = self._next_lane()
+                slot = self._lanes[lane].popleft()
+                if slot.item is not _DROPPED:
+                    break
+
+            self._size -= 1
+            item, enqueued_at = slot.item, slot.enqueued_at
+            if isinstance(item, self.COALESCED_EVENT_TYPES):
+                key = (item.hwnd, type(item))
+                if self._pending.get(key) is slot:
+                    del self._pending[key]
+
+            delay = time.perf_counter() - enqueued_at
+            stats = self.stats[lane]
+            stats.served += 1
+            stats.total_delay += delay
+            if delay > stats.max_delay:
+                stats.max_delay = delay
+            metrics.QUEUE_DELAY_SECONDS.observe(delay, lane.name)
+            return item, enqueued_at
+
+    def _next_lane(self) -> Lane:
+        chosen = None
+        for lane in reversed(Lane):
+            if self._lanes[lane] and self._passed_over[lane] >= self.STARVATION_LIMIT:
+                chosen = lane
+                break
+        if chosen is None:
+            chosen = next(lane for lane in Lane if self._lanes[lane])
+
+        for lane in Lane:
+            if lane is chosen:
+                self._passed_over[lane] = 0
+            elif self._lanes[lane]:
+                self._passed_over[lane] += 1
+        return chosen
+
+    def close(self) -> None:
+        """Wake up every waiting `get`, which raises `Closed` once the queue is drained.
+
+        A `get` waits without a timeout, so this is also how the event loop is stopped on a Ctrl+C on Windows,
+        where a lock acquire can't be interrupted to deliver the `KeyboardInterrupt`.
+
+        """
+        with self._not_empty:
+            self._closed = True
+            self._not_empty.notify_all()
+
+    def qsize(self) -> int:
+        with self._mutex:
+            return self._size
+
+    def empty(self) -> bool:
+        return not self.qsize()
+
+    def __repr__(self) -> str:
+        with self._mutex:
+            depths = {lane.name: len(self._lanes[lane]) for lane in Lane}
+        stats = {lane.name: lane_stats for lane, lane_stats in self.stats.items()}
+        return f"PriorityEventQueue(pending={depths}, stats={stats})"
@@ -1,54 +1,69 @@
 ﻿import dataclasses
 import typing
 
-from mado.window import Window
+from mado.types_ import WINDOW_HANDLE
 
 
-@dataclasses.dataclass
+# Slotted, and only the hwnd rather than a `Window`: one is made for every win event, on the hook thread.
+@dataclasses.dataclass(slots=True)
 class WindowManagerEvent:
     win_event: typing.Optional[int]
-    window: Window
+    hwnd: WINDOW_HANDLE
+    # dwmsEventTime, milliseconds since system start. Journaled, replays drive the simulated clock with it.
+    timestamp: typing.Optional[int] = dataclasses.field(default=None, compare=False)
+    # `time.perf_counter` in the hook callback, what the event latency is measured from.
+    received_at: typing.Optional[float] = dataclasses.field(default=None, compare=False)
 
 
 class Destroy(WindowManagerEvent):
-    pass
+    __slots__ = ()
 
 
 class FocusChange(WindowManagerEvent):
-    pass
+    __slots__ = ()
 
 
 class Hide(WindowManagerEvent):
-    pass
+    __slots__ = ()
 
 
 class Cloak(WindowManagerEvent):
-    pass
+    __slots__ = ()
 
 
 class Minimise(WindowManagerEvent):
-    pass
+    __slots__ = ()
 
 
 class Show(WindowManagerEvent):
-    pass
+    __slots__ = ()
 
 
 class Uncloak(WindowManagerEvent):
-    pass
+    __slots__ = ()
 
 
 class MoveResizeStart(WindowManagerEvent):
-    pass
+    __slots__ = ()
 
 
 class MoveResizeEnd(WindowManagerEvent):
-    pass
+    __slots__ = ()
 
 
 class MouseCapture(WindowManagerEvent):
-    pass
+    __slots__ = ()
 
 
 class Moved(WindowManagerEvent):
-    pass
+    __slots__ = ()
+
+
+class NameChange(WindowManagerEvent):
+    __slots__ = ()
+
+
+class DisplayChange(WindowManagerEvent):
+    """The monitors changed, `win_event` is the window message and `hwnd` the hidden window which got it."""
+
+    __slots__ = ()
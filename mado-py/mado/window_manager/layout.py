@@ -0,0 +1,88 @@
+﻿"""Tiling layouts, as pure functions from a work area and a window order to target rects."""
+
+import enum
+import typing
+
+from mado.config import LAYOUT_GAP, LAYOUT_MASTER_RATIO
+from mado.types_ import WINDOW_HANDLE
+
+RECT = typing.Tuple[int, int, int, int]
+
+
+class Layout(enum.Enum):
+    # windows are left wherever they are, i.e. no layout
+    floating = enum.auto()
+    master_stack = enum.auto()
+    columns = enum.auto()
+    monocle = enum.auto()
+
+
+def _split(start: int, end: int, count: int) -> typing.List[typing.Tuple[int, int]]:
+    """Split [start, end) into `count` consecutive spans, spreading the rounding over them."""
+    length = end - start
+    return [(start + length * i // count, start + length * (i + 1) // count) for i in range(count)]
+
+
+def _shrink(rect: RECT, gap: int) -> RECT:
+    half = gap // 2
+    left, top, right, bottom = rect
+    return left + half, top + half, right - half, bottom - half
+
+
+def master_stack(
+    work_area: RECT, count: int, master_ratio: float = LAYOUT_MASTER_RATIO, gap: int = LAYOUT_GAP
+) -> typing.List[RECT]:
+    """The first window on the left, the rest stacked on the right."""
+    if count == 0:
+        return []
+    area = _shrink(work_area, gap)
+    left, top, right, bottom = area
+    if count == 1:
+        return [_shrink(area, gap)]
+
+    split = left + int((right - left) * master_ratio)
+    rects = [(left, top, split, bottom)]
+    rects.extend(
+        (split, span_top, right, span_bottom) for span_top, span_bottom in _split(top, bottom, count - 1)
+    )
+    return [_shrink(rect, gap) for rect in rects]
+
+
+def columns(work_area: RECT, count: int, gap: int = LAYOUT_GAP) -> typing.List[RECT]:
+    """Equal width columns, in window order from the left."""
+    if count == 0:
+        return []
+    left, top, right, bottom = _shrink(work_area, gap)
+    return [
+        _shrink((span_left, top, span_right, bottom), gap)
+        for span_left, span_right in _split(left, right, count)
+    ]
+
+
+def monocle(work_area: RECT, count: int, gap: int = LAYOUT_GAP) -> typing.List[RECT]:
+    """Every window takes the whole work area, the focused one is on top."""
+    return [_shrink(_shrink(work_area, gap), gap)] * count
+
+
+def compute_layout(
+    layout: Layout, work_area: RECT, window_handles: typing.Sequence[WINDOW_HANDLE]
+) -> typing.Dict[WINDOW_HANDLE, RECT]:
+    """Target rect of each window, empty for a floating layout."""
+    if layout is Layout.floating:
+        return {}
+    if layout is Layout.master_stack:
+        rects = master_stack(work_area, len(window_handles))
+    elif layout is Layout.columns:
+        rects = columns(work_area, len(window_handles))
+    elif layout is Layout.monocle:
+        rects = monocle(work_area, len(window_handles))
+    else:
+        raise NotImplementedError()
+    return dict(zip(window_handles, rects))
+
+
+def diff_rects(
+    current: typing.Dict[WINDOW_HANDLE, RECT], target: typing.Dict[WINDOW_HANDLE, RECT]
+) -> typing.Dict[WINDOW_HANDLE, RECT]:
+    """The windows of `target` that are not already at their target rect."""
+    return {hwnd: rect for hwnd, rect in target.items() if current.get(hwnd) != rect}
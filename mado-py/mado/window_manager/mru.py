@@ -0,0 +1,52 @@
+﻿import collections
+import typing
+
+from mado.types_ import WINDOW_HANDLE
+
+
+class MruHistory:
+    """Windows of a screen by how recently they were focused, as a hash linked list (i.e. an `OrderedDict`).
+
+    Every operation is O(1): touching moves a window to the most recent end, removing unlinks it, and the
+    lookups only look at the ends. Windows never focused sit at the least recent end, in insertion order.
+
+    """
+
+    def __init__(self) -> None:
+        # least recent first
+        self._windows: typing.OrderedDict[WINDOW_HANDLE, None] = collections.OrderedDict()
+
+    def add(self, hwnd: WINDOW_HANDLE) -> None:
+        if hwnd not in self._windows:
+            self._windows[hwnd] = None
+            self._windows.move_to_end(hwnd, last=False)
+
+    def touch(self, hwnd: WINDOW_HANDLE) -> None:
+        self._windows[hwnd] = None
+        self._windows.move_to_end(hwnd)
+
+    def remove(self, hwnd: WINDOW_HANDLE) -> None:
+        self._windows.pop(hwnd, None)
+
+    def most_recent(
+        self, other_than: typing.Optional[WINDOW_HANDLE] = None
+    ) -> typing.Optional[WINDOW_HANDLE]:
+        for hwnd in reversed(self._windows):
+            if hwnd != other_than:
+                return hwnd
+        return None
+
+    def least_recent(
+        self, other_than: typing.Optional[WINDOW_HANDLE] = None
+    ) -> typing.Optional[WINDOW_HANDLE]:
+        for hwnd in self._windows:
+            if hwnd != other_than:
+                return hwnd
+        return None
+
+    def __iter__(self) -> typing.Iterator[WINDOW_HANDLE]:
+        """Most recent first."""
+        return reversed(self._windows)
+
+    def __len__(self) -> int:
+        return len(self._windows)
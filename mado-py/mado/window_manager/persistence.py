@@ -0,0 +1,170 @@
+﻿"""Snapshot of the window manager states on disk, so a restart does not have to probe every window again.
+
+A snapshot only holds what can't be cheaply asked again: the screen each window is on, the window order and
+focus of each screen, and the layouts. It is only used when the monitors are still the same and the system
+wasn't restarted since, handles get reused by other windows across a reboot.
+
+Each window is saved with its process id and class name, a restored window must still have both, so a handle
+reused by another window since isn't mistaken for it. It must also still be a window we manage (visible,
+titled, not ignored by a rule and so on), only where it goes comes from the snapshot.
+
+"""
+
+import json
+import os
+import typing
+
+from loguru import logger
+
+from mado import window_api
+from mado.types_ import SCREEN_ID, VIRTUAL_DESKTOP_ID, WINDOW_HANDLE
+from mado.window import Window
+from mado.window_cache import WINDOW_CACHE
+from mado.window_manager.layout import Layout
+from mado.window_manager.state import WindowManagerState
+
+SNAPSHOT_VERSION = 2
+# Seconds the boot time of a snapshot may be off by, it is derived from the clock, which may be adjusted.
+BOOT_TIME_TOLERANCE = 60.0
+
+
+def _topology() -> typing.List[list]:
+    return [[monitor.name, list(monitor.rect)] for monitor in window_api.enum_display_monitors()]
+
+
+def _fingerprint(hwnd: WINDOW_HANDLE) -> list:
+    return [WINDOW_CACHE.process_id(hwnd), WINDOW_CACHE.class_name(hwnd)]
+
+
+def _dump_state(state: WindowManagerState) -> dict:
+    return {
+        "focused_screen_id": state.focused_screen_id,
+        "screens": {
+            screen_id: {
+                "layout": screen.layout.name,
+                "windows": [window.hwnd for window in screen.windows],
+                "focused_window": screen.focused_window.hwnd if screen.focused_window else None,
+                "floating_windows": [window.hwnd for window in screen.windows if window.floating],
+                "mru": list(screen.mru),
+            }
+            for screen_id, screen in state.screens.items()
+        },
+    }
+
+
+def dump_snapshot(states: typing.Dict[VIRTUAL_DESKTOP_ID, WindowManagerState]) -> dict:
+    return {
+        "version": SNAPSHOT_VERSION,
+        "boot_time": window_api.boot_time(),
+        "topology": _topology(),
+        "states": {
+            str(virtual_desktop_id): _dump_state(state) for virtual_desktop_id, state in states.items()
+        },
+        # A window destroyed since its event was queued is left out, and so isn't restored.
+        "fingerprints": {
+            str(hwnd): _fingerprint(hwnd)
+            for state in states.values()
+            for hwnd in state.windows
+            if window_api.is_window(hwnd)
+        },
+    }
+
+
+def save_snapshot(path: str, states: typing.Dict[VIRTUAL_DESKTOP_ID, WindowManagerState]) -> None:
+    """Write the snapshot next to `path` and swap it in, so a crash never leaves half a snapshot behind."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(dump_snapshot(states), f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path: str) -> typing.Optional[dict]:
+    """The snapshot at `path`, or None when there is none we can use for the current monitors."""
+    try:
+        with open(path) as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as exc:
+        logger.warning("Ignoring unreadable state snapshot {}: {}", path, exc)
+        return None
+
+    if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+        logger.info("Ignoring state snapshot {} of another version", path)
+        return None
+    boot_time = snapshot.get("boot_time")
+    if (
+        not isinstance(boot_time, (int, float))
+        or abs(boot_time - window_api.boot_time()) > BOOT_TIME_TOLERANCE
+    ):
+        logger.info("Ignoring state snapshot {}, it is from before the system was restarted", path)
+        return None
+    if snapshot.get("topology") != _topology():
+        logger.info("Ignoring state snapshot {}, the monitors changed", path)
+        return None
+    return snapshot
+
+
+def _restore_state(dumped: dict, live: typing.Set[WINDOW_HANDLE], is_current: bool) -> WindowManagerState:
+    state = WindowManagerState.empty()
+    if dumped["focused_screen_id"] in state.screens:
+        state.focused_screen_id = SCREEN_ID(dumped["focused_screen_id"])
+
+    for screen_id, dumped_screen in dumped["screens"].items():
+        screen = state.screens.get(SCREEN_ID(screen_id))
+        if screen is None:
+            continue
+        screen.layout = Layout[dumped_screen["layout"]]
+        floating_windows = set(dumped_screen.get("floating_windows", ()))
+        # Windows are inserted in front of the cursor, so inserting backwards gives back the same order.
+        for hwnd in dumped_screen["windows"][::-1]:
+            if hwnd in live and hwnd not in state.windows:
+                manage, _ = WindowManagerState.probe_window(hwnd, cloaked_ok=not is_current)
+                if not manage:
+                    continue
+                window = Window(WINDOW_HANDLE(hwnd))
+                window.floating = hwnd in floating_windows
+                screen.add_window(window)
+                state.windows[window.hwnd] = window
+                state.spatial_index.mark_dirty(window.hwnd)
+        for hwnd in dumped_screen.get("mru", ())[::-1]:
+            if hwnd in screen.ring:
+                screen.mru.touch(hwnd)
+        if (focused_window := dumped_screen["focused_window"]) is not None:
+            screen.ring.focus(focused_window)
+    return state
+
+
+def restore_states(
+    snapshot: dict, virtual_desktop_id: VIRTUAL_DESKTOP_ID
+) -> typing.Dict[VIRTUAL_DESKTOP_ID, WindowManagerState]:
+    """Rebuild the states of a snapshot, keeping only the windows which are still the same and still managed.
+
+    The state of the current virtual desktop is also reconciled, i.e. windows moved to another virtual desktop
+    since are dropped and the new ones registered. The other states are reconciled when switched to.
+
+    """
+    live_window_handles = WindowManagerState.enum_window_handles()
+    fingerprints = snapshot["fingerprints"]
+    live = {
+        hwnd
+        for hwnd in live_window_handles
+        if (fingerprint := fingerprints.get(str(hwnd))) is not None and fingerprint == _fingerprint(hwnd)
+    }
+
+    states = {}
+    for dumped_virtual_desktop_id, dumped in snapshot["states"].items():
+        restored_virtual_desktop_id = VIRTUAL_DESKTOP_ID(int(dumped_virtual_desktop_id))
+        states[restored_virtual_desktop_id] = _restore_state(
+            dumped, live, is_current=restored_virtual_desktop_id == virtual_desktop_id
+        )
+
+    if (state := states.get(virtual_desktop_id)) is not None:
+        restored = len(state.windows)
+        state.reconcile(live_window_handles)
+        logger.info(
+            "Restored {} windows from the state snapshot, managing {} after reconciling",
+            restored,
+            len(state.windows),
+        )
+    return states
@@ -0,0 +1,125 @@
+﻿import bisect
+import enum
+import typing
+
+from mado.types_ import WINDOW_HANDLE
+
+RECT = typing.Tuple[int, int, int, int]
+POINT = typing.Tuple[float, float]
+
+
+class Direction(enum.Enum):
+    left = enum.auto()
+    up = enum.auto()
+    right = enum.auto()
+    down = enum.auto()
+
+
+# Perpendicular distance counts this many times the distance along the direction, so the window straight ahead
+# wins over a closer one off to the side.
+PERPENDICULAR_WEIGHT = 2
+
+
+def centre(rect: RECT) -> POINT:
+    left, top, right, bottom = rect
+    return (left + right) / 2, (top + bottom) / 2
+
+
+def direction_score(origin: POINT, point: POINT, direction: Direction) -> typing.Optional[float]:
+    """How far `point` is from `origin` in `direction`, lower is nearer, `None` unless strictly beyond it."""
+    (x, y), (point_x, point_y) = origin, point
+    distance, perpendicular = {
+        Direction.left: (x - point_x, point_y - y),
+        Direction.up: (y - point_y, point_x - x),
+        Direction.right: (point_x - x, point_y - y),
+        Direction.down: (point_y - y, point_x - x),
+    }[direction]
+    if distance <= 0:
+        return None
+    return distance + PERPENDICULAR_WEIGHT * abs(perpendicular)
+
+
+class SpatialIndex:
+    """Window frame rects, their centres sorted along each axis for nearest neighbour queries by direction.
+
+    Windows are marked dirty when they are added or moved, and only the dirty ones have their rect probed
+    again, on the next query. A window the probe has no rect for (`None`, it's gone) is dropped. A query
+    walks the windows from the origin outwards along the direction, and stops once the distance along the
+    direction alone can't beat the best so far.
+
+    """
+
+    def __init__(self, probe_rect: typing.Callable[[WINDOW_HANDLE], typing.Optional[RECT]]) -> None:
+        self.probe_rect = probe_rect
+        self.rects: typing.Dict[WINDOW_HANDLE, RECT] = {}
+        self._centres: typing.Dict[WINDOW_HANDLE, POINT] = {}
+        # (centre x, hwnd) and (centre y, hwnd), sorted
+        self._xs: typing.List[typing.Tuple[float, WINDOW_HANDLE]] = []
+        self._ys: typing.List[typing.Tuple[float, WINDOW_HANDLE]] = []
+        self._dirty: typing.Set[WINDOW_HANDLE] = set()
+
+    def mark_dirty(self, hwnd: WINDOW_HANDLE) -> None:
+        self._dirty.add(hwnd)
+
+    def remove(self, hwnd: WINDOW_HANDLE) -> None:
+        self._dirty.discard(hwnd)
+        if (point := self._centres.pop(hwnd, None)) is not None:
+            del self.rects[hwnd]
+            self._xs.pop(bisect.bisect_left(self._xs, (point[0], hwnd)))
+            self._ys.pop(bisect.bisect_left(self._ys, (point[1], hwnd)))
+
+    def refresh(self) -> None:
+        dirty, self._dirty = self._dirty, set()
+        for hwnd in dirty:
+            rect = self.probe_rect(hwnd)
+            if self.rects.get(hwnd) == rect:
+                continue
+            self.remove(hwnd)
+            if rect is None:
+                continue
+            point = centre(rect)
+            self.rects[hwnd] = rect
+            self._centres[hwnd] = point
+            bisect.insort(self._xs, (point[0], hwnd))
+            bisect.insort(self._ys, (point[1], hwnd))
+
+    def rect(self, hwnd: WINDOW_HANDLE) -> typing.Optional[RECT]:
+        self.refresh()
+        return self.rects.get(hwnd)
+
+    def nearest(
+        self,
+        origin: POINT,
+        direction: Direction,
+        exclude: typing.Optional[WINDOW_HANDLE] = None,
+    ) -> typing.Optional[WINDOW_HANDLE]:
+        """The window nearest to `origin` in `direction` by its centre, strictly beyond it along that axis."""
+        self.refresh()
+        x, y = origin
+        if direction in (Direction.left, Direction.right):
+            axis, position, perpendicular_axis, perpendicular_position = self._xs, x, 1, y
+        else:
+            axis, position, perpendicular_axis, perpendicular_position = self._ys, y, 0, x
+
+        if direction in (Direction.left, Direction.up):
+            indices = range(bisect.bisect_left(axis, (position,)) - 1, -1, -1)
+        else:
+            # past every entry at `position`, whatever its hwnd
+            indices = range(bisect.bisect_right(axis, (position, float("inf"))), len(axis))
+
+        best, best_score = None, None
+        for index in indices:
+            coordinate, hwnd = axis[index]
+            distance = abs(coordinate - position)
+            if best_score is not None and distance >= best_score:
+                break
+            if hwnd == exclude:
+                continue
+            perpendicular = self._centres[hwnd][perpendicular_axis] - perpendicular_position
+            score = distance + PERPENDICULAR_WEIGHT * abs(perpendicular)
+            if best_score is None or score < best_score:
+                best, best_score = hwnd, score
+        return best
+
+    def __len__(self) -> int:
+        return len(self.rects)
@@ -2,22 +2,41 @@
 import typing
 from contextvars import ContextVar
 
-import win32gui
-import zipper
 from loguru import logger
-from win32api import EnumDisplayMonitors, GetMonitorInfo
 
-from mado import window_api
-from mado.config import IGNORED_WINDOW_TITLES, INIT_FOCUSED_SCREEN_ID, SCREEN_IDS, SCREEN_REMOVAL_PRIORITY
+from mado import metrics, window_api
+from mado.backends import MonitorInfo
+from mado.config import (
+    INIT_FOCUSED_SCREEN_ID,
+    TRACE,
+    WINDOW_RULES,
+)
+from mado.flight_recorder import FLIGHT_RECORDER
 from mado.types_ import MONITOR_HANDLE, SCREEN_ID, WINDOW_HANDLE
+from mado.window_cache import WINDOW_CACHE
 from mado.window import Window
 from mado.window_manager import commands
+from mado.window_manager.layout import RECT, Layout
+from mado.window_manager.mru import MruHistory
+from mado.window_manager.spatial_index import Direction, SpatialIndex, centre, direction_score
+from mado.window_manager.state_snapshot import ScreenSnapshot
+from mado.window_manager.topology import TopologyDiff, assign_screen_ids
+from mado.window_manager.window_ring import WindowRing
+from mado.window_rules import Action, WindowRule, WindowRules
 
 WINDOW_AT_CURSOR = object()
 WINDOW_MANAGER_STATE = ContextVar("WINDOW_MANAGER_STATE")
+COMPILED_WINDOW_RULES = WindowRules(WINDOW_RULES)
 
 
-@dataclasses.dataclass
+def probe_live_rect(hwnd: WINDOW_HANDLE) -> typing.Optional[RECT]:
+    # A window destroyed since its event was queued has no rect, it's left out until its Destroy is handled.
+    if not window_api.is_window(hwnd):
+        return None
+    return WINDOW_CACHE.rect(hwnd)
+
+
+@dataclasses.dataclass(slots=True)
 class Screen:
     """A physical screen(display/monitor)."""
 
@@ -29,86 +48,147 @@ class Screen:
 
     #
     screen_id: SCREEN_ID
-    cursor: zipper.Loc = dataclasses.field(
-        default=zipper.list([]),
-        repr=False,
+    ring: WindowRing = dataclasses.field(default_factory=WindowRing, repr=False)
+    mru: MruHistory = dataclasses.field(default_factory=MruHistory, repr=False)
+    layout: Layout = Layout.floating
+    # the rects last applied by the layout, so only the windows whose target changed are moved
+    layout_rects: typing.Dict[WINDOW_HANDLE, RECT] = dataclasses.field(default_factory=dict, repr=False)
+    # set when the windows of the screen changed, the layout is applied once the current event is handled
+    layout_dirty: bool = dataclasses.field(default=False, repr=False)
+    # the last snapshot of the screen, reset once it changed, and the ring order it had while that stays valid
+    published: typing.Optional[ScreenSnapshot] = dataclasses.field(default=None, repr=False, compare=False)
+    published_windows: typing.Optional[typing.Tuple[WINDOW_HANDLE, ...]] = dataclasses.field(
+        default=None, repr=False, compare=False
     )
 
     @property
     def focused_window(self) -> typing.Optional[Window]:
-        current = self.cursor.current
-        return current if current else None
+        return self.ring.current
 
     @property
     def windows(self) -> typing.List[Window]:
-        return list(self.cursor.top().children())
+        return list(self.ring)
 
     @classmethod
-    def from_handle(cls, handle: int, screen_id: SCREEN_ID) -> "Screen":
-        monitor_info = GetMonitorInfo(handle)
-        area = monitor_info["Monitor"]
-        work_area_size = monitor_info["Work"]
-        name = monitor_info["Device"].replace("\\\\.\\", "")
-
+    def from_monitor_info(cls, monitor_info: MonitorInfo, screen_id: SCREEN_ID) -> "Screen":
         return Screen(
-            handle=handle,
-            size=area,
-            work_area_size=work_area_size,
-            name=name,
+            handle=monitor_info.handle,
+            size=monitor_info.rect,
+            work_area_size=monitor_info.work_area,
+            name=monitor_info.name,
             screen_id=screen_id,
         )
 
+    @property
+    def monitor_info(self) -> MonitorInfo:
+        return MonitorInfo(handle=self.handle, rect=self.size, work_area=self.work_area_size, name=self.name)
+
+    def set_monitor_info(self, monitor_info: MonitorInfo) -> None:
+        self.handle = monitor_info.handle
+        self.size = monitor_info.rect
+        self.work_area_size = monitor_info.work_area
+        self.name = monitor_info.name
+        self.layout_rects.clear()
+        self.layout_dirty = True
+        self.published = None
+
+    def snapshot(self) -> ScreenSnapshot:
+        """The screen as it is now, the same object as last time if it didn't change since."""
+        if self.published is None:
+            if self.published_windows is None:
+                self.published_windows = self.ring.hwnds()
+            current = self.ring.current
+            self.published = ScreenSnapshot(
+                screen_id=self.screen_id,
+                name=self.name,
+                size=self.size,
+                work_area_size=self.work_area_size,
+                layout=self.layout,
+                windows=self.published_windows,
+                focused_window=current.hwnd if current is not None else None,
+            )
+        return self.published
+
     def add_window(self, window: Window) -> None:
-        window.workspace = self
-        if self.cursor.at_end():
-            self.cursor = self.cursor.append(window).down()
-        else:
-            self.cursor = self.cursor.insert_left(window).left()
+        window.screen = self
+        self.ring.insert(window)
+        self.mru.add(window.hwnd)
+        self.layout_dirty = True
+        self.published = self.published_windows = None
 
     def remove_window(self, window: Window = WINDOW_AT_CURSOR) -> None:
         if window == WINDOW_AT_CURSOR:
-            if self.cursor.at_end():
+            if self.ring.current is None:
                 logger.info("Cannot remove focused window in an empty workspace")
                 return
-            else:
-                self.cursor = self.cursor.remove()
-                # potential edge case where it went up one?
-                if self.cursor.at_end() and self.cursor.current:
-                    self.cursor = self.cursor.down()
-        else:
-            new_cursor = (
-                self.cursor
-                if self.cursor.node() == window
-                else self.cursor.find(lambda loc: loc.node() == window)
-            )
-            if new_cursor is None:
-                logger.critical("Can't find window {} to remove in workspace {}", window, self)
-            else:
-                self.cursor = new_cursor
-                self.remove_window()
+            window = self.ring.current
+        current = self.ring.current
+        if not self.ring.remove(window.hwnd):
+            logger.critical("Can't find window {} to remove in workspace {}", window, self)
+            return
+        self.mru.remove(window.hwnd)
+        # Focus goes back to the window last used, or stays where it was if it wasn't the removed window.
+        if current is not None and current.hwnd != window.hwnd:
+            self.ring.focus(current.hwnd)
+        elif (hwnd := self.mru.most_recent()) is not None:
+            self.ring.focus(hwnd)
+        self.layout_rects.pop(window.hwnd, None)
+        self.layout_dirty = True
+        self.published = self.published_windows = None
+
+    def swap_windows(self, window: Window, other_window: Window) -> None:
+        if self.ring.swap(window.hwnd, other_window.hwnd):
+            self.layout_dirty = True
+            self.published = self.published_windows = None
+
+    def replace_window(self, window: Window, new_window: Window) -> None:
+        """Put a window of another screen where `window` is, e.g. to swap windows across screens."""
+        if not self.ring.replace(window.hwnd, new_window):
+            return
+        new_window.screen = self
+        self.mru.remove(window.hwnd)
+        self.mru.add(new_window.hwnd)
+        self.layout_rects.pop(window.hwnd, None)
+        self.layout_dirty = True
+        self.published = self.published_windows = None
+
+    def set_layout(self, layout: Layout) -> None:
+        self.layout = layout
+        self.layout_rects.clear()
+        self.layout_dirty = True
+        self.published = None
 
     def focus_window(self, window: Window, raise_on_not_found: bool = True) -> None:
-        new_cursor = self.cursor.top().find(lambda loc: loc.node() == window)
-        if raise_on_not_found and new_cursor is None:
+        if self.ring.focus(window.hwnd):
+            self.mru.touch(window.hwnd)
+            self.published = None
+        elif raise_on_not_found:
             raise ValueError(f"Can't find window {window}")
-        if new_cursor is not None:
-            self.cursor = new_cursor
+
+    def focus_previous(self) -> typing.Optional[Window]:
+        """Move the cursor onto the most recently focused window other than the current one."""
+        current = self.ring.current
+        if (hwnd := self.mru.most_recent(other_than=current.hwnd if current else None)) is not None:
+            self.ring.focus(hwnd)
+        self.published = None
+        return self.ring.current
+
+    def cycle_mru(self) -> typing.Optional[Window]:
+        """Move the cursor onto the least recently focused window, going through all of them once focused."""
+        current = self.ring.current
+        if (hwnd := self.mru.least_recent(other_than=current.hwnd if current else None)) is not None:
+            self.ring.focus(hwnd)
+        self.published = None
+        return self.ring.current
 
     def cycle_window(self, direction: commands.CycleFocusedWindow.Direction) -> None:
         if direction is commands.CycleFocusedWindow.Direction.forward:
-            right = self.cursor.right() or self.cursor.top().down()
-            if right and right.current is not None:
-                self.cursor = right
-            else:
-                self.cursor = self.cursor.top()
+            self.ring.forward()
         elif direction is commands.CycleFocusedWindow.Direction.backward:
-            left = self.cursor.left() or self.cursor.top().rightmost_descendant()
-            if left and left.current is not None:
-                self.cursor = left
-            else:
-                self.cursor = self.cursor.top()
+            self.ring.backward()
         else:
             raise NotImplementedError()
+        self.published = None
 
     def __repr__(self) -> str:
         return (
@@ -117,6 +197,7 @@ class Screen:
             f", handle={self.handle}"
             f", work_area_size={self.work_area_size}"
             f", name={self.name}"
+            f", layout={self.layout.name}"
             f", screen_id={self.screen_id}"
             f", windows={self.windows}"
             f", focused_window={self.focused_window})"
@@ -129,6 +210,12 @@ class WindowManagerState:
     screens: typing.Dict[SCREEN_ID, Screen]
     screens_by_monitor_handle: typing.Dict[MONITOR_HANDLE, Screen]
     focused_screen_id: SCREEN_ID
+    # frame rects of the registered windows, for the directional commands
+    spatial_index: SpatialIndex = dataclasses.field(
+        default_factory=lambda: SpatialIndex(probe_live_rect), repr=False
+    )
+    # the live windows as of the last enumeration, which the next reconcile doesn't probe again
+    reconciled_handles: typing.Set[WINDOW_HANDLE] = dataclasses.field(default_factory=set, repr=False)
 
     @property
     def focused_screen(self) -> Screen:
@@ -136,42 +223,102 @@ class WindowManagerState:
 
     @classmethod
     def new(cls) -> "WindowManagerState":
+        state = cls.empty()
+        state.init_enum_windows()
+        state.activate()
+        return state
+
+    @classmethod
+    def empty(cls) -> "WindowManagerState":
+        """A state with the screens of the current monitors, and no windows."""
         windows = {}
         screens = {}
         screens_by_handle = {}
 
         # automatically figure out which screen ids to use
-        screens_to_use = SCREEN_IDS
-        display_monitors = EnumDisplayMonitors()
-        num_monitors = len(display_monitors)
-        if len(screens_to_use) < num_monitors:
-            raise RuntimeError("Not enough screen IDs.")
-        else:
-            for screen_to_remove in SCREEN_REMOVAL_PRIORITY[:(len(screens_to_use) - num_monitors)]:
-                logger.info(f"Removing screen {screen_to_remove}.")
-                screens_to_use.remove(screen_to_remove)
+        display_monitors = window_api.enum_display_monitors()
+        screens_to_use = assign_screen_ids(len(display_monitors))
 
-        for display_monitor, screen_id in zip(display_monitors, screens_to_use):
-            (monitor_handle, _, _) = display_monitor
-            screen = Screen.from_handle(monitor_handle, screen_id)
+        for monitor_info, screen_id in zip(display_monitors, screens_to_use):
+            screen = Screen.from_monitor_info(monitor_info, screen_id)
             screens[screen_id] = screen
-            screens_by_handle[MONITOR_HANDLE(int(monitor_handle))] = screen
+            screens_by_handle[monitor_info.handle] = screen
+
+        WINDOW_CACHE.set_monitor_rects({handle: screen.size for handle, screen in screens_by_handle.items()})
 
         focused_screen_id = INIT_FOCUSED_SCREEN_ID
-        state = WindowManagerState(windows, screens, screens_by_handle, focused_screen_id)
-        state.init_enum_windows()
-        WINDOW_MANAGER_STATE.set(state)
-        return state
+        return WindowManagerState(windows, screens, screens_by_handle, focused_screen_id)
 
-    def init_enum_windows(self):
-        init_window_handles = []
+    def activate(self) -> None:
+        WINDOW_MANAGER_STATE.set(self)
 
-        def register_window(hwnd, lParam):  # noqa
-            init_window_handles.append(WINDOW_HANDLE(hwnd))
+    @staticmethod
+    def enum_window_handles() -> typing.List[WINDOW_HANDLE]:
+        return window_api.enum_windows()
 
-        win32gui.EnumWindows(register_window, None)
-        for handle in init_window_handles[::-1]:
+    def init_enum_windows(self):
+        handles = self.enum_window_handles()
+        for handle in handles[::-1]:
             self.register_window(handle)
+        self.reconciled_handles = set(handles)
+
+    def apply_topology(self, diff: TopologyDiff) -> None:
+        """Add, remove and resize screens, without probing any window but those of the removed screens.
+
+        The windows of a removed screen go to the screen of the monitor they are now on, in one go.
+
+        """
+        for screen_id, monitor_info in diff.changed.items():
+            self.screens[screen_id].set_monitor_info(monitor_info)
+        for screen_id, monitor_info in diff.added.items():
+            self.screens[screen_id] = Screen.from_monitor_info(monitor_info, screen_id)
+        orphans = [window for screen_id in diff.removed for window in self.screens.pop(screen_id).windows]
+        self.screens_by_monitor_handle = {screen.handle: screen for screen in self.screens.values()}
+        if self.focused_screen_id not in self.screens:
+            self.focused_screen_id = (
+                INIT_FOCUSED_SCREEN_ID if INIT_FOCUSED_SCREEN_ID in self.screens else next(iter(self.screens))
+            )
+
+        fallback_screen = self.focused_screen
+        for window in reversed(orphans):
+            monitor_handle = WINDOW_CACHE.monitor_handle(window.hwnd)
+            self.screens_by_monitor_handle.get(monitor_handle, fallback_screen).add_window(window)
+            self.spatial_index.mark_dirty(window.hwnd)
+        FLIGHT_RECORDER.record("topology", list(diff.added), diff.removed, list(diff.changed), len(orphans))
+
+    def reconcile(self, live_window_handles: typing.Optional[typing.List[WINDOW_HANDLE]] = None) -> None:
+        """Bring a cached state in line with the live windows, probing only those new since the last one.
+
+        Known windows are dropped when they are gone, or when cloaked (i.e. moved to another virtual desktop)
+        if new, e.g. restored from a snapshot. New unknown windows are only fully probed when not cloaked.
+        The windows the last reconcile saw are left to the events: a window moved off the desktop is
+        unregistered by its `Cloak` while the desktop is the current one, or by `forget_window` when it is
+        shown on another one, and one moved onto the desktop is registered by its `Uncloak` once switched to.
+
+        """
+        if live_window_handles is None:
+            live_window_handles = self.enum_window_handles()
+        live = set(live_window_handles)
+        reconciled = self.reconciled_handles
+
+        for handle in [handle for handle in self.windows if handle not in live]:
+            self.unregister_window(handle)
+        # Not using the window cache for cloaking, the cloak events of the desktop switch may not be in yet.
+        for handle in [
+            handle
+            for handle in self.windows
+            if handle not in reconciled and window_api.is_window_cloaked(handle)
+        ]:
+            self.unregister_window(handle)
+
+        for handle in live_window_handles[::-1]:
+            if (
+                handle not in self.windows
+                and handle not in reconciled
+                and not window_api.is_window_cloaked(handle)
+            ):
+                self.register_window(handle)
+        self.reconciled_handles = live
 
     def set_focused_screen_id(
         self,
@@ -184,76 +331,161 @@ class WindowManagerState:
             self.focused_screen_id = self.screens_by_monitor_handle[monitor_handle].screen_id
         else:
             raise ValueError("Missing input.")
+        FLIGHT_RECORDER.record("focus_screen", self.focused_screen_id)
 
-    def set_focused_window(self, window: Window) -> None:
+    def set_focused_window(self, handle: WINDOW_HANDLE) -> None:
+        FLIGHT_RECORDER.record("focus", handle)
+        window = self.windows.get(handle)
         try:
-            if screen := self.windows.get(window.hwnd, window).screen:
+            if window is not None and (screen := window.screen):
                 screen.focus_window(window, raise_on_not_found=True)
                 return
         except ValueError:
             pass
+        if window is None:
+            window = Window(handle)
 
-        logger.debug(
-            "Invalid window {} workspace information, iterating over all screen to set focused window.",
-            window,
-        )
+        if TRACE:
+            logger.debug(
+                "Invalid window {} workspace information, iterating over all screen to set focused window.",
+                window,
+            )
 
         for screen in self.screens.values():
             screen.focus_window(window, raise_on_not_found=False)
 
-    def register_window(self, handle: WINDOW_HANDLE) -> None:
-        if handle in self.windows:
-            logger.debug("Duplicated window {} found. Not registering.", handle)
-            return
+    @staticmethod
+    def probe_window(
+        handle: WINDOW_HANDLE, cloaked_ok: bool = False
+    ) -> typing.Tuple[bool, typing.Optional[WindowRule]]:
+        """Whether the window is one we manage, and the rule saying how if any.
+
+        `cloaked_ok` is for windows of another virtual desktop, which are cloaked while it isn't current.
+
+        """
+        rule = None
+        manage = bool(
+            WINDOW_CACHE.is_visible(handle)
+            and WINDOW_CACHE.is_window(handle)
+            and (cloaked_ok or not WINDOW_CACHE.is_cloaked(handle))
+            and not WINDOW_CACHE.is_minimised(handle)
+            and not WINDOW_CACHE.is_state_system_invisible(handle)
+            and WINDOW_CACHE.title(handle)
+            and ((rule := COMPILED_WINDOW_RULES.decide(handle)) is None or rule.action is not Action.ignore)
+        )
+        return manage, rule
 
-        is_visible = bool(win32gui.IsWindowVisible(handle))
-        is_window = bool(win32gui.IsWindow(handle))
-        is_minimised = bool(win32gui.IsIconic(handle))
-        is_cloaked = bool(window_api.is_window_cloaked(handle))
-        is_state_system_invisible = bool(window_api.is_window_state_system_invisible(handle))
-        text = win32gui.GetWindowText(handle)
-
-        if (
-            is_visible
-            and is_window
-            and not is_cloaked
-            and not is_minimised
-            and not is_state_system_invisible
-            and text
-            and text not in IGNORED_WINDOW_TITLES
-        ):
-            logger.debug("Registering window {}", handle)
+    def register_window(self, handle: WINDOW_HANDLE) -> typing.Optional[Window]:
+        """Register the window if it is one we manage, returns it if it was registered."""
+        if handle in self.windows:
+            if TRACE:
+                logger.debug("Duplicated window {} found. Not registering.", handle)
+            return None
+
+        manage, rule = self.probe_window(handle)
+        if manage:
+            if TRACE:
+                logger.debug("Registering window {}", handle)
             window = Window(handle)
-            monitor_handle = window_api.get_monitor_handle_from_window(handle)
-            screen = self.screens_by_monitor_handle[monitor_handle]
+            window.floating = rule is not None and rule.action is Action.float
+            if (screen := self.pinned_screen(rule)) is None:
+                screen = self.screens_by_monitor_handle[WINDOW_CACHE.monitor_handle(handle)]
             screen.add_window(window)
             self.windows[handle] = window
             window.screen = screen
+            self.spatial_index.mark_dirty(handle)
+            FLIGHT_RECORDER.record("register", handle, screen.screen_id)
+            return window
+        return None
+
+    def pinned_screen(self, rule: typing.Optional[WindowRule]) -> typing.Optional[Screen]:
+        """The screen `rule` pins its windows to, if we have it."""
+        if rule is not None and rule.action is Action.pin and rule.screen_id is not None:
+            return self.screens.get(rule.screen_id)
+        return None
 
     def force_register_window(self, handle: WINDOW_HANDLE) -> None:
-        logger.debug("Force registering window {}", handle)
+        if TRACE:
+            logger.debug("Force registering window {}", handle)
         if handle in self.windows:
-            logger.debug("Found registered window {}, removing.", handle)
+            if TRACE:
+                logger.debug("Found registered window {}, removing.", handle)
             old_window = self.windows.pop(handle)
             old_window.screen.remove_window(old_window)
 
+        rule = COMPILED_WINDOW_RULES.decide(handle)
+        if rule is not None and rule.action is Action.ignore:
+            return
         window = Window(handle)
-        monitor_handle = window_api.get_monitor_handle_from_window(handle)
+        window.floating = rule is not None and rule.action is Action.float
         self.windows[handle] = window
-        screen = self.screens_by_monitor_handle[monitor_handle]
+        if (screen := self.pinned_screen(rule)) is None:
+            screen = self.screens_by_monitor_handle[WINDOW_CACHE.monitor_handle(handle)]
         screen.add_window(window)
         window.screen = screen
+        self.spatial_index.mark_dirty(handle)
         self.focused_screen_id = screen.screen_id
+        FLIGHT_RECORDER.record("force_register", handle, screen.screen_id)
+
+    def track_window_move(self, handle: WINDOW_HANDLE) -> bool:
+        """Move a registered window to the screen of its monitor, returns whether it changed screen.
+
+        Nothing changes while it stays on the monitor of its screen, which is almost every move, or when a
+        rule pins it to its screen.
+
+        """
+        window = self.windows[handle]
+        screen = self.screens_by_monitor_handle.get(WINDOW_CACHE.monitor_handle(handle))
+        if screen is None or screen is window.screen:
+            metrics.WINDOW_MOVES.inc("noop")
+            return False
+        if self.pinned_screen(COMPILED_WINDOW_RULES.decide(handle)) is not None:
+            metrics.WINDOW_MOVES.inc("pinned")
+            return False
+
+        if TRACE:
+            logger.debug(
+                "Window {} moved from screen {} to {}", handle, window.screen.screen_id, screen.screen_id
+            )
+        window.screen.remove_window(window)
+        screen.add_window(window)
+        metrics.WINDOW_MOVES.inc("migrated")
+        FLIGHT_RECORDER.record("migrate", handle, screen.screen_id)
+        return True
+
+    def adopt_window(self, window: Window) -> None:
+        """Take over a window registered in another state, onto the screen of the same id."""
+        if window.hwnd in self.windows:
+            return
+
+        screen = self.screens.get(window.screen.screen_id) if window.screen else None
+        if screen is None:
+            screen = self.screens_by_monitor_handle[WINDOW_CACHE.monitor_handle(window.hwnd)]
+        screen.add_window(window)
+        self.windows[window.hwnd] = window
+        self.spatial_index.mark_dirty(window.hwnd)
 
     def unregister_window(self, handle: WINDOW_HANDLE) -> typing.Optional[Window]:
         window = self.windows.pop(handle, None)
         if window is None:
-            logger.debug("Un-registered window {} - skipping unregister.", handle)
+            if TRACE:
+                logger.debug("Un-registered window {} - skipping unregister.", handle)
             return
 
         window.screen.remove_window(window=window)
+        self.spatial_index.remove(handle)
+        FLIGHT_RECORDER.record("unregister", handle, window.screen.screen_id)
         return window.screen.focused_window
 
+    def forget_window(self, handle: WINDOW_HANDLE) -> None:
+        """Drop a window of this state seen on another virtual desktop, or destroyed.
+
+        The next reconcile probes it again, it may be shown on every virtual desktop.
+
+        """
+        self.unregister_window(handle)
+        self.reconciled_handles.discard(handle)
+
     def query_is_window_registered(self, handle: WINDOW_HANDLE) -> bool:
         return self.windows.get(handle, None) is not None
 
@@ -279,6 +511,33 @@ class WindowManagerState:
                 target_screen,
             )
 
+    def window_in_direction(self, direction: Direction) -> typing.Optional[Window]:
+        """The window nearest to the focused one (or the focused screen if it has none) in `direction`."""
+        focused_window = self.focused_screen.focused_window
+        exclude = None
+        origin = centre(self.focused_screen.work_area_size)
+        if focused_window is not None:
+            exclude = focused_window.hwnd
+            if (rect := self.spatial_index.rect(focused_window.hwnd)) is not None:
+                origin = centre(rect)
+        return self.windows.get(self.spatial_index.nearest(origin, direction, exclude=exclude))
+
+    def screen_in_direction(self, direction: Direction) -> typing.Optional[Screen]:
+        """The screen nearest to the focused one in `direction`, there are only ever a handful to look at."""
+        origin = centre(self.focused_screen.size)
+        best, best_score = None, None
+        for screen in self.screens.values():
+            score = direction_score(origin, centre(screen.size), direction)
+            if score is not None and (best_score is None or score < best_score):
+                best, best_score = screen, score
+        return best
+
+    def command__focus_previous(self) -> typing.Optional[Window]:
+        return self.focused_screen.focus_previous()
+
+    def command__cycle_mru(self) -> typing.Optional[Window]:
+        return self.focused_screen.cycle_mru()
+
     def command__focus_screen(self, screen_id: SCREEN_ID) -> typing.Optional[Window]:
         self.focused_screen_id = screen_id
         return self.focused_screen.focused_window
@@ -0,0 +1,154 @@
+﻿"""Immutable views of the window manager state, for reading from other threads without locking.
+
+The event loop publishes a `StateSnapshot` after every event and command it handles
+(`WindowManager.state_snapshot`), readers just take the reference. Snapshots share structure: a screen which
+didn't change since the last one keeps its `ScreenSnapshot`, and one where only the focus moved keeps its
+windows tuple, so publishing costs a check per screen unless something changed. `version` only moves when the
+snapshot does.
+
+`diff` turns two snapshots into the deltas `mado.feed` streams, skipping the screens they share.
+
+"""
+
+import dataclasses
+import typing
+
+from mado.types_ import SCREEN_ID, VIRTUAL_DESKTOP_ID, WINDOW_HANDLE
+from mado.window_manager.layout import RECT, Layout
+
+if typing.TYPE_CHECKING:
+    from mado.window_manager.state import WindowManagerState
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class ScreenSnapshot:
+    screen_id: SCREEN_ID
+    name: str
+    size: RECT
+    work_area_size: RECT
+    layout: Layout
+    # in ring order
+    windows: typing.Tuple[WINDOW_HANDLE, ...]
+    focused_window: typing.Optional[WINDOW_HANDLE]
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "screen_id": self.screen_id,
+            "name": self.name,
+            "size": list(self.size),
+            "work_area_size": list(self.work_area_size),
+            "layout": self.layout.name,
+            "windows": list(self.windows),
+            "focused_window": self.focused_window,
+        }
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class StateSnapshot:
+    version: int
+    virtual_desktop_id: VIRTUAL_DESKTOP_ID
+    focused_screen_id: SCREEN_ID
+    screens: typing.Tuple[ScreenSnapshot, ...]
+
+    def screen(self, screen_id: SCREEN_ID) -> typing.Optional[ScreenSnapshot]:
+        return next((screen for screen in self.screens if screen.screen_id == screen_id), None)
+
+    @property
+    def focused_window(self) -> typing.Optional[WINDOW_HANDLE]:
+        screen = self.screen(self.focused_screen_id)
+        return screen.focused_window if screen is not None else None
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "version": self.version,
+            "virtual_desktop_id": self.virtual_desktop_id,
+            "focused_screen_id": self.focused_screen_id,
+            "focused_window": self.focused_window,
+            "screens": [screen.to_dict() for screen in self.screens],
+        }
+
+
+DELTA = typing.Dict[str, typing.Any]
+
+
+def _monitor_and_layout(screen: ScreenSnapshot) -> typing.Tuple[typing.Any, ...]:
+    return screen.name, screen.size, screen.work_area_size, screen.layout
+
+
+def _diff_screen(old: ScreenSnapshot, new: ScreenSnapshot) -> typing.List[DELTA]:
+    if _monitor_and_layout(old) != _monitor_and_layout(new):
+        return [{"type": "screen_changed", **new.to_dict()}]
+    deltas = []
+    if old.windows is not new.windows:
+        old_windows, new_windows = set(old.windows), set(new.windows)
+        if [hwnd for hwnd in old.windows if hwnd in new_windows] != [
+            hwnd for hwnd in new.windows if hwnd in old_windows
+        ]:
+            # e.g. swapped windows
+            return [{"type": "screen_changed", **new.to_dict()}]
+        for hwnd in old.windows:
+            if hwnd not in new_windows:
+                deltas.append({"type": "window_removed", "screen_id": new.screen_id, "hwnd": hwnd})
+        # In ascending index, so inserting each one where it says gives back `new.windows`.
+        for index, hwnd in enumerate(new.windows):
+            if hwnd not in old_windows:
+                deltas.append(
+                    {"type": "window_added", "screen_id": new.screen_id, "hwnd": hwnd, "index": index}
+                )
+    if old.focused_window != new.focused_window:
+        deltas.append({"type": "window_focused", "screen_id": new.screen_id, "hwnd": new.focused_window})
+    return deltas
+
+
+def diff(old: StateSnapshot, new: StateSnapshot) -> typing.List[DELTA]:
+    """The deltas from `old` to `new`, each one a JSON-able dict with a `type`.
+
+    `desktop_switched`, `screen_removed` and `screen_added` (with the whole screen) come first, then per
+    screen `window_removed`, `window_added` (with its index in the new ring order) and `window_focused`, or
+    `screen_changed` (with the whole screen) if its layout, monitor or window order changed, and
+    `screen_focused` last.
+
+    """
+    if old is new:
+        return []
+    deltas: typing.List[DELTA] = []
+    if old.virtual_desktop_id != new.virtual_desktop_id:
+        deltas.append({"type": "desktop_switched", "virtual_desktop_id": new.virtual_desktop_id})
+    old_screens = {screen.screen_id: screen for screen in old.screens}
+    new_screen_ids = {screen.screen_id for screen in new.screens}
+    for screen_id in old_screens:
+        if screen_id not in new_screen_ids:
+            deltas.append({"type": "screen_removed", "screen_id": screen_id})
+    for screen in new.screens:
+        if screen.screen_id not in old_screens:
+            deltas.append({"type": "screen_added", **screen.to_dict()})
+    for screen in new.screens:
+        old_screen = old_screens.get(screen.screen_id)
+        if old_screen is not None and old_screen is not screen:
+            deltas.extend(_diff_screen(old_screen, screen))
+    if old.focused_screen_id != new.focused_screen_id:
+        deltas.append({"type": "screen_focused", "screen_id": new.focused_screen_id})
+    return deltas
+
+
+def publish(
+    previous: typing.Optional[StateSnapshot],
+    state: "WindowManagerState",
+    virtual_desktop_id: VIRTUAL_DESKTOP_ID,
+) -> StateSnapshot:
+    """A snapshot of `state`, `previous` itself if nothing changed since."""
+    screens = tuple(screen.snapshot() for screen in state.screens.values())
+    if (
+        previous is not None
+        and previous.focused_screen_id == state.focused_screen_id
+        and previous.virtual_desktop_id == virtual_desktop_id
+        and len(previous.screens) == len(screens)
+        and all(old is new for old, new in zip(previous.screens, screens))
+    ):
+        return previous
+    return StateSnapshot(
+        version=previous.version + 1 if previous is not None else 1,
+        virtual_desktop_id=virtual_desktop_id,
+        focused_screen_id=state.focused_screen_id,
+        screens=screens,
+    )
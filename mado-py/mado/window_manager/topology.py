@@ -0,0 +1,93 @@
+﻿"""Which screen each monitor is, and what changes when the monitors do, e.g. on docking or undocking.
+
+Nothing here talks to the win api, the window manager feeds it `window_api.enum_display_monitors()`.
+
+"""
+
+import dataclasses
+import typing
+
+from mado.backends import MonitorInfo
+from mado.config import SCREEN_IDS, SCREEN_REMOVAL_PRIORITY
+from mado.types_ import SCREEN_ID
+
+
+def assign_screen_ids(
+    num_monitors: int,
+    screen_ids: typing.Sequence[SCREEN_ID] = SCREEN_IDS,
+    removal_priority: typing.Sequence[SCREEN_ID] = SCREEN_REMOVAL_PRIORITY,
+) -> typing.List[SCREEN_ID]:
+    """The screen ids to use with `num_monitors` monitors, in monitor order."""
+    if len(screen_ids) < num_monitors:
+        raise RuntimeError("Not enough screen IDs.")
+    removed = set(removal_priority[: len(screen_ids) - num_monitors])
+    return [screen_id for screen_id in screen_ids if screen_id not in removed]
+
+
+@dataclasses.dataclass(frozen=True)
+class TopologyDiff:
+    added: typing.Dict[SCREEN_ID, MonitorInfo] = dataclasses.field(default_factory=dict)
+    removed: typing.List[SCREEN_ID] = dataclasses.field(default_factory=list)
+    # kept screens whose monitor changed, e.g. its resolution, work area or handle
+    changed: typing.Dict[SCREEN_ID, MonitorInfo] = dataclasses.field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+def diff_topology(
+    screens: typing.Mapping[SCREEN_ID, MonitorInfo],
+    monitors: typing.Sequence[MonitorInfo],
+    screen_ids: typing.Sequence[SCREEN_ID] = SCREEN_IDS,
+    removal_priority: typing.Sequence[SCREEN_ID] = SCREEN_REMOVAL_PRIORITY,
+) -> TopologyDiff:
+    """How to get from the monitors of `screens` to `monitors`, keeping as many screens as possible.
+
+    A monitor stays the same screen if it keeps its device name, or failing that its handle. Other monitors
+    get the ids `assign_screen_ids` would give them, reusing the id of a screen which lost its monitor before
+    taking a spare one, so that e.g. swapping a monitor for another keeps its windows.
+
+    """
+    unmatched = dict(screens)
+    kept: typing.Dict[SCREEN_ID, MonitorInfo] = {}
+    for key in ("name", "handle"):
+        for monitor in monitors:
+            if monitor in kept.values():
+                continue
+            screen_id = next(
+                (
+                    screen_id
+                    for screen_id, monitor_info in unmatched.items()
+                    if getattr(monitor_info, key) == getattr(monitor, key)
+                ),
+                None,
+            )
+            if screen_id is not None:
+                kept[screen_id] = monitor
+                del unmatched[screen_id]
+
+    added, changed = {}, {}
+    candidates = [
+        screen_id
+        for screen_id in dict.fromkeys(
+            [*assign_screen_ids(len(monitors), screen_ids, removal_priority), *screen_ids]
+        )
+        if screen_id not in kept
+    ]
+    candidates.sort(key=lambda screen_id: screen_id not in unmatched)
+    for monitor in monitors:
+        if monitor in kept.values():
+            continue
+        if not candidates:
+            raise RuntimeError("Not enough screen IDs.")
+        screen_id = candidates.pop(0)
+        if screen_id in unmatched:
+            del unmatched[screen_id]
+            changed[screen_id] = monitor
+        else:
+            added[screen_id] = monitor
+
+    for screen_id, monitor in kept.items():
+        if screens[screen_id] != monitor:
+            changed[screen_id] = monitor
+    return TopologyDiff(added=added, removed=list(unmatched), changed=changed)
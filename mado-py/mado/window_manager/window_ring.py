@@ -0,0 +1,135 @@
+﻿import typing
+
+from mado.types_ import WINDOW_HANDLE
+from mado.window import Window
+
+
+class WindowRing:
+    """Ordered windows of a screen with a cursor, as a hwnd indexed circular doubly linked list.
+
+    Every operation other than iteration is O(1). Ordering semantics follow the zipper the screen used to be
+    backed by: new windows are inserted in front of the cursor and take the cursor, removing a window moves
+    the cursor onto its predecessor (or the new first window if it was the first one).
+
+    """
+
+    def __init__(self) -> None:
+        self._windows: typing.Dict[WINDOW_HANDLE, Window] = {}
+        self._next: typing.Dict[WINDOW_HANDLE, WINDOW_HANDLE] = {}
+        self._prev: typing.Dict[WINDOW_HANDLE, WINDOW_HANDLE] = {}
+        self._head: typing.Optional[WINDOW_HANDLE] = None
+        self._cursor: typing.Optional[WINDOW_HANDLE] = None
+
+    @property
+    def current(self) -> typing.Optional[Window]:
+        return self._windows[self._cursor] if self._cursor is not None else None
+
+    def insert(self, window: Window) -> None:
+        """Insert window in front of the cursor and move the cursor onto it."""
+        hwnd = window.hwnd
+        if hwnd in self._windows:
+            self.remove(hwnd)
+
+        self._windows[hwnd] = window
+        if self._cursor is None:
+            self._head = hwnd
+            self._next[hwnd] = self._prev[hwnd] = hwnd
+        else:
+            after = self._cursor
+            before = self._prev[after]
+            self._next[before] = hwnd
+            self._prev[hwnd] = before
+            self._next[hwnd] = after
+            self._prev[after] = hwnd
+            if after == self._head:
+                self._head = hwnd
+        self._cursor = hwnd
+
+    def remove(self, hwnd: WINDOW_HANDLE) -> bool:
+        if self._windows.pop(hwnd, None) is None:
+            return False
+
+        before = self._prev.pop(hwnd)
+        after = self._next.pop(hwnd)
+        if after == hwnd:
+            self._head = self._cursor = None
+            return True
+
+        self._next[before] = after
+        self._prev[after] = before
+        if hwnd == self._head:
+            self._head = self._cursor = after
+        else:
+            self._cursor = before
+        return True
+
+    def focus(self, hwnd: WINDOW_HANDLE) -> bool:
+        if hwnd not in self._windows:
+            return False
+        self._cursor = hwnd
+        return True
+
+    def swap(self, hwnd: WINDOW_HANDLE, other_hwnd: WINDOW_HANDLE) -> bool:
+        """Swap the positions of two windows, the cursor stays on the same window."""
+        if hwnd not in self._windows or other_hwnd not in self._windows or hwnd == other_hwnd:
+            return False
+
+        def swapped(h: WINDOW_HANDLE) -> WINDOW_HANDLE:
+            return other_hwnd if h == hwnd else hwnd if h == other_hwnd else h
+
+        links = (self._next[hwnd], self._prev[hwnd], self._next[other_hwnd], self._prev[other_hwnd])
+        for neighbour in set(links) - {hwnd, other_hwnd}:
+            self._next[neighbour] = swapped(self._next[neighbour])
+            self._prev[neighbour] = swapped(self._prev[neighbour])
+        next_, prev, other_next, other_prev = (swapped(h) for h in links)
+        self._next[hwnd], self._prev[hwnd] = other_next, other_prev
+        self._next[other_hwnd], self._prev[other_hwnd] = next_, prev
+        self._head = swapped(self._head)
+        return True
+
+    def replace(self, hwnd: WINDOW_HANDLE, window: Window) -> bool:
+        """Put `window` where `hwnd` is, taking the cursor if `hwnd` had it."""
+        if hwnd not in self._windows or window.hwnd in self._windows:
+            return False
+
+        new_hwnd = window.hwnd
+        del self._windows[hwnd]
+        self._windows[new_hwnd] = window
+        before, after = self._prev.pop(hwnd), self._next.pop(hwnd)
+        if after == hwnd:
+            before = after = new_hwnd
+        self._prev[new_hwnd], self._next[new_hwnd] = before, after
+        self._next[before], self._prev[after] = new_hwnd, new_hwnd
+        if self._head == hwnd:
+            self._head = new_hwnd
+        if self._cursor == hwnd:
+            self._cursor = new_hwnd
+        return True
+
+    def forward(self) -> None:
+        if self._cursor is not None:
+            self._cursor = self._next[self._cursor]
+
+    def backward(self) -> None:
+        if self._cursor is not None:
+            self._cursor = self._prev[self._cursor]
+
+    def __contains__(self, hwnd: WINDOW_HANDLE) -> bool:
+        return hwnd in self._windows
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+    def hwnds(self) -> typing.Tuple[WINDOW_HANDLE, ...]:
+        """The handles in order, without going through the windows."""
+        hwnd, next_, hwnds = self._head, self._next, []
+        for _ in range(len(next_)):
+            hwnds.append(hwnd)
+            hwnd = next_[hwnd]
+        return tuple(hwnds)
+
+    def __iter__(self) -> typing.Iterator[Window]:
+        hwnd = self._head
+        for _ in range(len(self._windows)):
+            yield self._windows[hwnd]
+            hwnd = self._next[hwnd]
@@ -0,0 +1,250 @@
+﻿import collections
+import concurrent.futures
+import dataclasses
+import threading
+import time
+import typing
+
+from loguru import logger
+
+from mado import metrics, window_api
+
+# Lane of the operations which are not about a window, e.g. applying a batch of window rects.
+GLOBAL_LANE = None
+# Lane of the focus and mouse moves, which must run in the order they were submitted whichever window they are
+# about, or an earlier focus still running on one window's lane could land after a later one on another.
+FOCUS_LANE = "focus"
+
+LANE = typing.Optional[typing.Union[int, str]]
+
+
+class WindowHung(Exception):
+    """The window is not responding, so its operations are skipped rather than waited on."""
+
+
+@dataclasses.dataclass
+class WindowOperation:
+    lane: LANE
+    # the window it is about, checked for being hung before running, if any.
+    hwnd: typing.Optional[int]
+    name: str
+    func: typing.Callable
+    args: tuple
+    # a pending operation with the same key is cancelled by this one, e.g. only the last focus matters.
+    supersede_key: typing.Optional[typing.Hashable]
+    future: concurrent.futures.Future = dataclasses.field(default_factory=concurrent.futures.Future)
+    deadline: float = 0.0
+
+
+class WindowOperationExecutor:
+    """Run window operations on worker threads, so a window not pumping its messages can't stall the loop.
+
+    Operations of the same window (lane) run one at a time in submission order, different windows run in
+    parallel, except for focus and mouse moves which share `FOCUS_LANE`. An operation still running after
+    `timeout` is failed with `TimeoutError` by the watchdog, its window is considered hung and the stuck
+    worker is replaced. Until the stuck call returns, and while `is_window_hung` says so, operations of that
+    window fail fast with `WindowHung`. A shared lane carries on with the next operation on the new worker
+    instead, so one hung window doesn't stop the focus of every other one.
+
+    With `workers=0`, operations run inline on submit, which is what the simulated backend wants.
+
+    """
+
+    HUNG_CHECK_TTL = 1.0
+
+    def __init__(
+        self,
+        workers: int,
+        timeout: float,
+        on_error: typing.Optional[typing.Callable[[WindowOperation, BaseException], None]] = None,
+        is_window_hung: typing.Callable[[int], bool] = window_api.is_window_hung,
+    ) -> None:
+        self.workers = workers
+        self.timeout = timeout
+        self.on_error = on_error
+        self.is_window_hung = is_window_hung
+        self._condition = threading.Condition()
+        self._pending: typing.Dict[LANE, typing.Deque[WindowOperation]] = {}
+        self._ready: typing.Deque[LANE] = collections.deque()
+        self._running: typing.Dict[LANE, WindowOperation] = {}
+        self._stuck: typing.Set[LANE] = set()
+        self._by_supersede_key: typing.Dict[typing.Hashable, WindowOperation] = {}
+        # hwnd -> (checked until, hung)
+        self._hung: typing.Dict[int, typing.Tuple[float, bool]] = {}
+        self._live_workers = 0
+        self._closed = False
+        self._watchdog_stopped = threading.Event()
+        if workers > 0:
+            for _ in range(workers):
+                self._start_worker()
+            threading.Thread(target=self._watchdog, name="window-operation-watchdog", daemon=True).start()
+
+    def submit(
+        self,
+        lane: LANE,
+        func: typing.Callable,
+        *args,
+        supersede_key: typing.Optional[typing.Hashable] = None,
+        hwnd: typing.Optional[int] = None,
+    ) -> concurrent.futures.Future:
+        """Run `func(*args)` after the operations submitted before it on `lane`.
+
+        The lane of a window is its handle, `hwnd` is only needed for operations on a shared lane.
+
+        """
+        if hwnd is None and isinstance(lane, int):
+            hwnd = lane
+        operation = WindowOperation(lane, hwnd, func.__name__, func, args, supersede_key)
+        if self.workers == 0:
+            if operation.future.set_running_or_notify_cancel():
+                self._run(operation)
+            return operation.future
+
+        with self._condition:
+            if lane in self._stuck:
+                self._finish(operation, exception=WindowHung(lane))
+                return operation.future
+            if supersede_key is not None:
+                if (superseded := self._by_supersede_key.pop(supersede_key, None)) is not None:
+                    if superseded.future.cancel():
+                        self._remove_pending(superseded)
+                        metrics.WINDOW_OPERATIONS.inc(superseded.name, "superseded")
+                self._by_supersede_key[supersede_key] = operation
+            if lane not in self._pending:
+                self._pending[lane] = collections.deque()
+                if lane not in self._running:
+                    self._ready.append(lane)
+            self._pending[lane].append(operation)
+            self._condition.notify()
+        return operation.future
+
+    def _remove_pending(self, operation: WindowOperation) -> None:
+        pending = self._pending[operation.lane]
+        pending.remove(operation)
+        if not pending:
+            del self._pending[operation.lane]
+            if operation.lane not in self._running:
+                self._ready.remove(operation.lane)
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._watchdog_stopped.set()
+
+    def _cached_is_window_hung(self, hwnd: int) -> bool:
+        now = time.monotonic()
+        checked_until, hung = self._hung.get(hwnd, (0.0, False))
+        if checked_until < now:
+            hung = self.is_window_hung(hwnd)
+            self._hung[hwnd] = (now + self.HUNG_CHECK_TTL, hung)
+        return hung
+
+    def _call(self, operation: WindowOperation) -> typing.Tuple[typing.Any, typing.Optional[BaseException]]:
+        try:
+            if operation.hwnd is not None and self._cached_is_window_hung(operation.hwnd):
+                raise WindowHung(operation.hwnd)
+            return operation.func(*operation.args), None
+        except BaseException as exc:  # noqa
+            return None, exc
+
+    def _run(self, operation: WindowOperation) -> None:
+        result, exception = self._call(operation)
+        self._finish(operation, result, exception)
+
+    def _finish(
+        self,
+        operation: WindowOperation,
+        result: typing.Any = None,
+        exception: typing.Optional[BaseException] = None,
+    ) -> None:
+        if exception is None:
+            metrics.WINDOW_OPERATIONS.inc(operation.name, "ok")
+            operation.future.set_result(result)
+            return
+
+        outcome = "hung" if isinstance(exception, WindowHung) else type(exception).__name__
+        metrics.WINDOW_OPERATIONS.inc(operation.name, outcome)
+        operation.future.set_exception(exception)
+        if isinstance(exception, (WindowHung, TimeoutError)):
+            logger.warning("Skipped {} of hung window {}", operation.name, operation.hwnd)
+        elif self.on_error is not None:
+            self.on_error(operation, exception)
+
+    def _start_worker(self) -> None:
+        self._live_workers += 1
+        threading.Thread(target=self._work, name="window-operation-worker", daemon=True).start()
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                while not self._ready and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    self._live_workers -= 1
+                    return
+                lane = self._ready.popleft()
+                operation = self._pending[lane].popleft()
+                if not self._pending[lane]:
+                    del self._pending[lane]
+                if self._by_supersede_key.get(operation.supersede_key) is operation:
+                    del self._by_supersede_key[operation.supersede_key]
+                if not operation.future.set_running_or_notify_cancel():
+                    if lane in self._pending:
+                        self._ready.append(lane)
+                    continue
+                operation.deadline = time.monotonic() + self.timeout
+                self._running[lane] = operation
+
+            result, exception = self._call(operation)
+
+            with self._condition:
+                if self._running.get(lane) is not operation:
+                    # Timed out, the watchdog has already failed the operation and replaced this worker.
+                    self._stuck.discard(lane)
+                    self._live_workers -= 1
+                    return
+                del self._running[lane]
+                if lane in self._pending:
+                    self._ready.append(lane)
+                    self._condition.notify()
+            self._finish(operation, result, exception)
+
+    def _watchdog(self) -> None:
+        # Not waiting on the condition, or it could take the `notify` meant for a worker.
+        while not self._watchdog_stopped.wait(self.timeout / 4):
+            with self._condition:
+                now = time.monotonic()
+                timed_out = [operation for operation in self._running.values() if operation.deadline < now]
+                for operation in timed_out:
+                    lane = operation.lane
+                    del self._running[lane]
+                    if operation.hwnd is not None:
+                        self._hung[operation.hwnd] = (now + self.HUNG_CHECK_TTL, True)
+                    self._start_worker()
+                    if not isinstance(lane, int):
+                        # Shared, its pending operations of other windows still go ahead.
+                        if lane in self._pending:
+                            self._ready.append(lane)
+                            self._condition.notify()
+                        continue
+                    self._stuck.add(lane)
+                    for pending in self._pending.pop(lane, ()):
+                        if self._by_supersede_key.get(pending.supersede_key) is pending:
+                            del self._by_supersede_key[pending.supersede_key]
+                        if pending.future.set_running_or_notify_cancel():
+                            self._finish(pending, exception=WindowHung(lane))
+            for operation in timed_out:
+                self._finish(
+                    operation, exception=TimeoutError(f"{operation.name} took longer than {self.timeout}s")
+                )
+
+    def __repr__(self) -> str:
+        with self._condition:
+            return (
+                f"WindowOperationExecutor("
+                f"workers={self._live_workers}"
+                f", pending={sum(len(pending) for pending in self._pending.values())}"
+                f", running={len(self._running)}"
+                f", stuck={sorted(self._stuck, key=str)})"
+            )
@@ -0,0 +1,161 @@
+﻿"""Declarative rules deciding what happens to a window when it is registered.
+
+A rule matches on any of a title regex (searched, not anchored), the exact window class, the executable name
+(case insensitive, without its directory) and style bits, the first matching rule wins. Rules are compiled
+once: dispatched on window class first, and the title regexes of each class combined into a single prefilter,
+so a window which matches none of them (i.e. almost all of them) is rejected with one regex search.
+
+"""
+
+import collections
+import dataclasses
+import enum
+import ntpath
+import re
+import typing
+
+from mado import window_api
+from mado.types_ import SCREEN_ID, WINDOW_HANDLE
+from mado.window_cache import WINDOW_CACHE
+
+
+class Action(enum.Enum):
+    # not managed at all
+    ignore = enum.auto()
+    # managed, but left out of the tiling layouts
+    float = enum.auto()
+    # managed on `screen_id` and/or `virtual_desktop_id`, wherever it opens
+    pin = enum.auto()
+
+
+@dataclasses.dataclass(frozen=True)
+class WindowRule:
+    action: Action
+    title: typing.Optional[str] = None
+    class_name: typing.Optional[str] = None
+    executable: typing.Optional[str] = None
+    # all of these style bits are set, and none of `exclude_style`
+    style: int = 0
+    exclude_style: int = 0
+    screen_id: typing.Optional[SCREEN_ID] = None
+    virtual_desktop_id: typing.Optional[int] = None
+
+
+class _Bucket:
+    """The rules a window of one class can match, in order."""
+
+    def __init__(self, rules: typing.Sequence[WindowRule]) -> None:
+        self.rules = [(rule, re.compile(rule.title) if rule.title is not None else None) for rule in rules]
+        self.untitled_rules = [(rule, title) for rule, title in self.rules if title is None]
+        titles = [rule.title for rule in rules if rule.title is not None]
+        self.prefilter = None
+        if titles:
+            try:
+                self.prefilter = re.compile("|".join(f"(?:{title})" for title in titles))
+            except re.error:
+                # e.g. global inline flags, which only compile at the start of a pattern
+                pass
+
+    def match(
+        self,
+        title: str,
+        executable: typing.Callable[[], str],
+        style: typing.Callable[[], int],
+    ) -> typing.Optional[WindowRule]:
+        rules = self.rules
+        if self.prefilter is not None and self.prefilter.search(title) is None:
+            rules = self.untitled_rules
+        for rule, title_pattern in rules:
+            if title_pattern is not None and title_pattern.search(title) is None:
+                continue
+            if rule.executable is not None and executable() != rule.executable.lower():
+                continue
+            if rule.style or rule.exclude_style:
+                window_style = style()
+                if window_style & rule.style != rule.style or window_style & rule.exclude_style:
+                    continue
+            return rule
+        return None
+
+
+class WindowRules:
+    """Compiled rules, with the decision of each window cached until its title, class or style changes.
+
+    The style is only part of the decision when a rule has style bits. Executable names are cached per process
+    id until the last window looked up in that process is forgotten, since process ids are reused.
+
+    """
+
+    def __init__(self, rules: typing.Sequence[WindowRule]) -> None:
+        self.rules = list(rules)
+        class_names = {rule.class_name for rule in self.rules if rule.class_name is not None}
+        self._by_class_name = {
+            class_name: _Bucket([rule for rule in self.rules if rule.class_name in (None, class_name)])
+            for class_name in class_names
+        }
+        self._any_class_name = _Bucket([rule for rule in self.rules if rule.class_name is None])
+        self._uses_style = any(rule.style or rule.exclude_style for rule in self.rules)
+        # hwnd -> (title, class name, style, decision)
+        self._decisions: typing.Dict[
+            WINDOW_HANDLE, typing.Tuple[str, str, int, typing.Optional[WindowRule]]
+        ] = {}
+        self._executables: typing.Dict[int, str] = {}
+        # the process of each window whose executable was looked up, and how many of those each process has
+        self._process_ids: typing.Dict[WINDOW_HANDLE, int] = {}
+        self._process_windows: typing.Counter[int] = collections.Counter()
+
+    def match(
+        self,
+        title: str,
+        class_name: str,
+        executable: typing.Callable[[], str],
+        style: typing.Callable[[], int],
+    ) -> typing.Optional[WindowRule]:
+        """The first matching rule, `executable` and `style` are only called when a candidate needs them."""
+        return self._by_class_name.get(class_name, self._any_class_name).match(title, executable, style)
+
+    def decide(self, hwnd: WINDOW_HANDLE) -> typing.Optional[WindowRule]:
+        title = WINDOW_CACHE.title(hwnd)
+        class_name = WINDOW_CACHE.class_name(hwnd)
+        style = WINDOW_CACHE.style(hwnd) if self._uses_style else 0
+        decision = self._decisions.get(hwnd)
+        if decision is not None and decision[:3] == (title, class_name, style):
+            return decision[3]
+
+        rule = self.match(title, class_name, lambda: self._executable(hwnd), lambda: style)
+        self._decisions[hwnd] = (title, class_name, style, rule)
+        return rule
+
+    def _executable(self, hwnd: WINDOW_HANDLE) -> str:
+        process_id = WINDOW_CACHE.process_id(hwnd)
+        if (known_process_id := self._process_ids.get(hwnd)) != process_id:
+            if known_process_id is not None:
+                self._forget_process_window(known_process_id)
+            self._process_ids[hwnd] = process_id
+            self._process_windows[process_id] += 1
+        executable = self._executables.get(process_id)
+        if executable is None:
+            executable = self._executables[process_id] = ntpath.basename(
+                window_api.get_process_executable(process_id)
+            ).lower()
+        return executable
+
+    def forget(self, hwnd: WINDOW_HANDLE) -> None:
+        self._decisions.pop(hwnd, None)
+        if (process_id := self._process_ids.pop(hwnd, None)) is not None:
+            self._forget_process_window(process_id)
+
+    def _forget_process_window(self, process_id: int) -> None:
+        self._process_windows[process_id] -= 1
+        if self._process_windows[process_id] <= 0:
+            del self._process_windows[process_id]
+            self._executables.pop(process_id, None)
+
+    def __repr__(self) -> str:
+        return (
+            f"WindowRules("
+            f"rules={len(self.rules)}"
+            f", class_names={len(self._by_class_name)}"
+            f", decisions={len(self._decisions)}"
+            f", processes={len(self._executables)})"
+        )
@@ -0,0 +1,53 @@
+﻿import typing
+
+import pytest
+
+from mado import backends
+from mado.backends.simulated import SimulatedBackend
+from mado.config import WINDOW_RULES
+from mado.window_cache import WINDOW_CACHE
+from mado.window_rules import WindowRules
+
+TWO_MONITORS = [(0, 0, 1920, 1080), (1920, 0, 3840, 1080)]
+
+
+class Desktop(typing.NamedTuple):
+    backend: SimulatedBackend
+    window_manager: typing.Any
+
+    def settle(self) -> int:
+        """Handle every event the backend sent, including those sent while handling them."""
+        handled = 0
+        while drained := self.window_manager.drain():
+            handled += drained
+        return handled
+
+
+@pytest.fixture
+def desktop(monkeypatch) -> typing.Callable[..., Desktop]:
+    """A window manager on a fresh simulated backend, `desktop(monitor_rects, virtual_desktop_count)`."""
+    import mado.window_manager
+    from mado.window_manager import state
+
+    # Simulated handles start over with every backend, nothing cached for the previous one may be seen.
+    WINDOW_CACHE.clear()
+    rules = WindowRules(WINDOW_RULES)
+    monkeypatch.setattr(state, "COMPILED_WINDOW_RULES", rules)
+    monkeypatch.setattr(mado.window_manager, "COMPILED_WINDOW_RULES", rules)
+    window_managers = []
+
+    def make(monitor_rects=TWO_MONITORS, virtual_desktop_count: int = 1, windows: int = 0) -> Desktop:
+        backend = SimulatedBackend(monitor_rects=monitor_rects, virtual_desktop_count=virtual_desktop_count)
+        backends.set_backend(backend)
+        backend.populate(windows)
+        window_manager = mado.window_manager.WindowManager(install_hooks=False)
+        window_managers.append(window_manager)
+        backend.attach(window_manager.win_event_listener.callback)
+        backend.attach_messages(window_manager.win_event_listener.on_window_message)
+        return Desktop(backend, window_manager)
+
+    yield make
+    for window_manager in window_managers:
+        window_manager.event_queue.close()
+        window_manager.window_operations.close()
+    WINDOW_CACHE.clear()
@@ -0,0 +1,165 @@
+﻿import queue
+import threading
+import time
+
+import pytest
+
+from mado.window_manager import commands, events
+from mado.window_manager.event_queue import Closed, Lane, PriorityEventQueue
+
+
+def drain(event_queue: PriorityEventQueue) -> list:
+    items = []
+    while True:
+        try:
+            items.append(event_queue.get(block=False))
+        except queue.Empty:
+            return items
+
+
+def test_only_the_latest_move_of_a_window_is_kept_where_the_first_was():
+    event_queue = PriorityEventQueue()
+    event_queue.put(events.Moved(None, 1, 1))
+    event_queue.put(events.Moved(None, 2, 2))
+    event_queue.put(events.Moved(None, 1, 3))
+    event_queue.put(events.Moved(None, 1, 4))
+
+    assert [(event.hwnd, event.timestamp) for event in drain(event_queue)] == [(1, 4), (2, 2)]
+    assert event_queue.dropped == 2
+    assert event_queue.stats[Lane.geometry].dropped == 2
+
+
+def test_coalescing_is_per_event_type():
+    event_queue = PriorityEventQueue()
+    event_queue.put(events.Moved(None, 1))
+    event_queue.put(events.NameChange(None, 1))
+    event_queue.put(events.MoveResizeEnd(None, 1))
+    event_queue.put(events.NameChange(None, 1))
+
+    assert [type(event) for event in drain(event_queue)] == [
+        events.Moved,
+        events.NameChange,
+        events.MoveResizeEnd,
+    ]
+
+
+def test_lifecycle_events_are_never_coalesced_and_keep_their_order():
+    event_queue = PriorityEventQueue()
+    lifecycle = [events.Show(None, 1), events.Hide(None, 1), events.Show(None, 1), events.Destroy(None, 1)]
+    for event in lifecycle:
+        event_queue.put(event)
+
+    assert drain(event_queue) == lifecycle
+    assert event_queue.dropped == 0
+
+
+def test_a_destroy_drops_the_pending_geometry_events_of_its_window():
+    event_queue = PriorityEventQueue()
+    event_queue.put(events.Moved(None, 1))
+    event_queue.put(events.MoveResizeEnd(None, 1))
+    event_queue.put(events.Moved(None, 2))
+    event_queue.put(events.Destroy(None, 1))
+    event_queue.put(events.Moved(None, 1))
+
+    served = drain(event_queue)
+
+    assert served == [events.Destroy(None, 1), events.Moved(None, 2), events.Moved(None, 1)]
+    assert event_queue.qsize() == 0
+
+
+def test_commands_come_first_then_lifecycle_then_geometry():
+    event_queue = PriorityEventQueue()
+    event_queue.put(events.Moved(None, 1))
+    event_queue.put(events.Show(None, 2))
+    event_queue.put(commands.Noop())
+
+    assert [type(item) for item in drain(event_queue)] == [commands.Noop, events.Show, events.Moved]
+
+
+def test_a_lane_passed_over_too_often_is_served_anyway():
+    event_queue = PriorityEventQueue()
+    event_queue.put(events.Moved(None, 1))
+    for _ in range(PriorityEventQueue.STARVATION_LIMIT * 2):
+        event_queue.put(commands.Noop())
+
+    served = drain(event_queue)
+
+    assert served.index(events.Moved(None, 1)) == PriorityEventQueue.STARVATION_LIMIT
+
+
+def test_queueing_delay_is_recorded_per_lane():
+    event_queue = PriorityEventQueue()
+    event_queue.put(commands.Noop())
+    event_queue.put(events.Show(None, 1))
+    time.sleep(0.01)
+    drain(event_queue)
+
+    assert event_queue.stats[Lane.command].served == 1
+    assert event_queue.stats[Lane.lifecycle].max_delay >= 0.01
+    assert event_queue.stats[Lane.geometry].served == 0
+
+
+def test_get_times_out_when_empty():
+    with pytest.raises(queue.Empty):
+        PriorityEventQueue().get(timeout=0.01)
+
+
+def test_a_blocked_get_is_woken_by_put_and_by_close():
+    event_queue = PriorityEventQueue()
+    served = []
+
+    def consume():
+        try:
+            while True:
+                served.append(event_queue.get())
+        except Closed:
+            served.append(Closed)
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    # `get` waits without a timeout, only the put and the close can wake it up
+    time.sleep(0.05)
+    event_queue.put(commands.Noop())
+    time.sleep(0.05)
+    event_queue.close()
+    consumer.join(timeout=0.25)
+
+    assert not consumer.is_alive()
+    assert served == [commands.Noop(), Closed]
+
+
+def test_a_flood_of_window_events_neither_grows_the_queue_nor_delays_commands(desktop):
+    simulated = desktop(windows=200)
+    simulated.settle()
+    event_queue = simulated.window_manager.event_queue
+
+    simulated.backend.storm(10000, seed=0)
+    event_queue.put(commands.Noop())
+
+    # at most a location and a name change pending per window
+    assert event_queue.qsize() <= 2 * 200 + 1
+    assert event_queue.dropped > 5000
+    assert event_queue.get() == commands.Noop()
+    simulated.settle()
+
+
+def test_close_wakes_every_blocked_get():
+    event_queue = PriorityEventQueue()
+    closed = []
+
+    def consume():
+        try:
+            event_queue.get()
+        except Closed:
+            closed.append(Closed)
+
+    consumers = [threading.Thread(target=consume) for _ in range(3)]
+    for consumer in consumers:
+        consumer.start()
+    time.sleep(0.05)
+    event_queue.close()
+    for consumer in consumers:
+        consumer.join(timeout=0.25)
+
+    assert not any(consumer.is_alive() for consumer in consumers)
+    assert closed == [Closed] * 3
@@ -0,0 +1,91 @@
+﻿import queue
+import random
+
+import pytest
+
+from mado.keybind_matcher import Keybind, KeybindMatcher
+from mado.types_ import VIRTUAL_DESKTOP_ID
+from mado.window_manager import commands
+from mado.window_manager.spatial_index import Direction
+
+PREFIX = "<f24>"
+
+
+def keybind(keys: str, command: commands.WindowManagerCommand) -> Keybind:
+    return Keybind(frozenset(keys.split("+")), command)
+
+
+# Most specific first, like `KeyboardManager.KEYBINDS`.
+KEYBINDS = [
+    keybind(f"{PREFIX}+<shift>+<left>", commands.SwapDirection(Direction.left)),
+    keybind(f"{PREFIX}+<shift>+1", commands.SendToVirtualDesktop(VIRTUAL_DESKTOP_ID(1))),
+    keybind(f"{PREFIX}+<shift>+r", commands.DumpFlightRecorder()),
+    keybind(f"{PREFIX}+1", commands.FocusVirtualDesktop(VIRTUAL_DESKTOP_ID(1))),
+    keybind(f"{PREFIX}+<left>", commands.FocusDirection(Direction.left)),
+    keybind(f"{PREFIX}+r", commands.StateDump()),
+    keybind(f"{PREFIX}+g", commands.Minimise()),
+]
+
+
+@pytest.fixture
+def matcher() -> KeybindMatcher:
+    return KeybindMatcher(PREFIX, KEYBINDS)
+
+
+def press(matcher: KeybindMatcher, *keys: str) -> list:
+    return [matcher.press(key) for key in keys]
+
+
+def test_exact_chords_match_the_most_specific_keybind_first(matcher):
+    for keybind_ in KEYBINDS:
+        assert matcher.match(keybind_._keys) is keybind_
+
+    assert matcher.match(frozenset({PREFIX, "<shift>", "1", "r"})) is KEYBINDS[1]
+
+
+def test_held_keys_beyond_a_chord_match_like_the_ordered_scan(matcher):
+    random_ = random.Random(0)
+    keys = sorted({key for keybind_ in KEYBINDS for key in keybind_._keys} | {"a", "<ctrl>"})
+    for _ in range(2000):
+        held = frozenset(random_.sample(keys, random_.randint(1, 4)))
+        assert matcher.match(held) is matcher.scan(held)
+
+
+def test_held_key_sets_beyond_the_cache_bound_still_match(matcher, monkeypatch):
+    monkeypatch.setattr(KeybindMatcher, "MAX_MATCH_CACHE_SIZE", len(KEYBINDS))
+
+    assert matcher.match(frozenset({PREFIX, "g", "a"})) is KEYBINDS[-1]
+    assert frozenset({PREFIX, "g", "a"}) not in matcher._matches
+
+
+def test_keystrokes_without_the_prefix_match_nothing(matcher, monkeypatch):
+    monkeypatch.setattr(matcher, "match", lambda keys: pytest.fail("matched without the prefix"))
+
+    assert press(matcher, "a", "<shift>", "1", "r") == [None] * 4
+
+
+def test_a_chord_matches_once_its_last_key_is_pressed(matcher):
+    assert press(matcher, PREFIX, "<shift>", "1") == [None, None, KEYBINDS[1]]
+    # held down, the keystroke repeats
+    assert matcher.press("1") is None
+
+    matcher.release("1")
+    matcher.release("<shift>")
+    assert matcher.press("g") is KEYBINDS[-1]
+
+
+def test_new_keybinds_replace_the_matches_of_the_old(matcher):
+    matcher.match(frozenset({PREFIX, "r", "a"}))
+
+    matcher.set_keybinds(KEYBINDS[3:])
+
+    assert matcher.match(frozenset({PREFIX, "<shift>", "r"})) is KEYBINDS[5]
+    assert matcher.match(frozenset({PREFIX, "r", "a"})) is KEYBINDS[5]
+
+
+def test_a_matched_keybind_queues_its_command(matcher):
+    event_queue = queue.Queue()
+
+    press(matcher, PREFIX, "<left>")[-1].activate(event_queue)
+
+    assert event_queue.get_nowait() == commands.FocusDirection(Direction.left)
@@ -0,0 +1,55 @@
+﻿import queue
+import sys
+
+import pytest
+
+if sys.platform != "win32":
+    # The keyboard hook of pynput is win32 only, the matching itself is tested in test_keybind_matcher.
+    pytest.skip("Windows only", allow_module_level=True)
+keyboard = pytest.importorskip("pynput.keyboard")
+
+from mado.keybind_matcher import KeybindMatcher  # noqa: E402
+from mado.keyboard_manager import KeyboardManager  # noqa: E402
+from mado.types_ import SCREEN_ID  # noqa: E402
+from mado.window_manager import commands  # noqa: E402
+
+SCREEN_IDS = [SCREEN_ID("LEFT"), SCREEN_ID("MID")]
+
+
+@pytest.fixture
+def manager():
+    """The matching half of a keyboard manager, without installing the hook."""
+    manager = KeyboardManager.__new__(KeyboardManager)
+    manager._event_queue = queue.Queue()
+    manager._matcher = KeybindMatcher(keyboard.HotKey.parse(KeyboardManager.PREFIX)[0])
+    manager.suppress_event = lambda: None
+    manager.cull_keybinds(SCREEN_IDS)
+    return manager
+
+
+def press(manager: KeyboardManager, *keys: str) -> None:
+    for key in keys:
+        manager._on_press(keyboard.HotKey.parse(key)[0])
+
+
+def test_keybinds_of_missing_screens_are_culled(manager):
+    screen_ids = {
+        keybind._command.screen_id
+        for keybind in manager.KEYBINDS
+        if isinstance(keybind._command, (commands.FocusScreen, commands.MoveToScreen))
+    }
+
+    assert screen_ids == set(SCREEN_IDS)
+    assert manager._matcher.keybinds == manager.KEYBINDS
+
+
+def test_keystrokes_without_the_prefix_queue_nothing(manager):
+    press(manager, "a", "<shift>", "1")
+
+    assert manager._event_queue.empty()
+
+
+def test_a_chord_with_the_prefix_queues_its_command(manager):
+    press(manager, KeyboardManager.PREFIX, "i")
+
+    assert manager._event_queue.get_nowait() == commands.FocusScreen(SCREEN_ID("MID"))
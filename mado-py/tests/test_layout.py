@@ -0,0 +1,83 @@
+﻿import itertools
+
+import pytest
+
+from mado.window_manager import commands
+from mado.window_manager.layout import Layout, columns, compute_layout, diff_rects, master_stack, monocle
+
+WORK_AREA = (0, 0, 1920, 1040)
+TILING_LAYOUTS = [Layout.master_stack, Layout.columns]
+
+
+def area(rect) -> int:
+    left, top, right, bottom = rect
+    return (right - left) * (bottom - top)
+
+
+def overlap(rect, other) -> bool:
+    return min(rect[2], other[2]) > max(rect[0], other[0]) and min(rect[3], other[3]) > max(rect[1], other[1])
+
+
+@pytest.mark.parametrize("layout", TILING_LAYOUTS)
+@pytest.mark.parametrize("count", [1, 2, 3, 7, 15])
+def test_tiling_layouts_cover_the_work_area_without_overlap(layout, count):
+    rects = list(compute_layout(layout, WORK_AREA, list(range(count))).values())
+
+    assert len(rects) == count
+    assert not any(overlap(rect, other) for rect, other in itertools.combinations(rects, 2))
+    assert sum(area(rect) for rect in rects) == area(WORK_AREA)
+
+
+def test_master_stack_puts_the_first_window_on_the_left():
+    master, *stack = master_stack(WORK_AREA, 3, master_ratio=0.5, gap=0)
+
+    assert master == (0, 0, 960, 1040)
+    assert stack == [(960, 0, 1920, 520), (960, 520, 1920, 1040)]
+
+
+def test_columns_spread_the_rounding():
+    assert [right - left for left, _, right, _ in columns((0, 0, 1000, 100), 3, gap=0)] == [333, 333, 334]
+
+
+def test_gaps_between_and_around_windows():
+    assert columns((0, 0, 1000, 100), 2, gap=10) == [(10, 10, 495, 90), (505, 10, 990, 90)]
+
+
+def test_monocle_gives_every_window_the_whole_work_area():
+    assert monocle(WORK_AREA, 3, gap=0) == [WORK_AREA] * 3
+
+
+def test_floating_and_empty_layouts_move_nothing():
+    assert compute_layout(Layout.floating, WORK_AREA, [1, 2]) == {}
+    assert compute_layout(Layout.columns, WORK_AREA, []) == {}
+
+
+def test_diff_keeps_only_the_windows_not_at_their_target():
+    current = {1: (0, 0, 10, 10), 2: (10, 0, 20, 10)}
+    target = {1: (0, 0, 10, 10), 2: (10, 0, 30, 10), 3: (30, 0, 40, 10)}
+
+    assert diff_rects(current, target) == {2: (10, 0, 30, 10), 3: (30, 0, 40, 10)}
+    assert diff_rects(target, target) == {}
+
+
+def test_a_relayout_moves_only_the_changed_windows_in_one_batch(desktop):
+    simulated = desktop()
+    backend, window_manager = simulated
+    hwnds = [backend.create_window(f"Window {i}") for i in range(15)]
+    simulated.settle()
+    window_manager.event_queue.put(commands.FocusScreen(window_manager.state.focused_screen_id))
+    window_manager.event_queue.put(commands.SetLayout(Layout.columns))
+    simulated.settle()
+    screen = window_manager.state.focused_screen
+    assert backend.batches == 1
+    assert {hwnd: backend.windows[hwnd].rect for hwnd in hwnds} == screen.layout_rects
+
+    backend.set_title(hwnds[0], "renamed")
+    simulated.settle()
+    assert backend.batches == 1
+
+    backend.destroy_window(hwnds[-1])
+    simulated.settle()
+
+    assert backend.batches == 2
+    assert {hwnd: backend.windows[hwnd].rect for hwnd in hwnds[:-1]} == screen.layout_rects
@@ -0,0 +1,48 @@
+﻿import subprocess
+import sys
+
+# The modules only the win32 backend and the keyboard hook need, which may not even be installed.
+HEAVY_MODULES = (
+    "pyvda",
+    "pynput",
+    "win32api",
+    "win32con",
+    "win32gui",
+    "win32process",
+    "pywintypes",
+    "pythoncom",
+)
+
+# Records every import of a heavy module, whether it is installed or not, and refuses it.
+PROGRAM = f"""
+import sys
+
+HEAVY_MODULES = {HEAVY_MODULES!r}
+attempted = []
+
+
+class Refuse:
+    @staticmethod
+    def find_spec(name, path=None, target=None):
+        if name.split(".")[0] in HEAVY_MODULES:
+            attempted.append(name)
+            raise ImportError(name)
+        return None
+
+
+sys.meta_path.insert(0, Refuse)
+
+import mado.keybind_matcher
+import mado.main
+import mado.window_manager
+
+loaded = [name for name in sys.modules if name.split(".")[0] in HEAVY_MODULES]
+print(sorted(set(attempted + loaded)))
+"""
+
+
+def test_importing_the_window_manager_and_keybind_matcher_loads_no_backend_module():
+    # In a fresh interpreter, other tests import the simulated backend and more.
+    result = subprocess.run([sys.executable, "-c", PROGRAM], capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "[]"
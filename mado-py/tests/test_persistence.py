@@ -0,0 +1,121 @@
+﻿import pytest
+
+from mado.types_ import SCREEN_ID, VIRTUAL_DESKTOP_ID
+from mado.window_cache import WINDOW_CACHE
+from mado.window_manager import commands, persistence
+from mado.window_manager.layout import Layout
+
+LEFT = SCREEN_ID("LEFT")
+
+
+def run(simulated, command: commands.WindowManagerCommand) -> None:
+    simulated.window_manager.event_queue.put(command)
+    simulated.settle()
+
+
+def restart(simulated, snapshot: dict, virtual_desktop_id: int = 1) -> dict:
+    # A new process starts with nothing cached.
+    WINDOW_CACHE.clear()
+    return persistence.restore_states(snapshot, VIRTUAL_DESKTOP_ID(virtual_desktop_id))
+
+
+def screen_of(state, screen_id: SCREEN_ID) -> tuple:
+    screen = state.screens[screen_id]
+    focused_window = screen.focused_window.hwnd if screen.focused_window else None
+    return [window.hwnd for window in screen.windows], focused_window, screen.layout
+
+
+def test_restoring_a_saved_snapshot_gives_back_the_order_focus_and_layout(desktop, tmp_path):
+    simulated = desktop(windows=6)
+    simulated.settle()
+    state = simulated.window_manager.state
+    screen = state.screens[LEFT]
+    screen.layout = Layout.columns
+    screen.focus_window(screen.windows[1])
+    path = str(tmp_path / "state.json")
+
+    persistence.save_snapshot(path, simulated.window_manager.states)
+    restored = restart(simulated, persistence.load_snapshot(path))
+
+    assert screen_of(restored[VIRTUAL_DESKTOP_ID(1)], LEFT) == screen_of(state, LEFT)
+
+
+def test_a_snapshot_from_other_monitors_is_not_loaded(desktop, tmp_path):
+    simulated = desktop(windows=2)
+    simulated.settle()
+    path = str(tmp_path / "state.json")
+    persistence.save_snapshot(path, simulated.window_manager.states)
+
+    simulated.backend.change_monitors([(0, 0, 2560, 1440)])
+
+    assert persistence.load_snapshot(path) is None
+
+
+def test_a_window_destroyed_before_its_event_was_handled_is_left_out(desktop):
+    simulated = desktop()
+    backend, window_manager = simulated
+    kept, destroyed = backend.create_window("kept"), backend.create_window("destroyed")
+    simulated.settle()
+    backend.destroy_window(destroyed)
+
+    snapshot = persistence.dump_snapshot(window_manager.states)
+
+    assert set(snapshot["fingerprints"]) == {str(kept)}
+    assert set(restart(simulated, snapshot)[VIRTUAL_DESKTOP_ID(1)].windows) == {kept}
+
+
+def test_a_handle_reused_by_another_window_is_not_restored(desktop):
+    simulated = desktop(virtual_desktop_count=2)
+    backend, window_manager = simulated
+    away = backend.create_window("away", virtual_desktop=2)
+    simulated.settle()
+    run(simulated, commands.FocusVirtualDesktop(VIRTUAL_DESKTOP_ID(2)))
+    run(simulated, commands.FocusVirtualDesktop(VIRTUAL_DESKTOP_ID(1)))
+    snapshot = persistence.dump_snapshot(window_manager.states)
+    assert set(restart(simulated, snapshot)[VIRTUAL_DESKTOP_ID(2)].windows) == {away}
+
+    process_id, _ = snapshot["fingerprints"][str(away)]
+    snapshot["fingerprints"][str(away)] = [process_id, "AnotherWindow"]
+
+    assert not restart(simulated, snapshot)[VIRTUAL_DESKTOP_ID(2)].windows
+
+
+@pytest.fixture
+def saving(desktop, monkeypatch, tmp_path):
+    import mado.window_manager
+
+    monkeypatch.setattr(mado.window_manager, "STATE_SNAPSHOT_INTERVAL", -1.0)
+    simulated = desktop()
+    simulated.window_manager.snapshot_path = str(tmp_path / "state.json")
+    saved = []
+    monkeypatch.setattr(persistence, "save_snapshot", lambda path, states: saved.append(path))
+    return simulated, saved
+
+
+def test_the_snapshot_is_only_saved_again_once_the_state_changed(saving):
+    simulated, saved = saving
+    simulated.backend.create_window("first")
+    simulated.settle()
+    saves = len(saved)
+    assert saves
+
+    run(simulated, commands.FocusVirtualDesktop(VIRTUAL_DESKTOP_ID(1)))
+    run(simulated, commands.FocusVirtualDesktop(VIRTUAL_DESKTOP_ID(1)))
+    assert len(saved) == saves
+
+    simulated.backend.create_window("second")
+    simulated.settle()
+    assert len(saved) > saves
+
+
+def test_a_failing_save_does_not_stop_the_event_loop(saving, monkeypatch):
+    simulated, _ = saving
+
+    def save_snapshot(path, states):
+        raise RuntimeError("not an OSError")
+
+    monkeypatch.setattr(persistence, "save_snapshot", save_snapshot)
+    hwnd = simulated.backend.create_window("first")
+    simulated.settle()
+
+    assert hwnd in simulated.window_manager.state.windows
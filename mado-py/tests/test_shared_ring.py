@@ -0,0 +1,108 @@
+﻿import multiprocessing
+import queue
+
+import pytest
+
+from mado import codec
+from mado.shared_ring import RingReader, RingWriter, SharedRing
+from mado.types_ import VIRTUAL_DESKTOP_ID
+from mado.window_manager import commands
+
+
+def record(index: int) -> bytes:
+    return codec.encode(commands.FocusVirtualDesktop(VIRTUAL_DESKTOP_ID(index)))
+
+
+@pytest.fixture
+def ring():
+    ring = SharedRing.create(4)
+    yield ring
+    ring.close()
+
+
+def drain(ring: SharedRing) -> list:
+    records = []
+    while (popped := ring.pop()) is not None:
+        records.append(popped)
+    return records
+
+
+def test_records_come_out_in_order(ring):
+    for index in range(3):
+        assert ring.push(record(index))
+
+    assert drain(ring) == [record(index) for index in range(3)]
+    assert ring.pop() is None
+
+
+def test_wraparound(ring):
+    records = [record(index) for index in range(21)]
+    popped = []
+    for start in range(0, len(records), 3):
+        for pushed in records[start : start + 3]:
+            assert ring.push(pushed)
+        popped.extend(drain(ring))
+
+    assert popped == records
+
+
+def test_full_ring_refuses_records_without_overwriting(ring):
+    for index in range(4):
+        assert ring.push(record(index))
+
+    assert not ring.push(record(4))
+    assert len(ring) == 4
+    assert ring.pop() == record(0)
+    assert ring.push(record(4))
+    assert drain(ring) == [record(index) for index in range(1, 5)]
+
+
+def test_records_of_the_wrong_size(ring):
+    with pytest.raises(ValueError):
+        ring.push(b"too short")
+
+
+@pytest.mark.parametrize("capacity", [0, -4, 3, 6])
+def test_capacity_must_be_a_power_of_two(capacity):
+    with pytest.raises(ValueError):
+        SharedRing.create(capacity)
+
+
+def test_attach_sees_what_the_creator_pushed(ring):
+    ring.push(record(0))
+    attached = SharedRing.attach(ring.name, ring.capacity)
+    try:
+        assert codec.decode(attached.pop()) == commands.FocusVirtualDesktop(VIRTUAL_DESKTOP_ID(0))
+    finally:
+        attached.close()
+    assert len(ring) == 0
+
+
+def _produce(name: str, capacity: int, semaphore, count: int) -> None:
+    ring = SharedRing.attach(name, capacity)
+    writer = RingWriter(ring, semaphore)
+    for index in range(count):
+        while len(ring) == capacity:
+            pass
+        writer.put(commands.FocusVirtualDesktop(VIRTUAL_DESKTOP_ID(index)))
+    ring.close()
+
+
+def test_items_from_another_process_reach_the_event_queue():
+    context = multiprocessing.get_context("spawn")
+    ring = SharedRing.create(16)
+    semaphore = context.Semaphore(0)
+    event_queue: queue.Queue = queue.Queue()
+    reader = RingReader(ring, semaphore, event_queue)
+    reader.start()
+    producer = context.Process(target=_produce, args=(ring.name, ring.capacity, semaphore, 200))
+    producer.start()
+    try:
+        received = [event_queue.get(timeout=10) for _ in range(200)]
+    finally:
+        producer.join()
+        reader.stop()
+        ring.close()
+
+    assert producer.exitcode == 0
+    assert received == [commands.FocusVirtualDesktop(VIRTUAL_DESKTOP_ID(index)) for index in range(200)]
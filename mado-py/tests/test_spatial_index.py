@@ -0,0 +1,105 @@
+﻿import random
+
+import pytest
+
+from mado.window_manager.spatial_index import Direction, SpatialIndex, centre, direction_score
+
+MONITORS = [(0, 0, 1920, 1080), (1920, 0, 3840, 1080), (0, 1080, 1920, 2160), (1920, 1080, 3840, 2160)]
+
+
+def random_rects(random_: random.Random, count: int) -> dict:
+    rects = {}
+    for hwnd in range(count):
+        left, top, right, bottom = MONITORS[hwnd % len(MONITORS)]
+        x, y = random_.randrange(left, right - 300), random_.randrange(top, bottom - 300)
+        rects[hwnd] = (x, y, x + random_.randrange(200, 900), y + random_.randrange(150, 700))
+    return rects
+
+
+def brute_force_score(rects: dict, origin, direction: Direction, exclude=None):
+    scores = [
+        score
+        for hwnd, rect in rects.items()
+        if hwnd != exclude and (score := direction_score(origin, centre(rect), direction)) is not None
+    ]
+    return min(scores, default=None)
+
+
+def index_of(rects: dict) -> SpatialIndex:
+    index = SpatialIndex(lambda hwnd: rects[hwnd])
+    for hwnd in rects:
+        index.mark_dirty(hwnd)
+    return index
+
+
+def assert_same_as_brute_force(
+    index: SpatialIndex, rects: dict, random_: random.Random, queries: int
+) -> None:
+    for query in range(queries):
+        origin = (random_.random() * 3840, random_.random() * 2160)
+        direction = list(Direction)[query % len(Direction)]
+        exclude = random_.choice([None, *rects])
+
+        nearest = index.nearest(origin, direction, exclude=exclude)
+
+        expected = brute_force_score(rects, origin, direction, exclude)
+        if expected is None:
+            assert nearest is None
+        else:
+            # ties may go either way, the score may not
+            assert nearest != exclude
+            assert direction_score(origin, centre(rects[nearest]), direction) == expected
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_nearest_is_what_brute_force_finds(seed):
+    random_ = random.Random(seed)
+    rects = random_rects(random_, 300)
+
+    assert_same_as_brute_force(index_of(rects), rects, random_, 500)
+
+
+def test_nearest_after_moves_and_removals():
+    random_ = random.Random(0)
+    rects = random_rects(random_, 200)
+    index = index_of(rects)
+    index.refresh()
+    for hwnd in random_.sample(sorted(rects), 50):
+        left, top, right, bottom = rects[hwnd]
+        offset = random_.randrange(-500, 500)
+        rects[hwnd] = (left + offset, top - offset, right + offset, bottom - offset)
+        index.mark_dirty(hwnd)
+    for hwnd in random_.sample(sorted(rects), 50):
+        del rects[hwnd]
+        index.remove(hwnd)
+
+    assert len(index) == len(rects) == 150
+    assert_same_as_brute_force(index, rects, random_, 500)
+
+
+def test_window_at_the_origin_is_not_beyond_it():
+    rects = {1: (0, 0, 100, 100), 2: (200, 0, 300, 100)}
+    index = index_of(rects)
+
+    assert index.nearest((50, 50), Direction.right) == 2
+    assert index.nearest((50, 50), Direction.left) is None
+    assert index.nearest((250, 50), Direction.right) is None
+
+
+def test_focus_direction_skips_a_window_destroyed_before_its_event_was_handled(desktop):
+    from mado.window_manager import commands
+
+    simulated = desktop()
+    backend, window_manager = simulated
+    left, right = backend.create_window("left"), backend.create_window("right")
+    simulated.settle()
+    window_manager.state.focused_screen.focus_window(window_manager.state.windows[left])
+
+    backend.move_window(right, (1000, 0, 1500, 500))
+    backend.destroy_window(right)
+    # commands are handled ahead of the queued window events
+    window_manager.event_queue.put(commands.FocusDirection(Direction.right))
+    simulated.settle()
+
+    assert right not in window_manager.state.windows
+    assert right not in window_manager.state.spatial_index.rects
@@ -0,0 +1,83 @@
+﻿import inspect
+
+import pytest
+
+from mado.backends import MonitorInfo
+from mado.types_ import SCREEN_ID, WINDOW_HANDLE
+from mado.window import Window
+from mado.window_manager import commands
+from mado.window_manager.layout import Layout
+from mado.window_manager.state import Screen
+from mado.window_manager.state_snapshot import ScreenSnapshot
+
+MONITOR = MonitorInfo(handle=1, rect=(0, 0, 1920, 1080), work_area=(0, 0, 1920, 1040), name="laptop")
+
+# Each mutator of `Screen`, applied to a screen with windows 1, 2 and 3, focused on 3.
+MUTATORS = {
+    "set_monitor_info": lambda screen, windows: screen.set_monitor_info(
+        MONITOR._replace(rect=(0, 0, 2560, 1440))
+    ),
+    "add_window": lambda screen, windows: screen.add_window(Window(WINDOW_HANDLE(4))),
+    "remove_window": lambda screen, windows: screen.remove_window(windows[0]),
+    "swap_windows": lambda screen, windows: screen.swap_windows(windows[0], windows[1]),
+    "replace_window": lambda screen, windows: screen.replace_window(windows[0], Window(WINDOW_HANDLE(4))),
+    "set_layout": lambda screen, windows: screen.set_layout(Layout.columns),
+    "focus_window": lambda screen, windows: screen.focus_window(windows[0]),
+    "focus_previous": lambda screen, windows: screen.focus_previous(),
+    "cycle_mru": lambda screen, windows: screen.cycle_mru(),
+    "cycle_window": lambda screen, windows: screen.cycle_window(
+        commands.CycleFocusedWindow.Direction.forward
+    ),
+}
+# The methods which don't change the screen.
+READERS = {"snapshot", "from_monitor_info"}
+
+
+def screen_with_windows():
+    screen = Screen.from_monitor_info(MONITOR, SCREEN_ID("MID"))
+    windows = [Window(WINDOW_HANDLE(hwnd)) for hwnd in (1, 2, 3)]
+    for window in windows:
+        screen.add_window(window)
+        screen.focus_window(window)
+    return screen, windows
+
+
+def fresh_snapshot(screen: Screen) -> ScreenSnapshot:
+    current = screen.ring.current
+    return ScreenSnapshot(
+        screen_id=screen.screen_id,
+        name=screen.name,
+        size=screen.size,
+        work_area_size=screen.work_area_size,
+        layout=screen.layout,
+        windows=screen.ring.hwnds(),
+        focused_window=current.hwnd if current is not None else None,
+    )
+
+
+def test_every_mutator_is_covered():
+    methods = {
+        name
+        for name, member in vars(Screen).items()
+        if not name.startswith("_") and (inspect.isfunction(member) or isinstance(member, classmethod))
+    }
+
+    assert methods - READERS == set(MUTATORS)
+
+
+def test_snapshot_is_reused_while_nothing_changes():
+    screen, _ = screen_with_windows()
+
+    assert screen.snapshot() is screen.snapshot()
+    assert screen.snapshot() == fresh_snapshot(screen)
+
+
+@pytest.mark.parametrize("mutator", MUTATORS)
+def test_mutators_invalidate_the_snapshot(mutator):
+    screen, windows = screen_with_windows()
+    before = screen.snapshot()
+
+    MUTATORS[mutator](screen, windows)
+
+    assert screen.snapshot() is not before
+    assert screen.snapshot() == fresh_snapshot(screen)
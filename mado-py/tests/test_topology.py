@@ -0,0 +1,87 @@
+﻿import pytest
+
+from mado.backends import MonitorInfo
+from mado.types_ import SCREEN_ID
+from mado.window_manager.topology import TopologyDiff, assign_screen_ids, diff_topology
+
+SCREEN_IDS = [SCREEN_ID("TOP"), SCREEN_ID("LEFT"), SCREEN_ID("RIGHT"), SCREEN_ID("MID")]
+REMOVAL_PRIORITY = [SCREEN_ID("TOP"), SCREEN_ID("RIGHT"), SCREEN_ID("LEFT")]
+
+
+def monitor(handle: int, name: str, left: int = 0, width: int = 1920) -> MonitorInfo:
+    rect = (left, 0, left + width, 1080)
+    return MonitorInfo(handle=handle, rect=rect, work_area=(left, 0, left + width, 1040), name=name)
+
+
+def diff(screens, monitors) -> TopologyDiff:
+    return diff_topology(screens, monitors, SCREEN_IDS, REMOVAL_PRIORITY)
+
+
+def test_assign_screen_ids_drops_by_removal_priority():
+    assert assign_screen_ids(4, SCREEN_IDS, REMOVAL_PRIORITY) == SCREEN_IDS
+    assert assign_screen_ids(2, SCREEN_IDS, REMOVAL_PRIORITY) == ["LEFT", "MID"]
+    assert assign_screen_ids(1, SCREEN_IDS, REMOVAL_PRIORITY) == ["MID"]
+
+
+def test_unchanged_monitors_diff_to_nothing():
+    laptop = monitor(1, "laptop")
+    assert not diff({"MID": laptop}, [laptop])
+
+
+def test_dock_adds_screens_and_keeps_the_existing_one():
+    laptop = monitor(1, "laptop")
+    external = monitor(2, "external", left=1920)
+
+    result = diff({"MID": laptop}, [laptop, external])
+
+    assert result.removed == []
+    assert result.changed == {}
+    assert result.added == {"LEFT": external}
+
+
+def test_undock_removes_the_screen_which_lost_its_monitor():
+    laptop = monitor(1, "laptop")
+    external = monitor(2, "external", left=1920)
+
+    result = diff({"LEFT": external, "MID": laptop}, [laptop])
+
+    assert result.removed == ["LEFT"]
+    assert result.added == {}
+    assert result.changed == {}
+
+
+def test_swapped_monitor_reuses_the_orphaned_screen():
+    laptop = monitor(1, "laptop")
+    old_external = monitor(2, "old external", left=1920)
+    new_external = monitor(3, "new external", left=1920, width=2560)
+
+    result = diff({"LEFT": old_external, "MID": laptop}, [laptop, new_external])
+
+    assert result.removed == []
+    assert result.added == {}
+    assert result.changed == {"LEFT": new_external}
+
+
+def test_resolution_change_keeps_the_screen_by_name():
+    laptop = monitor(1, "laptop")
+    resized = monitor(1, "laptop", width=2560)
+
+    assert diff({"MID": laptop}, [resized]) == TopologyDiff(changed={"MID": resized})
+
+
+def test_monitor_matched_by_handle_when_renamed():
+    laptop = monitor(1, "laptop")
+    external = monitor(2, "external", left=1920)
+    renamed = monitor(2, "renamed", left=1920)
+
+    result = diff({"LEFT": external, "MID": laptop}, [laptop, renamed])
+
+    assert result.changed == {"LEFT": renamed}
+    assert not result.added and not result.removed
+
+
+def test_too_many_monitors():
+    monitors = [monitor(handle, f"monitor {handle}", left=1920 * handle) for handle in range(5)]
+
+    with pytest.raises(RuntimeError):
+        diff({}, monitors)
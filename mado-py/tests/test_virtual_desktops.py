@@ -0,0 +1,114 @@
+﻿import pytest
+
+from mado.types_ import VIRTUAL_DESKTOP_ID
+from mado.window_manager import commands
+
+
+@pytest.fixture
+def simulated(desktop):
+    simulated = desktop(virtual_desktop_count=2)
+    simulated.settle()
+    return simulated
+
+
+def run(simulated, command: commands.WindowManagerCommand) -> None:
+    simulated.window_manager.event_queue.put(command)
+    simulated.settle()
+
+
+def focus_virtual_desktop(simulated, virtual_desktop_id: int) -> None:
+    run(simulated, commands.FocusVirtualDesktop(VIRTUAL_DESKTOP_ID(virtual_desktop_id)))
+
+
+def test_switching_back_reuses_the_state_and_its_focus(simulated):
+    backend, window_manager = simulated
+    first, second = backend.create_window("first"), backend.create_window("second")
+    simulated.settle()
+    window_manager.state.focused_screen.focus_window(window_manager.state.windows[first])
+    desktop_state = window_manager.state
+
+    focus_virtual_desktop(simulated, 2)
+    assert window_manager.state is not desktop_state
+    assert not window_manager.state.windows
+    focus_virtual_desktop(simulated, 1)
+
+    assert window_manager.state is desktop_state
+    assert set(window_manager.state.windows) == {first, second}
+    assert window_manager.state.focused_screen.focused_window.hwnd == first
+
+
+def test_switching_back_reconciles_what_changed_while_away(simulated):
+    backend, window_manager = simulated
+    kept, destroyed = backend.create_window("kept"), backend.create_window("destroyed")
+    simulated.settle()
+
+    focus_virtual_desktop(simulated, 2)
+    on_second = backend.create_window("on the second desktop")
+    backend.destroy_window(destroyed)
+    opened = backend.create_window("opened while away", virtual_desktop=1)
+    simulated.settle()
+    assert set(window_manager.state.windows) == {on_second}
+    focus_virtual_desktop(simulated, 1)
+
+    assert set(window_manager.state.windows) == {kept, opened}
+    assert set(window_manager.states[VIRTUAL_DESKTOP_ID(2)].windows) == {on_second}
+
+
+def test_send_to_virtual_desktop_moves_the_window_between_the_states(simulated):
+    backend, window_manager = simulated
+    stays, sent = backend.create_window("stays"), backend.create_window("sent")
+    simulated.settle()
+    focus_virtual_desktop(simulated, 2)
+    focus_virtual_desktop(simulated, 1)
+    window_manager.state.focused_screen.focus_window(window_manager.state.windows[sent])
+
+    run(simulated, commands.SendToVirtualDesktop(VIRTUAL_DESKTOP_ID(2)))
+
+    assert backend.windows[sent].virtual_desktop == 2
+    assert set(window_manager.states[VIRTUAL_DESKTOP_ID(1)].windows) == {stays}
+    assert set(window_manager.states[VIRTUAL_DESKTOP_ID(2)].windows) == {sent}
+    focus_virtual_desktop(simulated, 2)
+    assert set(window_manager.state.windows) == {sent}
+
+
+def test_switching_back_only_probes_the_windows_added_since_the_last_reconcile(simulated, monkeypatch):
+    backend, window_manager = simulated
+    for i in range(10):
+        backend.create_window(f"window {i}")
+    simulated.settle()
+    focus_virtual_desktop(simulated, 2)
+    focus_virtual_desktop(simulated, 1)
+    probed = []
+    is_window_cloaked = backend.is_window_cloaked
+
+    def probe(hwnd: int) -> bool:
+        probed.append(hwnd)
+        return is_window_cloaked(hwnd)
+
+    monkeypatch.setattr(backend, "is_window_cloaked", probe)
+
+    focus_virtual_desktop(simulated, 2)
+    opened = backend.create_window("opened while away", virtual_desktop=1)
+    simulated.settle()
+    probed.clear()
+    focus_virtual_desktop(simulated, 1)
+
+    assert opened in window_manager.state.windows
+    assert opened in probed and len(window_manager.state.windows) == 11
+    assert not set(probed) & (set(window_manager.state.windows) - {opened})
+
+
+def test_a_window_moved_away_by_someone_else_follows_its_cloak(simulated):
+    backend, window_manager = simulated
+    stays, moved = backend.create_window("stays"), backend.create_window("moved")
+    simulated.settle()
+    focus_virtual_desktop(simulated, 2)
+    focus_virtual_desktop(simulated, 1)
+
+    backend.move_window_to_virtual_desktop(moved, 2)
+    simulated.settle()
+    assert set(window_manager.state.windows) == {stays}
+    focus_virtual_desktop(simulated, 2)
+
+    assert set(window_manager.state.windows) == {moved}
+    assert set(window_manager.states[VIRTUAL_DESKTOP_ID(1)].windows) == {stays}
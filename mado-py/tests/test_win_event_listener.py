@@ -0,0 +1,83 @@
+﻿import queue
+import time
+
+import pytest
+
+from mado import win32_events as we
+
+# The window manager first, which imports the listener, as when running mado.
+from mado.window_manager import events
+from mado.win_event_listener import (
+    WIN_EVENT_HOOK_RANGES,
+    WIN_EVENT_TO_WINDOW_MANAGER_EVENT,
+    WinEventHookListener,
+    win_event_hook_ranges,
+)
+
+OBJID_CLIENT = -4
+
+
+@pytest.fixture
+def listener():
+    return WinEventHookListener(event_queue=queue.Queue())
+
+
+def call(listener: WinEventHookListener, win_event: int, hwnd: int = 0x100, id_object: int = we.OBJID_WINDOW):
+    listener.callback(0, win_event, hwnd, id_object, 0, 0, 1234)
+
+
+def queued(listener: WinEventHookListener) -> list:
+    return list(listener.event_queue.queue)
+
+
+def test_hook_ranges_merge_adjacent_codes():
+    assert win_event_hook_ranges([5, 1, 2, 3, 3, 9]) == [(1, 3), (5, 5), (9, 9)]
+    assert win_event_hook_ranges([]) == []
+
+
+def test_hook_ranges_cover_exactly_the_mapped_events():
+    hooked = {code for low, high in WIN_EVENT_HOOK_RANGES for code in range(low, high + 1)}
+
+    assert hooked == set(WIN_EVENT_TO_WINDOW_MANAGER_EVENT)
+    assert we.EVENT_OBJECT_CREATE not in hooked
+
+
+@pytest.mark.parametrize("win_event, event_type", sorted(WIN_EVENT_TO_WINDOW_MANAGER_EVENT.items()))
+def test_mapped_events_are_queued_as_their_event_type(listener, win_event, event_type):
+    call(listener, win_event, hwnd=0x100)
+
+    [event] = queued(listener)
+    assert type(event) is event_type
+    assert (event.win_event, event.hwnd) == (win_event, 0x100)
+
+
+def test_events_are_stamped_in_the_hook_callback(listener):
+    before = time.perf_counter()
+    call(listener, we.EVENT_SYSTEM_FOREGROUND)
+    after = time.perf_counter()
+
+    [event] = queued(listener)
+    assert event.timestamp == 1234
+    assert before <= event.received_at <= after
+
+
+def test_unmapped_events_are_dropped(listener):
+    call(listener, we.EVENT_OBJECT_CREATE)
+    call(listener, we.EVENT_SYSTEM_CAPTUREEND)
+
+    assert queued(listener) == []
+
+
+def test_events_of_anything_but_the_window_itself_are_dropped(listener):
+    call(listener, we.EVENT_OBJECT_LOCATIONCHANGE, id_object=OBJID_CLIENT)
+    call(listener, we.EVENT_OBJECT_SHOW, id_object=OBJID_CLIENT)
+
+    assert queued(listener) == []
+
+
+def test_display_changes_come_from_window_messages(listener):
+    listener.on_window_message(0x200, we.WM_DISPLAYCHANGE, 0)
+    listener.on_window_message(0x200, we.WM_SETTINGCHANGE, we.SPI_SETWORKAREA)
+    listener.on_window_message(0x200, we.WM_SETTINGCHANGE, 0)
+
+    assert [type(event) for event in queued(listener)] == [events.DisplayChange, events.DisplayChange]
@@ -0,0 +1,107 @@
+﻿import threading
+
+import pytest
+
+from mado.window_operations import FOCUS_LANE, GLOBAL_LANE, WindowHung, WindowOperationExecutor
+
+
+@pytest.fixture
+def executor():
+    executor = WindowOperationExecutor(workers=4, timeout=5.0, is_window_hung=lambda hwnd: hwnd == 13)
+    yield executor
+    executor.close()
+
+
+def test_focus_operations_of_different_windows_run_in_submission_order(executor):
+    release = threading.Event()
+    ran = []
+
+    def focus(hwnd: int) -> None:
+        if hwnd == 1:
+            release.wait(5.0)
+        ran.append(hwnd)
+
+    first = executor.submit(FOCUS_LANE, focus, 1, hwnd=1)
+    second = executor.submit(FOCUS_LANE, focus, 2, hwnd=2)
+    focus_desktop = executor.submit(FOCUS_LANE, ran.append, "desktop")
+    assert not second.done()
+    release.set()
+
+    focus_desktop.result(timeout=5.0)
+    assert first.done() and second.done()
+    assert ran == [1, 2, "desktop"]
+
+
+def test_a_later_focus_supersedes_a_pending_one_of_another_window(executor):
+    release = threading.Event()
+    executor.submit(FOCUS_LANE, release.wait, 5.0)
+
+    superseded = executor.submit(FOCUS_LANE, lambda: None, supersede_key="focus", hwnd=1)
+    latest = executor.submit(FOCUS_LANE, lambda: None, supersede_key="focus", hwnd=2)
+    release.set()
+
+    latest.result(timeout=5.0)
+    assert superseded.cancelled()
+
+
+def test_an_operation_on_the_focus_lane_is_skipped_for_a_hung_window(executor):
+    hung = executor.submit(FOCUS_LANE, lambda: None, hwnd=13)
+    responsive = executor.submit(FOCUS_LANE, lambda: "focused", hwnd=14)
+
+    with pytest.raises(WindowHung):
+        hung.result(timeout=5.0)
+    assert responsive.result(timeout=5.0) == "focused"
+
+
+@pytest.fixture
+def impatient_executor():
+    release = threading.Event()
+    executor = WindowOperationExecutor(workers=2, timeout=0.2, is_window_hung=lambda hwnd: False)
+    yield executor, release
+    release.set()
+    executor.close()
+
+
+@pytest.mark.parametrize("lane", [FOCUS_LANE, GLOBAL_LANE])
+def test_a_timeout_on_a_shared_lane_only_blocks_the_hung_window(impatient_executor, lane):
+    executor, release = impatient_executor
+    hung = executor.submit(lane, release.wait, 2.0, hwnd=1)
+    queued = executor.submit(lane, lambda: "focused", hwnd=2)
+
+    with pytest.raises(TimeoutError):
+        hung.result(timeout=2.0)
+    assert queued.result(timeout=2.0) == "focused"
+    assert executor.submit(lane, lambda: "focused", hwnd=3).result(timeout=2.0) == "focused"
+    with pytest.raises(WindowHung):
+        executor.submit(lane, lambda: None, hwnd=1).result(timeout=2.0)
+
+
+def test_a_timeout_on_a_window_lane_fails_its_pending_operations(impatient_executor):
+    executor, release = impatient_executor
+    hung = executor.submit(1, release.wait, 2.0)
+    pending = executor.submit(1, lambda: None)
+
+    with pytest.raises(TimeoutError):
+        hung.result(timeout=2.0)
+    with pytest.raises(WindowHung):
+        pending.result(timeout=2.0)
+    assert executor.submit(2, lambda: "moved").result(timeout=2.0) == "moved"
+
+
+def test_operations_of_a_window_run_in_submission_order(executor):
+    release = threading.Event()
+    ran = []
+
+    def move(step: int) -> None:
+        if step == 0:
+            release.wait(5.0)
+        ran.append(step)
+
+    futures = [executor.submit(1, move, step) for step in range(5)]
+    other = executor.submit(2, lambda: "moved")
+    assert other.result(timeout=5.0) == "moved"
+    assert ran == []
+    release.set()
+
+    futures[-1].result(timeout=5.0)
+    assert ran == [0, 1, 2, 3, 4]
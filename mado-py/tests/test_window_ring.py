@@ -0,0 +1,131 @@
+﻿from mado.window import Window
+from mado.window_manager.window_ring import WindowRing
+
+
+def ring_of(*hwnds: int) -> WindowRing:
+    """Windows inserted in this order, i.e. each one in front of the previous one."""
+    ring = WindowRing()
+    for hwnd in hwnds:
+        ring.insert(Window(hwnd))
+    return ring
+
+
+def current(ring: WindowRing):
+    return ring.current.hwnd if ring.current is not None else None
+
+
+def test_insert_goes_in_front_of_the_cursor_and_takes_it():
+    ring = ring_of(1, 2, 3)
+    assert ring.hwnds() == (3, 2, 1)
+    assert current(ring) == 3
+
+    ring.focus(1)
+    ring.insert(Window(4))
+
+    assert ring.hwnds() == (3, 2, 4, 1)
+    assert current(ring) == 4
+
+
+def test_inserting_a_window_again_does_not_duplicate_it():
+    ring = ring_of(1, 2, 3)
+    ring.focus(1)
+    ring.insert(Window(3))
+
+    assert sorted(ring.hwnds()) == [1, 2, 3]
+    assert current(ring) == 3
+
+
+def test_remove_moves_the_cursor_onto_the_predecessor():
+    ring = ring_of(1, 2, 3)
+    ring.focus(1)
+
+    assert ring.remove(1)
+    assert ring.hwnds() == (3, 2)
+    assert current(ring) == 2
+
+
+def test_removing_the_first_window_moves_the_cursor_onto_the_new_first():
+    ring = ring_of(1, 2, 3)
+
+    assert ring.remove(3)
+    assert ring.hwnds() == (2, 1)
+    assert current(ring) == 2
+
+
+def test_removing_the_last_window_empties_the_ring():
+    ring = ring_of(1)
+
+    assert ring.remove(1)
+    assert not ring.remove(1)
+    assert ring.hwnds() == ()
+    assert ring.current is None
+
+
+def test_focus_only_windows_in_the_ring():
+    ring = ring_of(1, 2)
+
+    assert ring.focus(1) and current(ring) == 1
+    assert not ring.focus(5)
+    assert current(ring) == 1
+
+
+def test_cycling_wraps_around():
+    ring = ring_of(1, 2, 3)
+    visited = []
+    for _ in range(4):
+        ring.forward()
+        visited.append(current(ring))
+    assert visited == [2, 1, 3, 2]
+
+    ring.backward()
+    ring.backward()
+    assert current(ring) == 1
+
+
+def test_cycling_an_empty_ring_does_nothing():
+    ring = WindowRing()
+    ring.forward()
+    ring.backward()
+
+    assert ring.current is None
+
+
+def test_swap_keeps_the_cursor_on_its_window():
+    ring = ring_of(1, 2, 3, 4)
+    ring.focus(2)
+
+    assert ring.swap(4, 2)
+    assert ring.hwnds() == (2, 3, 4, 1)
+    assert current(ring) == 2
+    assert not ring.swap(2, 2)
+    assert not ring.swap(2, 5)
+
+
+def test_swap_neighbours_both_ways_round():
+    ring = ring_of(1, 2, 3)
+
+    assert ring.swap(3, 2)
+    assert ring.hwnds() == (2, 3, 1)
+    assert ring.swap(1, 2)
+    assert ring.hwnds() == (1, 3, 2)
+    assert [window.hwnd for window in ring] == [1, 3, 2]
+
+
+def test_replace_takes_the_place_and_the_cursor():
+    ring = ring_of(1, 2, 3)
+    ring.focus(2)
+
+    assert ring.replace(2, Window(5))
+    assert ring.hwnds() == (3, 5, 1)
+    assert current(ring) == 5
+    assert 2 not in ring and 5 in ring
+    assert not ring.replace(5, Window(1))
+
+
+def test_many_windows_stay_consistent():
+    ring = ring_of(*range(1, 1001))
+    for hwnd in range(2, 1001, 2):
+        ring.remove(hwnd)
+
+    assert ring.hwnds() == tuple(range(999, 0, -2))
+    assert [window.hwnd for window in ring] == list(ring.hwnds())
@@ -0,0 +1,112 @@
+﻿import pytest
+
+from mado.window_rules import Action, WindowRule, WindowRules
+
+WS_CAPTION = 0x00C00000
+
+
+@pytest.fixture
+def with_rules(desktop, monkeypatch):
+    """A simulated desktop whose window manager decides with `rules`."""
+    import mado.window_manager
+    from mado.window_manager import state
+
+    def make(*rules: WindowRule):
+        simulated = desktop()
+        window_rules = WindowRules(rules)
+        monkeypatch.setattr(state, "COMPILED_WINDOW_RULES", window_rules)
+        monkeypatch.setattr(mado.window_manager, "COMPILED_WINDOW_RULES", window_rules)
+        return simulated, window_rules
+
+    return make
+
+
+def test_the_first_matching_rule_wins():
+    rules = WindowRules(
+        [
+            WindowRule(Action.ignore, title="^Save as$", class_name="#32770"),
+            WindowRule(Action.float, class_name="#32770"),
+            WindowRule(Action.pin, title="Slack"),
+        ]
+    )
+
+    def match(title: str, class_name: str):
+        rule = rules.match(title, class_name, lambda: "app.exe", lambda: 0)
+        return rule.action if rule is not None else None
+
+    assert match("Save as", "#32770") is Action.ignore
+    assert match("Open", "#32770") is Action.float
+    assert match("Slack | general", "Chrome_WidgetWin_1") is Action.pin
+    assert match("Editor", "Chrome_WidgetWin_1") is None
+
+
+def test_the_executable_is_only_looked_up_when_a_rule_needs_it():
+    rules = WindowRules([WindowRule(Action.pin, title="Spotify", executable="Spotify.exe")])
+
+    def executable() -> str:
+        raise AssertionError("looked up")
+
+    assert rules.match("Editor", "Notepad", executable, lambda: 0) is None
+    assert rules.match("Spotify Premium", "Chrome", lambda: "spotify.exe", lambda: 0) is not None
+
+
+def test_decisions_follow_title_changes(with_rules):
+    simulated, rules = with_rules(WindowRule(Action.float, title="^Picture in picture$"))
+    backend = simulated.backend
+    hwnd = backend.create_window("Video")
+    simulated.settle()
+    assert rules.decide(hwnd) is None
+
+    backend.set_title(hwnd, "Picture in picture")
+    simulated.settle()
+
+    assert rules.decide(hwnd).action is Action.float
+
+
+def test_decisions_follow_style_changes(with_rules):
+    simulated, rules = with_rules(WindowRule(Action.float, exclude_style=WS_CAPTION))
+    backend = simulated.backend
+    hwnd = backend.create_window("Borderless")
+    simulated.settle()
+    assert rules.decide(hwnd) is None
+
+    backend.windows[hwnd].style &= ~WS_CAPTION
+    backend.minimise_window(hwnd)
+    backend.restore_window(hwnd)
+    simulated.settle()
+
+    assert rules.decide(hwnd).action is Action.float
+
+
+def test_the_executable_of_a_process_is_forgotten_with_its_last_window(with_rules):
+    simulated, rules = with_rules(WindowRule(Action.float, executable="app.exe"))
+    backend = simulated.backend
+    first = backend.create_window("First", executable="app.exe")
+    second = backend.create_window("Second", executable="app.exe")
+    simulated.settle()
+    assert rules.decide(first).action is rules.decide(second).action is Action.float
+    assert len(rules._executables) == 1
+
+    backend.destroy_window(first)
+    simulated.settle()
+    assert len(rules._executables) == 1
+
+    backend.destroy_window(second)
+    simulated.settle()
+    assert rules._executables == {}
+
+
+def test_a_window_pinned_to_a_screen_stays_there_when_moved(with_rules):
+    simulated, _ = with_rules(WindowRule(Action.pin, title="^Chat$", screen_id="LEFT"))
+    backend, window_manager = simulated
+    pinned, other = backend.create_window("Chat"), backend.create_window("Editor")
+    simulated.settle()
+    windows = window_manager.state.windows
+    assert windows[pinned].screen.screen_id == windows[other].screen.screen_id == "LEFT"
+
+    for hwnd in (pinned, other):
+        backend.drag_window(hwnd, (2000, 100, 2800, 700))
+    simulated.settle()
+
+    assert windows[pinned].screen.screen_id == "LEFT"
+    assert windows[other].screen.screen_id != "LEFT"